@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AssignmentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'assignment'
+
+    def ready(self):
+        from . import signals  # noqa: F401
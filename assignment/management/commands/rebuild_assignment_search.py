@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from assignment import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the assignment full-text search index from Assignment records."
+
+    def handle(self, *args, **options):
+        indexed = search.rebuild()
+        if indexed is None:
+            self.stdout.write(f"Nothing to rebuild: the {search.backend()} search backend keeps no separate index.")
+            return
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} assignments."))
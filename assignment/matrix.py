@@ -0,0 +1,83 @@
+"""
+Assignment x student submission matrix for one class level.
+
+Rows are the currently enrolled students and columns are the class's
+assignments. The cells are indexes into STATUSES, with a parallel matrix of
+marks, so every student and assignment is sent once instead of once per
+cell. Ungraded submissions have null marks, and assignments that are not
+yet due are pending rather than missing for students who have not
+submitted. The matrix takes one enrollment query and one assignment query that
+LEFT JOINs the submissions, so assignments nobody has submitted still get
+a column.
+"""
+from django.utils import timezone
+
+from account.models import StudentClassEnrollment
+from .models import Assignment
+
+STATUSES = {"missing": 0, "submitted": 1, "late": 2, "pending": 3}
+
+
+def build_matrix(classlevel_id, subject_id=None):
+    students = list(
+        StudentClassEnrollment.objects.filter(class_level_id=classlevel_id, is_current=True)
+        .order_by("student__full_name", "student_id")
+        .values_list("student_id", "student__full_name")
+    )
+    row_of = {student_id: row for row, (student_id, _) in enumerate(students)}
+
+    assignments = Assignment.objects.filter(classlevel_id=classlevel_id)
+    if subject_id is not None:
+        assignments = assignments.filter(subject_id=subject_id)
+    records = assignments.order_by("deadline", "id").values_list(
+        "id", "title", "deadline", "subject_id",
+        "submissions__student_id", "submissions__marks", "submissions__submitted_at",
+    )
+
+    columns = []
+    column_of = {}
+    cells = []
+    for assignment_id, title, deadline, assignment_subject_id, student_id, marks, submitted_at in records:
+        column = column_of.get(assignment_id)
+        if column is None:
+            column = column_of[assignment_id] = len(columns)
+            columns.append({
+                "id": assignment_id,
+                "title": title,
+                "deadline": deadline,
+                "subject_id": assignment_subject_id,
+            })
+        row = row_of.get(student_id)
+        if row is not None:
+            if timezone.is_aware(submitted_at):
+                submitted_at = timezone.localtime(submitted_at)
+            late = submitted_at.date() > deadline
+            mark = float(marks) if marks is not None else None
+            cells.append((row, column, STATUSES["late" if late else "submitted"], mark))
+
+    today = timezone.localdate()
+    unsubmitted = [
+        STATUSES["pending" if column["deadline"] >= today else "missing"] for column in columns
+    ]
+    status = [list(unsubmitted) for _ in students]
+    marks = [[None] * len(columns) for _ in students]
+    for row, column, code, mark in cells:
+        status[row][column] = code
+        marks[row][column] = mark
+
+    counts = {name: 0 for name in STATUSES}
+    names = {code: name for name, code in STATUSES.items()}
+    for row in status:
+        for code in row:
+            counts[names[code]] += 1
+
+    return {
+        "classlevel_id": classlevel_id,
+        "subject_id": subject_id,
+        "statuses": names,
+        "students": [{"id": student_id, "full_name": name} for student_id, name in students],
+        "assignments": columns,
+        "status": status,
+        "marks": marks,
+        "summary": counts,
+    }
@@ -0,0 +1,42 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                "CREATE VIRTUAL TABLE assignment_search USING fts5("
+                "title, body, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+        except OperationalError:
+            # SQLite built without FTS5, searches fall back to icontains
+            return
+        schema_editor.execute(
+            "INSERT INTO assignment_search (rowid, title, body) "
+            "SELECT id, title, assignment FROM assignment_assignment"
+        )
+    elif connection.vendor == 'mysql':
+        schema_editor.execute(
+            "ALTER TABLE assignment_assignment ADD FULLTEXT INDEX assignment_search (title, assignment)"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS assignment_search")
+    elif connection.vendor == 'mysql':
+        schema_editor.execute("ALTER TABLE assignment_assignment DROP INDEX assignment_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignment', '0003_alter_assignmentsubmission_marks'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
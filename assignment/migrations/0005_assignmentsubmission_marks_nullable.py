@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignment', '0004_assignment_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='assignmentsubmission',
+            name='marks',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True),
+        ),
+    ]
@@ -24,7 +24,8 @@ class Assignment(models.Model):
 class AssignmentSubmission(models.Model):
     assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='submissions')
     student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='assignment_submissions')
-    marks = models.DecimalField(max_digits=5, decimal_places=2, default=0, blank=True)
+    # NULL until the submission is graded
+    marks = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)
     submitted_at = models.DateTimeField(auto_now_add=True)
     feedback = models.TextField(blank=True, null=True)
 
@@ -0,0 +1,190 @@
+"""
+Keyword search over assignment titles and bodies.
+
+On SQLite the title and body of every assignment are copied into the FTS5
+table ``assignment_search``, with the assignment id as its rowid. Searches
+then use the full-text index, rank hits with ``bm25`` and cut snippets
+with ``snippet()``. On MySQL a FULLTEXT index on the assignment table is
+searched with ``MATCH ... AGAINST`` in boolean mode. Any other database,
+or an SQLite build without FTS5, falls back to ``icontains``.
+
+Signals keep the FTS5 table in step with single saves and deletes.
+``QuerySet.update`` and ``bulk_create`` skip them, so run ``rebuild``
+(the ``rebuild_assignment_search`` command) after those.
+
+Every term is matched as a prefix and all terms must match. Highlights
+are HTML-escaped, with matches wrapped in ``<mark>``.
+"""
+import html
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Assignment
+
+TABLE = "assignment_search"
+MAX_TERMS = 8
+SNIPPET_WORDS = 16
+# Control characters never occur in user text, so they can mark matches
+# in SQL output that is escaped afterwards
+START, END = "\x02", "\x03"
+
+_fts5_tables = {}
+
+
+def backend():
+    if connection.vendor == "sqlite":
+        return "fts5" if _has_fts5_table() else "icontains"
+    if connection.vendor == "mysql":
+        return "fulltext"
+    return "icontains"
+
+
+def _has_fts5_table():
+    name = connection.settings_dict["NAME"]
+    if name not in _fts5_tables:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [TABLE])
+            _fts5_tables[name] = cursor.fetchone() is not None
+    return _fts5_tables[name]
+
+
+def terms(query):
+    return re.findall(r"\w+", (query or "").lower())[:MAX_TERMS]
+
+
+def _marked(text):
+    return html.escape(text or "").replace(START, "<mark>").replace(END, "</mark>")
+
+
+def _mark_terms(text, words, snippet=False):
+    """Wrap words that start with a search term, optionally cut around the first match."""
+    tokens = (text or "").split()
+    hits = [i for i, token in enumerate(tokens) if any(token.lower().lstrip("\"'(").startswith(w) for w in words)]
+    if snippet:
+        start = max(hits[0] - SNIPPET_WORDS // 4, 0) if hits else 0
+        end = start + SNIPPET_WORDS
+        prefix = "…" if start > 0 else ""
+        suffix = "…" if end < len(tokens) else ""
+    else:
+        start, end, prefix, suffix = 0, len(tokens), "", ""
+    hits = set(hits)
+    marked = " ".join(
+        f"{START}{token}{END}" if i in hits else token
+        for i, token in enumerate(tokens[start:end], start)
+    )
+    return _marked(prefix + marked + suffix)
+
+
+def index(assignment):
+    if backend() != "fts5":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [assignment.pk])
+        cursor.execute(
+            f"INSERT INTO {TABLE} (rowid, title, body) VALUES (%s, %s, %s)",
+            [assignment.pk, assignment.title, assignment.assignment],
+        )
+
+
+def remove(assignment_id):
+    if backend() != "fts5":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [assignment_id])
+
+
+def rebuild():
+    """
+    Refill the FTS5 table from the assignment table and return the number
+    of indexed assignments, or None when this database has no FTS5 table
+    to fill (MySQL keeps its FULLTEXT index up to date by itself).
+    """
+    if backend() != "fts5":
+        return None
+    table = Assignment._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+        cursor.execute(f"INSERT INTO {TABLE} (rowid, title, body) SELECT id, title, assignment FROM {table}")
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT COUNT(*) FROM {TABLE}")
+        return cursor.fetchone()[0]
+
+
+def _fts5_search(words, classlevel_id, subject_id, limit):
+    table = Assignment._meta.db_table
+    where = [f"{TABLE} MATCH %s"]
+    params = [" ".join(f'"{word}"*' for word in words)]
+    if classlevel_id is not None:
+        where.append("a.classlevel_id = %s")
+        params.append(classlevel_id)
+    if subject_id is not None:
+        where.append("a.subject_id = %s")
+        params.append(subject_id)
+    assignments = Assignment.objects.raw(
+        f"SELECT a.id, a.title, a.deadline, a.classlevel_id, a.subject_id, "
+        # bm25 is lower for better matches
+        f"-bm25({TABLE}, 10.0, 1.0) AS score, "
+        f"highlight({TABLE}, 0, %s, %s) AS title_marked, "
+        f"snippet({TABLE}, 1, %s, %s, '…', {SNIPPET_WORDS}) AS snippet_marked "
+        f"FROM {TABLE} JOIN {table} a ON a.id = {TABLE}.rowid "
+        f"WHERE {' AND '.join(where)} ORDER BY score DESC, a.id LIMIT %s",
+        [START, END, START, END, *params, limit],
+    )
+    return [
+        _result(assignment, assignment.score, _marked(assignment.title_marked), _marked(assignment.snippet_marked))
+        for assignment in assignments
+    ]
+
+
+def _queryset_search(words, classlevel_id, subject_id, limit, fulltext):
+    assignments = Assignment.objects.all()
+    if classlevel_id is not None:
+        assignments = assignments.filter(classlevel_id=classlevel_id)
+    if subject_id is not None:
+        assignments = assignments.filter(subject_id=subject_id)
+    if fulltext:
+        assignments = assignments.annotate(
+            score=RawSQL(
+                "MATCH (title, assignment) AGAINST (%s IN BOOLEAN MODE)",
+                [" ".join(f"+{word}*" for word in words)],
+            )
+        ).filter(score__gt=0).order_by("-score", "id")
+    else:
+        for word in words:
+            assignments = assignments.filter(Q(title__icontains=word) | Q(assignment__icontains=word))
+        assignments = assignments.order_by("-created_at", "-id")
+    return [
+        _result(
+            assignment,
+            assignment.score if fulltext else None,
+            _mark_terms(assignment.title, words),
+            _mark_terms(assignment.assignment, words, snippet=True),
+        )
+        for assignment in assignments[:limit]
+    ]
+
+
+def _result(assignment, score, title_highlight, snippet):
+    return {
+        "id": assignment.id,
+        "title": assignment.title,
+        "deadline": assignment.deadline,
+        "classlevel": assignment.classlevel_id,
+        "subject": assignment.subject_id,
+        "score": round(float(score), 4) if score is not None else None,
+        "title_highlight": title_highlight,
+        "snippet": snippet,
+    }
+
+
+def search(query, classlevel_id=None, subject_id=None, limit=20):
+    words = terms(query)
+    if not words:
+        return []
+    engine = backend()
+    if engine == "fts5":
+        return _fts5_search(words, classlevel_id, subject_id, limit)
+    return _queryset_search(words, classlevel_id, subject_id, limit, fulltext=engine == "fulltext")
@@ -1,4 +1,7 @@
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
 from rest_framework import serializers
+from account.models import StudentClassEnrollment
 from .models import Assignment, AssignmentSubmission
 from django.contrib.auth import get_user_model
 
@@ -39,3 +42,93 @@ class AssignmentSubmissionSerializer(serializers.ModelSerializer):
         fields = ["id", "assignment", "marks", "student", "submitted_at", "feedback"]
         read_only_fields = ['submitted_at']
 
+
+class AssignmentGradeBulkSerializer(serializers.ListSerializer):
+    """
+    List serializer for grading many students on one assignment at once.
+
+    Every student is looked up with one ``in_bulk`` query that also checks
+    their current enrollment in the assignment's class level, errors are
+    reported per row, and all rows are upserted on (assignment, student)
+    with a single ``bulk_create`` inside one transaction. The assignment is
+    passed in the serializer context.
+
+    Submissions are recorded by teachers, so grading an enrolled student
+    who has no submission yet creates it, like the single-submission
+    endpoint does.
+    """
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            return super().to_internal_value(data)
+
+        rows = []
+        errors = []
+        for item in data:
+            try:
+                rows.append(self.run_child_validation(item))
+                errors.append({})
+            except serializers.ValidationError as exc:
+                rows.append(None)
+                errors.append(exc.detail)
+
+        students = User.objects.annotate(
+            enrolled=Exists(StudentClassEnrollment.objects.filter(
+                student=OuterRef('pk'),
+                class_level_id=self.context['assignment'].classlevel_id,
+                is_current=True,
+            ))
+        ).in_bulk({row['student'] for row in rows if row})
+        seen = set()
+        for row, row_errors in zip(rows, errors):
+            if row is None:
+                continue
+            student = students.get(row['student'])
+            if student is None:
+                row_errors['student'] = ["Student does not exist."]
+            elif student.role != 'student':
+                row_errors['student'] = ["Selected user is not a student."]
+            elif not student.enrolled:
+                row_errors['student'] = ["Student is not enrolled in this assignment's class."]
+            if row['student'] in seen:
+                row_errors['non_field_errors'] = ["Duplicate student in this request."]
+            seen.add(row['student'])
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return rows
+
+    def create(self, validated_data):
+        assignment = self.context['assignment']
+        with transaction.atomic():
+            return AssignmentSubmission.objects.bulk_create(
+                [
+                    AssignmentSubmission(
+                        assignment=assignment,
+                        student_id=row['student'],
+                        marks=row['marks'],
+                        feedback=row.get('feedback'),
+                    )
+                    for row in validated_data
+                ],
+                batch_size=1000,
+                update_conflicts=True,
+                # MySQL upserts on any unique key and rejects an explicit target
+                unique_fields=(
+                    ['assignment', 'student']
+                    if connection.features.supports_update_conflicts_with_target else None
+                ),
+                update_fields=['marks', 'feedback'],
+            )
+
+
+class AssignmentGradeSerializer(serializers.Serializer):
+    """
+    Marks and feedback for one student, used with ``many=True`` for bulk grading.
+    """
+    student = serializers.IntegerField()
+    marks = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=0)
+    feedback = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+    class Meta:
+        list_serializer_class = AssignmentGradeBulkSerializer
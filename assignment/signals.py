@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import search
+from .models import Assignment
+
+
+@receiver(post_save, sender=Assignment)
+def index_assignment(sender, instance, **kwargs):
+    search.index(instance)
+
+
+@receiver(post_delete, sender=Assignment)
+def unindex_assignment(sender, instance, **kwargs):
+    search.remove(instance.pk)
@@ -1,3 +1,284 @@
+import io
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from account.models import ClassLevel, CustomUser, StudentClassEnrollment, Subject
+from . import search
+from .matrix import STATUSES, build_matrix
+from .models import Assignment, AssignmentSubmission
+
+
+class SubmissionMatrixTests(TestCase):
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user("teacher@example.com", "Teacher", role="teacher")
+        self.classlevel = ClassLevel.objects.create(level=9)
+        other_class = ClassLevel.objects.create(level=10)
+        self.science = Subject.objects.create(name="Science")
+        self.maths = Subject.objects.create(name="Maths")
+
+        self.asha = CustomUser.objects.create_user("asha@example.com", "Asha")
+        self.bikash = CustomUser.objects.create_user("bikash@example.com", "Bikash")
+        moved = CustomUser.objects.create_user("moved@example.com", "Moved")
+        for student in (self.asha, self.bikash):
+            StudentClassEnrollment.objects.create(student=student, class_level=self.classlevel, is_current=True)
+        StudentClassEnrollment.objects.create(student=moved, class_level=self.classlevel, is_current=False)
+        StudentClassEnrollment.objects.create(student=moved, class_level=other_class, is_current=True)
+
+        self.first = Assignment.objects.create(
+            title="Cells", assignment="-", classlevel=self.classlevel,
+            subject=self.science, deadline=date(2025, 1, 10),
+        )
+        self.second = Assignment.objects.create(
+            title="Fractions", assignment="-", classlevel=self.classlevel,
+            subject=self.maths, deadline=date(2025, 1, 20),
+        )
+        Assignment.objects.create(title="Other class", assignment="-", classlevel=other_class)
+
+        self._submit(self.first, self.asha, "8.50", datetime(2025, 1, 9, 12, tzinfo=dt_timezone.utc))
+        self._submit(self.first, self.bikash, "6", datetime(2025, 1, 12, 12, tzinfo=dt_timezone.utc))
+        self._submit(self.first, moved, "9", datetime(2025, 1, 9, 12, tzinfo=dt_timezone.utc))
+
+    def _submit(self, assignment, student, marks, submitted_at):
+        submission = AssignmentSubmission.objects.create(assignment=assignment, student=student, marks=Decimal(marks))
+        AssignmentSubmission.objects.filter(pk=submission.pk).update(submitted_at=submitted_at)
+
+    def test_matrix_flags_submitted_late_and_missing(self):
+        with CaptureQueriesContext(connection) as queries:
+            matrix = build_matrix(self.classlevel.id)
+
+        self.assertEqual(len(queries), 2)
+        self.assertEqual([s["full_name"] for s in matrix["students"]], ["Asha", "Bikash"])
+        self.assertEqual([a["title"] for a in matrix["assignments"]], ["Cells", "Fractions"])
+        self.assertEqual(matrix["status"], [
+            [STATUSES["submitted"], STATUSES["missing"]],
+            [STATUSES["late"], STATUSES["missing"]],
+        ])
+        self.assertEqual(matrix["marks"], [[8.5, None], [6.0, None]])
+        self.assertEqual(matrix["summary"], {"missing": 2, "submitted": 1, "late": 1, "pending": 0})
+
+    def test_ungraded_and_not_yet_due_cells(self):
+        AssignmentSubmission.objects.filter(assignment=self.first, student=self.bikash).update(marks=None)
+        self._submit(self.second, self.asha, "7", datetime(2025, 1, 14, 12, tzinfo=dt_timezone.utc))
+
+        with mock.patch("assignment.matrix.timezone.localdate", return_value=date(2025, 1, 15)):
+            matrix = build_matrix(self.classlevel.id)
+
+        self.assertEqual(matrix["status"], [
+            [STATUSES["submitted"], STATUSES["submitted"]],
+            [STATUSES["late"], STATUSES["pending"]],
+        ])
+        self.assertEqual(matrix["marks"], [[8.5, 7.0], [None, None]])
+        self.assertEqual(matrix["summary"], {"missing": 0, "submitted": 2, "late": 1, "pending": 1})
+
+    def test_matrix_filters_by_subject(self):
+        matrix = build_matrix(self.classlevel.id, self.maths.id)
+
+        self.assertEqual([a["id"] for a in matrix["assignments"]], [self.second.id])
+        self.assertEqual(matrix["status"], [[STATUSES["missing"]], [STATUSES["missing"]]])
+
+    def test_endpoint_is_limited_to_teachers_and_admins(self):
+        client = APIClient()
+        url = reverse("assignment-submission-matrix", args=[self.classlevel.id])
+
+        client.force_authenticate(self.asha)
+        self.assertEqual(client.get(url).status_code, 403)
+
+        client.force_authenticate(self.teacher)
+        self.assertEqual(client.get(url, {"subject": "x"}).status_code, 400)
+        response = client.get(url, {"subject": self.science.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["statuses"], {0: "missing", 1: "submitted", 2: "late", 3: "pending"})
+        self.assertEqual(len(response.data["assignments"]), 1)
+
+
+class BulkGradeTests(TestCase):
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user("teacher@example.com", "Teacher", role="teacher")
+        self.other_teacher = CustomUser.objects.create_user("other@example.com", "Other", role="teacher")
+        self.classlevel = ClassLevel.objects.create(level=9)
+        self.assignment = Assignment.objects.create(
+            title="Cells", assignment="-", classlevel=self.classlevel, teacher=self.teacher,
+        )
+        self.students = [
+            CustomUser.objects.create_user(f"student{i}@example.com", f"Student {i}") for i in range(3)
+        ]
+        for student in self.students:
+            StudentClassEnrollment.objects.create(student=student, class_level=self.classlevel, is_current=True)
+        self.existing = AssignmentSubmission.objects.create(
+            assignment=self.assignment, student=self.students[0], marks=Decimal("2"), feedback="Late start",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        self.url = reverse("assignment-submission-bulk-grade", args=[self.assignment.id])
+
+    def test_bulk_grade_upserts_in_constant_queries(self):
+        payload = [
+            {"student": self.students[0].id, "marks": "9.50", "feedback": "Much better"},
+            {"student": self.students[1].id, "marks": "7"},
+            {"student": self.students[2].id, "marks": "8", "feedback": ""},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, payload, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(len(queries), 10)
+        self.assertEqual((response.data["created"], response.data["updated"]), (2, 1))
+        self.assertEqual(
+            [(row["student"], row["status"]) for row in response.data["results"]],
+            [(self.students[0].id, "updated"), (self.students[1].id, "created"), (self.students[2].id, "created")],
+        )
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.marks, self.existing.feedback), (Decimal("9.50"), "Much better"))
+        self.assertEqual(AssignmentSubmission.objects.filter(assignment=self.assignment).count(), 3)
+
+    def test_statuses_are_read_in_the_same_transaction_as_the_upsert(self):
+        payload = [{"student": self.students[0].id, "marks": "9"}, {"student": self.students[1].id, "marks": "7"}]
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(self.url, payload, format="json")
+
+        sql = [query["sql"] for query in queries.captured_queries]
+        submission_queries = [i for i, statement in enumerate(sql) if '"assignment_assignmentsubmission"' in statement]
+        savepoint = next(i for i, statement in enumerate(sql) if statement.startswith("SAVEPOINT"))
+        release = max(i for i, statement in enumerate(sql) if statement.startswith("RELEASE SAVEPOINT"))
+        self.assertEqual(len(submission_queries), 3)
+        self.assertLess(savepoint, submission_queries[0])
+        self.assertGreater(release, submission_queries[-1])
+
+    def test_invalid_rows_reject_the_whole_batch(self):
+        payload = [
+            {"student": self.students[1].id, "marks": "7"},
+            {"student": self.students[1].id, "marks": "8"},
+            {"student": self.teacher.id, "marks": "5"},
+            {"student": self.students[2].id, "marks": "-1"},
+        ]
+        response = self.client.post(self.url, payload, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn("non_field_errors", response.data[1])
+        self.assertIn("student", response.data[2])
+        self.assertIn("marks", response.data[3])
+        self.assertEqual(AssignmentSubmission.objects.filter(assignment=self.assignment).count(), 1)
+
+    def test_students_outside_the_class_are_rejected(self):
+        other_class = ClassLevel.objects.create(level=10)
+        moved = CustomUser.objects.create_user("moved@example.com", "Moved")
+        StudentClassEnrollment.objects.create(student=moved, class_level=self.classlevel, is_current=False)
+        StudentClassEnrollment.objects.create(student=moved, class_level=other_class, is_current=True)
+        stranger = CustomUser.objects.create_user("stranger@example.com", "Stranger")
+
+        payload = [
+            {"student": self.students[1].id, "marks": "7"},
+            {"student": moved.id, "marks": "6"},
+            {"student": stranger.id, "marks": "5"},
+        ]
+        response = self.client.post(self.url, payload, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertEqual(response.data[1]["student"], ["Student is not enrolled in this assignment's class."])
+        self.assertIn("student", response.data[2])
+        self.assertEqual(AssignmentSubmission.objects.filter(assignment=self.assignment).count(), 1)
+
+    def test_teachers_can_only_grade_their_own_assignments(self):
+        self.client.force_authenticate(self.other_teacher)
+        response = self.client.post(self.url, [{"student": self.students[1].id, "marks": "7"}], format="json")
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_authenticate(self.students[1])
+        response = self.client.post(self.url, [{"student": self.students[1].id, "marks": "7"}], format="json")
+        self.assertEqual(response.status_code, 403)
+
+
+class AssignmentSearchTests(TestCase):
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user("teacher@example.com", "Teacher", role="teacher")
+        self.student = CustomUser.objects.create_user("student@example.com", "Student")
+        self.classlevel = ClassLevel.objects.create(level=9)
+        self.other_class = ClassLevel.objects.create(level=10)
+        StudentClassEnrollment.objects.create(student=self.student, class_level=self.classlevel, is_current=True)
+        self.science = Subject.objects.create(name="Science")
+        self.maths = Subject.objects.create(name="Maths")
+
+        self.cells = Assignment.objects.create(
+            title="Plant cells", classlevel=self.classlevel, subject=self.science,
+            assignment="Draw a <b>leaf</b> and label the chloroplasts and the cell wall.",
+        )
+        self.photosynthesis = Assignment.objects.create(
+            title="Photosynthesis", classlevel=self.classlevel, subject=self.science,
+            assignment="Explain how plants turn light into sugar inside their cells.",
+        )
+        self.fractions = Assignment.objects.create(
+            title="Fractions", classlevel=self.classlevel, subject=self.maths,
+            assignment="Add and simplify the fractions.",
+        )
+        self.other = Assignment.objects.create(
+            title="Animal cells", classlevel=self.other_class, subject=self.science,
+            assignment="Label the cell membrane.",
+        )
+
+    def test_search_uses_the_fts5_index(self):
+        self.assertEqual(search.backend(), "fts5")
+
+        results = search.search("cell", classlevel_id=self.classlevel.id)
+
+        # Title matches rank above body matches
+        self.assertEqual([r["id"] for r in results], [self.cells.id, self.photosynthesis.id])
+        self.assertEqual(results[0]["title_highlight"], "Plant <mark>cells</mark>")
+        self.assertIn("&lt;b&gt;leaf&lt;/b&gt;", results[0]["snippet"])
+        self.assertIn("<mark>cell</mark> wall", results[0]["snippet"])
+        self.assertEqual(search.search("cells light", subject_id=self.science.id)[0]["id"], self.photosynthesis.id)
+        self.assertEqual(search.search("fractions", subject_id=self.science.id), [])
+        self.assertEqual(search.search("  !! "), [])
+
+    def test_signals_keep_the_index_in_sync(self):
+        self.fractions.title = "Decimals"
+        self.fractions.assignment = "Round the decimals."
+        self.fractions.save()
+        self.assertEqual(search.search("fractions"), [])
+        self.assertEqual([r["id"] for r in search.search("decimal")], [self.fractions.id])
+
+        self.cells.delete()
+        self.assertNotIn(self.cells.id, [r["id"] for r in search.search("cells")])
+
+    def test_rebuild_command_picks_up_bulk_changes(self):
+        Assignment.objects.filter(pk=self.fractions.pk).update(title="Ratios")
+        self.assertEqual(search.search("ratios"), [])
+
+        out = io.StringIO()
+        call_command("rebuild_assignment_search", stdout=out)
+
+        self.assertIn("Indexed 4 assignments", out.getvalue())
+        self.assertEqual([r["id"] for r in search.search("ratios")], [self.fractions.id])
+
+    def test_icontains_fallback_matches_the_same_assignments(self):
+        with mock.patch.object(search, "backend", return_value="icontains"):
+            results = search.search("cell", classlevel_id=self.classlevel.id)
+
+        self.assertEqual({r["id"] for r in results}, {self.cells.id, self.photosynthesis.id})
+        cells = next(r for r in results if r["id"] == self.cells.id)
+        self.assertEqual(cells["title_highlight"], "Plant <mark>cells</mark>")
+        self.assertEqual(cells["snippet"], "…the chloroplasts and the <mark>cell</mark> wall.")
+
+    def test_students_only_search_their_own_class(self):
+        client = APIClient()
+        url = reverse("search-assignments")
+
+        client.force_authenticate(self.student)
+        response = client.get(url, {"q": "cells", "classlevel": self.other_class.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({r["id"] for r in response.data["results"]}, {self.cells.id, self.photosynthesis.id})
 
-# Create your tests here.
+        client.force_authenticate(self.teacher)
+        response = client.get(url, {"q": "cells", "classlevel": self.other_class.id})
+        self.assertEqual([r["id"] for r in response.data["results"]], [self.other.id])
+        self.assertEqual(client.get(url, {"q": ""}).status_code, 400)
+        self.assertEqual(client.get(url, {"q": "cells", "limit": "x"}).status_code, 400)
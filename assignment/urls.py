@@ -2,8 +2,9 @@
 from django.urls import path
 from .views import (
     create_assignment, list_assignments, update_assignment, delete_assignment, 
-    teacher_assignment_list, get_assignment_by_id, get_teacher_list,
-    assignment_submission, assignment_submission_list, assignment_submission_edit, assignment_submission_delete
+    teacher_assignment_list, get_assignment_by_id, get_teacher_list, search_assignments,
+    assignment_submission, assignment_submission_list, assignment_submission_edit, assignment_submission_delete,
+    assignment_submission_bulk_grade, assignment_submission_matrix
 )
 
 
@@ -12,6 +13,7 @@ urlpatterns = [
     # Assignment URLs
     path('api/assignments/create/', create_assignment, name='create-assignment'),
     path('api/assignments/', list_assignments, name='list-assignments'),
+    path('api/assignments/search/', search_assignments, name='search-assignments'),
     path('api/assignments/<int:pk>/update/', update_assignment, name='update-assignment'),
     path('api/assignments/<int:pk>/delete/', delete_assignment, name='delete-assignment'),
     path("api/teacher_assignment_list/",teacher_assignment_list,name="teacher_assignment_list"),
@@ -23,4 +25,6 @@ urlpatterns = [
     path('api/assignment-submissions/', assignment_submission_list, name='assignment-submission-list'),
     path('api/assignment-submissions/<int:pk>/edit/', assignment_submission_edit, name='assignment-submission-edit'),
     path('api/assignment-submissions/<int:pk>/delete/', assignment_submission_delete, name='assignment-submission-delete'),
+    path('api/assignment-submissions/grade/<int:assignment_id>/', assignment_submission_bulk_grade, name='assignment-submission-bulk-grade'),
+    path('api/assignment-submissions/matrix/<int:classlevel_id>/', assignment_submission_matrix, name='assignment-submission-matrix'),
 ]
@@ -3,9 +3,15 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
+from . import search
+from .matrix import build_matrix
 from .models import Assignment, AssignmentSubmission
-from .serializers import AssignmentSerializer, AssignmentListDataSerializer, TeacherSerializer, AssignmentSubmissionSerializer
+from .serializers import (
+    AssignmentSerializer, AssignmentListDataSerializer, TeacherSerializer, AssignmentSubmissionSerializer,
+    AssignmentGradeSerializer,
+)
 from account.models import ClassLevel, StudentClassEnrollment # assuming user has classlevel
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
@@ -69,6 +75,54 @@ def list_assignments(request):
         return Response({"message":"Ke garxa keta ho ramari kaam gara na yrr"}, status=status.HTTP_400_BAD_REQUEST)
     
 
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter('q', openapi.IN_QUERY, description="Keywords to find in assignment titles and text", type=openapi.TYPE_STRING, required=True),
+        openapi.Parameter('classlevel', openapi.IN_QUERY, description="Class Level ID (students always search their own class)", type=openapi.TYPE_INTEGER),
+        openapi.Parameter('subject', openapi.IN_QUERY, description="Subject ID", type=openapi.TYPE_INTEGER),
+        openapi.Parameter('limit', openapi.IN_QUERY, description=f"Maximum results (default {SEARCH_LIMIT}, max {MAX_SEARCH_LIMIT})", type=openapi.TYPE_INTEGER),
+    ],
+    responses={200: 'Ranked assignments with highlighted title and snippet'}
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_assignments(request):
+    """
+    Full-text search over assignment titles and text, best matches first
+    """
+    user = request.user
+
+    params = {}
+    for name in ('classlevel', 'subject', 'limit'):
+        value = request.GET.get(name)
+        if value is not None and not value.isdigit():
+            return Response({"error": f"{name} must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        params[name] = int(value) if value else None
+
+    query = request.GET.get('q', '')
+    if not search.terms(query):
+        return Response({"error": "q must contain at least one word."}, status=status.HTTP_400_BAD_REQUEST)
+
+    classlevel_id = params['classlevel']
+    if user.role == "student":
+        # Students can only search assignments of their current class
+        enrollment = StudentClassEnrollment.objects.filter(student=user, is_current=True).first()
+        if not enrollment:
+            return Response({"error": "User is not enrolled in any class."}, status=status.HTTP_400_BAD_REQUEST)
+        classlevel_id = enrollment.class_level_id
+    elif user.role not in ['teacher', 'admin']:
+        return Response({"error": "Access denied."}, status=status.HTTP_403_FORBIDDEN)
+
+    limit = min(params['limit'] or SEARCH_LIMIT, MAX_SEARCH_LIMIT)
+    results = search.search(query, classlevel_id=classlevel_id, subject_id=params['subject'], limit=limit)
+    return Response({"query": query, "count": len(results), "results": results}, status=status.HTTP_200_OK)
+
+
 @swagger_auto_schema(
     method='get',
     manual_parameters=[
@@ -256,10 +310,10 @@ def assignment_submission_edit(request, pk):
     if user.role not in ['teacher', 'admin']:
         return Response({"error": "Only teachers and admins can edit assignment submissions."}, status=status.HTTP_403_FORBIDDEN)
     
-    submission = get_object_or_404(AssignmentSubmission, pk=pk)
+    submission = get_object_or_404(AssignmentSubmission.objects.select_related('assignment'), pk=pk)
     
     # Teachers can only edit submissions for assignments they created
-    if user.role == 'teacher' and submission.assignment.teacher != user:
+    if user.role == 'teacher' and submission.assignment.teacher_id != user.id:
         return Response({"error": "You can only edit submissions for your own assignments."}, status=status.HTTP_403_FORBIDDEN)
     
     serializer = AssignmentSubmissionSerializer(submission, data=request.data, partial=True)
@@ -271,6 +325,67 @@ def assignment_submission_edit(request, pk):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@swagger_auto_schema(
+    method='post',
+    request_body=AssignmentGradeSerializer(many=True),
+    responses={200: 'Per-student grading results'}
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def assignment_submission_bulk_grade(request, assignment_id):
+    """
+    Grade many students on one assignment - Only teachers and admins.
+    Existing submissions are updated and missing ones are created, all in one transaction.
+    Every student must be currently enrolled in the assignment's class level.
+    """
+    user = request.user
+
+    if user.role not in ['teacher', 'admin']:
+        return Response({"error": "Only teachers and admins can grade assignment submissions."}, status=status.HTTP_403_FORBIDDEN)
+
+    assignment = get_object_or_404(Assignment, pk=assignment_id)
+
+    # Teachers can only grade submissions for assignments they created
+    if user.role == 'teacher' and assignment.teacher_id != user.id:
+        return Response({"error": "You can only grade submissions for your own assignments."}, status=status.HTTP_403_FORBIDDEN)
+
+    if not isinstance(request.data, list) or not request.data:
+        return Response({"error": "Send a non-empty list of grades."}, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = AssignmentGradeSerializer(data=request.data, many=True, context={'assignment': assignment})
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    student_ids = [row['student'] for row in serializer.validated_data]
+    # Read, upsert and re-read together so concurrent grading cannot skew the per-row statuses
+    with transaction.atomic():
+        existing = set(
+            AssignmentSubmission.objects.select_for_update()
+            .filter(assignment=assignment, student_id__in=student_ids)
+            .values_list('student_id', flat=True)
+        )
+        serializer.save()
+
+        submissions = {
+            submission.student_id: submission
+            for submission in AssignmentSubmission.objects.filter(assignment=assignment, student_id__in=student_ids)
+        }
+    results = [
+        {
+            "student": student_id,
+            "status": "updated" if student_id in existing else "created",
+            "submission": AssignmentSubmissionSerializer(submissions[student_id]).data,
+        }
+        for student_id in student_ids
+    ]
+    return Response({
+        "assignment": assignment.id,
+        "created": len(student_ids) - len(existing),
+        "updated": len(existing),
+        "results": results,
+    }, status=status.HTTP_200_OK)
+
+
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
 def assignment_submission_delete(request, pk):
@@ -282,11 +397,37 @@ def assignment_submission_delete(request, pk):
     if user.role not in ['teacher', 'admin']:
         return Response({"error": "Only teachers and admins can delete assignment submissions."}, status=status.HTTP_403_FORBIDDEN)
     
-    submission = get_object_or_404(AssignmentSubmission, pk=pk)
+    submission = get_object_or_404(AssignmentSubmission.objects.select_related('assignment'), pk=pk)
     
     # Teachers can only delete submissions for assignments they created
-    if user.role == 'teacher' and submission.assignment.teacher != user:
+    if user.role == 'teacher' and submission.assignment.teacher_id != user.id:
         return Response({"error": "You can only delete submissions for your own assignments."}, status=status.HTTP_403_FORBIDDEN)
     
     submission.delete()
-    return Response({"message": "Assignment submission deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+    return Response({"message": "Assignment submission deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
+
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter('subject', openapi.IN_QUERY, description="Subject ID", type=openapi.TYPE_INTEGER),
+    ],
+    responses={200: 'Assignment x student submission matrix'}
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def assignment_submission_matrix(request, classlevel_id):
+    """
+    Every assignment of a class level against every currently enrolled
+    student, with submitted/late/missing/pending status and marks (null
+    until graded) - Only teachers and admins
+    """
+    if request.user.role not in ['teacher', 'admin']:
+        return Response({"error": "Only teachers and admins can view the submission matrix."}, status=status.HTTP_403_FORBIDDEN)
+
+    subject_id = request.GET.get('subject')
+    if subject_id is not None and not subject_id.isdigit():
+        return Response({"error": "subject must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+    matrix = build_matrix(classlevel_id, int(subject_id) if subject_id else None)
+    return Response(matrix, status=status.HTTP_200_OK)
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Attendance, AuthorizedDevice
+from .models import Attendance, AuthorizedDevice, DailyAttendanceRollup, DeviceTapEvent
 
 admin.site.register(Attendance)
 admin.site.register(AuthorizedDevice)
+admin.site.register(DeviceTapEvent)
+admin.site.register(DailyAttendanceRollup)
@@ -0,0 +1,174 @@
+"""
+Async versions of the roll-call endpoints for the morning attendance spike.
+
+DRF's @api_view cannot wrap coroutines, so these are plain Django async
+views using the async ORM. They return the same payloads as their sync
+counterparts in attendance.views. They also work under WSGI, but only
+serving config.asgi:application with an ASGI server (e.g. uvicorn or daphne)
+frees workers while queries are in flight.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from account.models import CustomUser, StudentClassEnrollment
+from .models import Attendance
+from .utils import aget_authorized_device
+
+_authenticator = JWTAuthentication()
+
+
+async def _authenticate(request):
+    """Return the JWT user of the request, or None."""
+    try:
+        result = await sync_to_async(_authenticator.authenticate)(request)
+    except APIException:
+        return None
+    return result[0] if result else None
+
+
+def _request_data(request):
+    """JSON or form body as a dict, like DRF's request.data; None if malformed."""
+    if request.content_type != "application/json":
+        return request.POST
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+async def _current_enrollment(student):
+    return await StudentClassEnrollment.objects.filter(
+        student=student, is_current=True
+    ).select_related("class_level").afirst()
+
+
+@csrf_exempt
+@require_POST
+async def mark_attendance_async(request):
+    """Students mark their own attendance"""
+    user = await _authenticate(request)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided or are invalid."}, status=status.HTTP_401_UNAUTHORIZED)
+    if user.role != "student" or not user.is_active:
+        return JsonResponse({
+            "message": "Only active students can mark attendance"
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    current_enrollment = await _current_enrollment(user)
+    if not current_enrollment:
+        return JsonResponse({
+            "message": "No class enrollment found"
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    today = timezone.now().date()
+    attendance, created = await Attendance.objects.aget_or_create(
+        student=user,
+        classlevel=current_enrollment.class_level,
+        date=today,
+        defaults={"status": "present"},
+    )
+    if not created:
+        return JsonResponse({
+            "message": "You have already marked your attendance for today"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return JsonResponse({
+        "message": "Attendance marked successfully for today",
+        "date": today,
+        "status": "present"
+    }, status=status.HTTP_201_CREATED)
+
+
+@csrf_exempt
+@require_POST
+async def mark_attendance_with_status_async(request):
+    """Students mark their own attendance with specific status (present/late)"""
+    user = await _authenticate(request)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided or are invalid."}, status=status.HTTP_401_UNAUTHORIZED)
+    if user.role != "student" or not user.is_active:
+        return JsonResponse({
+            "message": "Only active students can mark attendance"
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    current_enrollment = await _current_enrollment(user)
+    if not current_enrollment:
+        return JsonResponse({
+            "message": "No class enrollment found"
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    data = _request_data(request)
+    if data is None:
+        return JsonResponse({"message": "Invalid JSON body"}, status=status.HTTP_400_BAD_REQUEST)
+    status_type = data.get('status', 'present')
+    if status_type not in ['present', 'late']:
+        return JsonResponse({
+            "message": "Status must be 'present' or 'late'"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    today = timezone.now().date()
+    attendance, created = await Attendance.objects.aget_or_create(
+        student=user,
+        classlevel=current_enrollment.class_level,
+        date=today,
+        defaults={"status": status_type},
+    )
+    if created:
+        return JsonResponse({
+            "message": f"Attendance marked as {status_type}",
+            "date": today,
+            "status": status_type
+        }, status=status.HTTP_201_CREATED)
+
+    attendance.status = status_type
+    await attendance.asave()
+    return JsonResponse({
+        "message": f"Attendance status updated to {status_type}",
+        "date": today,
+        "status": status_type
+    }, status=status.HTTP_200_OK)
+
+
+@csrf_exempt
+@require_POST
+async def mark_attendance_by_id_async(request, id):
+    """Kiosk marks a student present; same contract as mark_attendance_by_id"""
+    device_key = request.headers.get('X-DEVICE-ID')
+    if not device_key:
+        return JsonResponse({'error': 'Missing device key'}, status=status.HTTP_400_BAD_REQUEST)
+    if await aget_authorized_device(device_key) is None:
+        return JsonResponse({'error': 'Unauthorized device'}, status=status.HTTP_403_FORBIDDEN)
+
+    data = _request_data(request)
+    try:
+        student_id = int(data["student_id"])
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({"student_id": ["A valid integer is required."]}, status=status.HTTP_400_BAD_REQUEST)
+
+    student = await CustomUser.objects.filter(id=student_id, role='student').afirst()
+    if student is None:
+        return JsonResponse({"error": "Student not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    enrollment = await StudentClassEnrollment.objects.filter(student=student, is_current=True).afirst()
+    if not enrollment:
+        return JsonResponse({"error": "Student is not enrolled in any current class."}, status=status.HTTP_400_BAD_REQUEST)
+
+    today = timezone.now().date()
+    attendance, created = await Attendance.objects.aget_or_create(
+        student=student,
+        classlevel_id=enrollment.class_level_id,
+        date=today,
+        defaults={"status": "present"},
+    )
+    if not created:
+        return JsonResponse({"message": "Attendance already marked."}, status=status.HTTP_200_OK)
+    return JsonResponse({"message": "Attendance marked successfully."}, status=status.HTTP_201_CREATED)
@@ -0,0 +1,68 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class DeviceCache:
+    """
+    In-process, size-bounded TTL cache of active AuthorizedDevice rows keyed
+    by device UUID.
+
+    Each worker process holds its own copy. Signals clear it in the process
+    that changes a device; other workers pick the change up within the TTL.
+    """
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, device_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(device_id)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[device_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(device_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, device_id, device):
+        with self._lock:
+            self._entries[device_id] = (time.monotonic() + self.ttl, device)
+            self._entries.move_to_end(device_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+            }
+
+
+device_cache = DeviceCache(
+    ttl=getattr(settings, "DEVICE_CACHE_TTL", 300),
+    max_size=getattr(settings, "DEVICE_CACHE_MAX_SIZE", 1024),
+)
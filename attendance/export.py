@@ -0,0 +1,38 @@
+import csv
+import json
+
+from .models import Attendance
+from .nepali_calendar import format_bs
+
+EXPORT_COLUMNS = ["date", "nepali_date", "class_level", "student_id", "student_name", "status"]
+
+
+class Echo:
+    """File-like object whose write() hands the value back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(start, end, classlevel_id=None, chunk_size=2000):
+    """Yield attendance rows between two dates as lists in EXPORT_COLUMNS order."""
+    attendance = Attendance.objects.filter(date__range=(start, end))
+    if classlevel_id is not None:
+        attendance = attendance.filter(classlevel_id=classlevel_id)
+    rows = attendance.order_by("date", "classlevel__level", "student_id").values_list(
+        "date", "classlevel__level", "student_id", "student__full_name", "status"
+    ).iterator(chunk_size=chunk_size)
+    for day, level, student_id, student_name, status in rows:
+        yield [day.isoformat(), format_bs(day), level, student_id, student_name, status]
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + "\n"
@@ -0,0 +1,112 @@
+"""
+Compact per-student attendance calendars for a BS academic year.
+
+Each day is one of four states (see STATES) and the year is encoded either
+as a packed bitmap (2 bits per day, base64) or as run-length pairs. Encoded
+calendars are cached per student, year and encoding; ``invalidate`` drops
+them when the student's attendance changes. The default cache is local to
+each worker process and ``invalidate`` only clears the worker that made the
+change, so entries expire after ATTENDANCE_CALENDAR_CACHE_TTL seconds to
+bound how long other workers serve an old calendar.
+"""
+import base64
+from datetime import date, datetime, timedelta
+
+import nepali_datetime
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Attendance
+from .nepali_calendar import ad_to_bs
+
+STATES = {"none": 0, "present": 1, "late": 2, "absent": 3}
+ENCODINGS = ("bitmap", "rle")
+CACHE_TIMEOUT = getattr(settings, "ATTENDANCE_CALENDAR_CACHE_TTL", 300)
+
+
+def cache_key(student_id, year, encoding):
+    return f"attendance_calendar:{student_id}:{year}:{encoding}"
+
+
+def year_bounds(year):
+    """First and last AD date of a BS year."""
+    start = nepali_datetime.date(year, 1, 1).to_datetime_date()
+    if year < nepali_datetime.MAXYEAR:
+        end = nepali_datetime.date(year + 1, 1, 1).to_datetime_date() - timedelta(days=1)
+    else:
+        end = nepali_datetime.date.max.to_datetime_date()
+    return start, end
+
+
+def day_states(student_id, year):
+    """One state code per day of the BS year, from a single values_list query."""
+    start, end = year_bounds(year)
+    states = bytearray((end - start).days + 1)
+    records = Attendance.objects.filter(
+        student_id=student_id, date__range=(start, end)
+    ).values_list("date", "status")
+    for day, status in records:
+        states[(day - start).days] = STATES.get(status, STATES["none"])
+    return start, states
+
+
+def encode_bitmap(states):
+    packed = bytearray((len(states) + 3) // 4)
+    for i, state in enumerate(states):
+        packed[i // 4] |= state << (i % 4 * 2)
+    return base64.b64encode(bytes(packed)).decode("ascii")
+
+
+def encode_rle(states):
+    runs = []
+    for state in states:
+        if runs and runs[-1][0] == state:
+            runs[-1][1] += 1
+        else:
+            runs.append([state, 1])
+    return runs
+
+
+def get_calendar(student_id, year, encoding):
+    key = cache_key(student_id, year, encoding)
+    calendar = cache.get(key)
+    if calendar is None:
+        start, states = day_states(student_id, year)
+        calendar = {
+            "student_id": student_id,
+            "year": year,
+            "start_date": start.isoformat(),
+            "days": len(states),
+            "encoding": encoding,
+            "states": {code: name for name, code in STATES.items()},
+            "data": encode_bitmap(states) if encoding == "bitmap" else encode_rle(states),
+        }
+        cache.set(key, calendar, CACHE_TIMEOUT)
+    return calendar
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+
+def invalidate(pairs):
+    """
+    Drop cached calendars for the given (student_id, date) pairs once the
+    current transaction commits, so a concurrent read cannot re-cache the
+    old state.
+    """
+    keys = set()
+    for student_id, day in pairs:
+        try:
+            year = ad_to_bs(_as_date(day))[0]
+        except OverflowError:
+            # Outside the BS calendar, so no calendar can be cached for it
+            continue
+        keys.update(cache_key(student_id, year, encoding) for encoding in ENCODINGS)
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
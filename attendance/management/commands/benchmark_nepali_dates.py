@@ -0,0 +1,47 @@
+import random
+import time
+from datetime import date, timedelta
+
+import nepali_datetime
+from django.core.management.base import BaseCommand
+
+from attendance import nepali_calendar
+
+
+class Command(BaseCommand):
+    help = "Compare the precomputed AD->BS table with nepali_datetime on random dates."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=100_000, help="Number of dates to convert.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        first = date(1990, 1, 1)
+        span = (date(2040, 12, 31) - first).days
+        dates = [first + timedelta(days=rng.randrange(span)) for _ in range(options["count"])]
+
+        started = time.perf_counter()
+        nepali_calendar.ad_to_bs(first)
+        build_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        library = [
+            f"{d.year}-{d.month:02d}-{d.day:02d}"
+            for d in map(nepali_datetime.date.from_datetime_date, dates)
+        ]
+        library_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        table = [nepali_calendar.format_bs(d) for d in dates]
+        table_time = time.perf_counter() - started
+
+        if library != table:
+            self.stderr.write(self.style.ERROR("Table and library disagree."))
+            return
+
+        self.stdout.write(f"dates converted:   {len(dates)}")
+        self.stdout.write(f"table build:       {build_time * 1000:.1f} ms (once per process)")
+        self.stdout.write(f"nepali_datetime:   {library_time * 1000:.1f} ms")
+        self.stdout.write(f"precomputed table: {table_time * 1000:.1f} ms")
+        self.stdout.write(self.style.SUCCESS(f"speedup: {library_time / table_time:.1f}x"))
@@ -0,0 +1,39 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from attendance.utils import finalize_absences
+
+
+class Command(BaseCommand):
+    help = (
+        "Record an 'absent' attendance row for every currently enrolled student "
+        "without a record on the given date. Safe to rerun; schedule it after "
+        "school hours, e.g. from cron: 0 18 * * 0-5 python manage.py finalize_absences"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="Date to finalize (YYYY-MM-DD). Defaults to today.")
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Enrollments per insert batch.")
+        parser.add_argument(
+            "--all-classes",
+            action="store_true",
+            help="Also finalize classes with no attendance recorded that day (normally treated as a holiday).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            day = date.fromisoformat(options["date"]) if options["date"] else timezone.now().date()
+        except ValueError as e:
+            raise CommandError(f"Invalid date: {e}")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive")
+
+        started = time.perf_counter()
+        inserted = finalize_absences(day, chunk_size=options["chunk_size"], all_classes=options["all_classes"])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Marked {inserted} students absent on {day} in {elapsed:.2f}s."
+        ))
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import statistics
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from rest_framework_simplejwt.tokens import AccessToken
+
+from account.models import ClassLevel, CustomUser, StudentClassEnrollment
+
+ENDPOINTS = {
+    "sync": "/api/mark_attendance_with_status/",
+    "async": "/api/async/mark_attendance_with_status/",
+}
+# Seeded load test students, removed again when the run ends
+EMAIL_DOMAIN = "loadtest.invalid"
+
+
+async def _post(host, port, path, token, body):
+    """One HTTP/1.1 POST over a fresh connection; returns the status code."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(
+            f"POST {path} HTTP/1.1\r\n"
+            f"Host: {host}:{port}\r\n"
+            f"Authorization: Bearer {token}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def _run(host, port, path, tokens, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    body = json.dumps({"status": "present"}).encode()
+    latencies = []
+    statuses = Counter()
+
+    async def client(i):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                code = await _post(host, port, path, tokens[i % len(tokens)], body)
+            except (OSError, asyncio.IncompleteReadError, IndexError, ValueError):
+                code = "error"
+            latencies.append(time.perf_counter() - started)
+            statuses[code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(total)))
+    return time.perf_counter() - started, latencies, statuses
+
+
+def _seed_students(modes, count):
+    """
+    Create a class level of its own and ``count`` enrolled students per mode,
+    so each pass marks fresh students and no real attendance is touched.
+    """
+    level = (ClassLevel.objects.aggregate(level=Max("level"))["level"] or 0) + 1000
+    classlevel = ClassLevel.objects.create(level=level)
+    password = make_password(None)
+    students = {}
+    for mode in modes:
+        emails = [f"{mode}-{i}@{EMAIL_DOMAIN}" for i in range(count)]
+        CustomUser.objects.bulk_create(
+            CustomUser(email=email, full_name=f"Load test {mode} {i}", role="student", password=password)
+            for i, email in enumerate(emails)
+        )
+        # bulk_create does not return primary keys on every backend
+        students[mode] = list(CustomUser.objects.filter(email__in=emails))
+        StudentClassEnrollment.objects.bulk_create(
+            StudentClassEnrollment(student=student, class_level=classlevel, is_current=True)
+            for student in students[mode]
+        )
+    return classlevel, students
+
+
+def _remove_students(classlevel):
+    # Deleting the students cascades to their attendance and enrollments,
+    # and the class level to its attendance rollups
+    CustomUser.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").delete()
+    if classlevel is not None:
+        classlevel.delete()
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the sync and async student roll-call endpoints of a running "
+        "server and report throughput and latency percentiles for each. The "
+        "server must use the same database: the command seeds its own students "
+        "there and deletes them, with their attendance, when it finishes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of the running server.")
+        parser.add_argument("--concurrency", type=int, default=500, help="Concurrent clients.")
+        parser.add_argument("--requests", type=int, default=5000, help="Requests per endpoint.")
+        parser.add_argument("--students", type=int, default=500, help="Students to seed for each endpoint.")
+        parser.add_argument("--mode", choices=["sync", "async", "both"], default="both")
+
+    def handle(self, *args, **options):
+        url = urlsplit(options["url"])
+        if url.scheme != "http" or not url.hostname:
+            raise CommandError("--url must be a plain http:// URL")
+        host, port = url.hostname, url.port or 80
+        prefix = url.path.rstrip("/")
+
+        modes = ["sync", "async"] if options["mode"] == "both" else [options["mode"]]
+        if options["students"] < 1:
+            raise CommandError("--students must be at least 1.")
+
+        # Each endpoint gets its own students, so both passes take the same
+        # "first tap of the day" path instead of the second finding rows the
+        # first one wrote
+        _remove_students(None)
+        classlevel = None
+        try:
+            classlevel, students = _seed_students(modes, options["students"])
+            self.stdout.write(
+                f"{options['requests']} requests per endpoint, {options['concurrency']} concurrent clients, "
+                f"{options['students']} seeded students per endpoint"
+            )
+            for mode in modes:
+                tokens = [str(AccessToken.for_user(student)) for student in students[mode]]
+                elapsed, latencies, statuses = asyncio.run(_run(
+                    host, port, prefix + ENDPOINTS[mode], tokens, options["requests"], options["concurrency"]
+                ))
+                latencies.sort()
+                p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+                self.stdout.write(self.style.SUCCESS(f"{mode:>5} {ENDPOINTS[mode]}"))
+                self.stdout.write(f"      throughput: {len(latencies) / elapsed:.1f} req/s")
+                self.stdout.write(f"      p50:        {statistics.median(latencies) * 1000:.1f} ms")
+                self.stdout.write(f"      p99:        {p99 * 1000:.1f} ms")
+                self.stdout.write(f"      statuses:   {dict(statuses)}")
+                if statuses.get(401):
+                    self.stderr.write("      401 responses: is the server using this database?")
+        finally:
+            _remove_students(classlevel)
+            self.stdout.write("Removed the seeded students and their attendance.")
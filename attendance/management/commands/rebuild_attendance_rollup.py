@@ -0,0 +1,23 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance import rollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DailyAttendanceRollup table from Attendance records."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="First date to rebuild (YYYY-MM-DD). Defaults to the earliest record.")
+        parser.add_argument("--end", help="Last date to rebuild (YYYY-MM-DD). Defaults to the latest record.")
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options["start"]) if options["start"] else None
+            end = date.fromisoformat(options["end"]) if options["end"] else None
+        except ValueError as e:
+            raise CommandError(f"Invalid date: {e}")
+
+        written = rollup.rebuild(start=start, end=end)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} daily attendance rollup rows."))
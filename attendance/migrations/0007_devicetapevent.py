@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0006_alter_authorizeddevice_device_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceTapEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.UUIDField()),
+                ('student_id', models.PositiveBigIntegerField()),
+                ('captured_at', models.DateTimeField()),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('result', models.CharField(max_length=30)),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tap_events', to='attendance.authorizeddevice')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['device', 'captured_at'], name='attendance__device__c4cc8b_idx')],
+                'unique_together': {('device', 'event_id')},
+            },
+        ),
+    ]
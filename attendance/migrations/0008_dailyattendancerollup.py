@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def build_rollup(apps, schema_editor):
+    Attendance = apps.get_model('attendance', 'Attendance')
+    DailyAttendanceRollup = apps.get_model('attendance', 'DailyAttendanceRollup')
+    StudentClassEnrollment = apps.get_model('account', 'StudentClassEnrollment')
+
+    enrolled = dict(
+        StudentClassEnrollment.objects.filter(is_current=True)
+        .values('class_level_id').annotate(total=Count('id'))
+        .values_list('class_level_id', 'total')
+    )
+    rows = (
+        Attendance.objects.exclude(classlevel=None)
+        .values('classlevel_id', 'date')
+        .annotate(
+            present_count=Count('id', filter=Q(status='present')),
+            late_count=Count('id', filter=Q(status='late')),
+            absent_count=Count('id', filter=Q(status='absent')),
+        )
+        .order_by()
+    )
+    DailyAttendanceRollup.objects.bulk_create(
+        [DailyAttendanceRollup(enrolled_count=enrolled.get(row['classlevel_id'], 0), **row) for row in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0007_customuser_gender'),
+        ('attendance', '0007_devicetapevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyAttendanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('present_count', models.PositiveIntegerField(default=0)),
+                ('late_count', models.PositiveIntegerField(default=0)),
+                ('absent_count', models.PositiveIntegerField(default=0)),
+                ('enrolled_count', models.PositiveIntegerField(default=0)),
+                ('classlevel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to='account.classlevel')),
+            ],
+            options={
+                'unique_together': {('classlevel', 'date')},
+            },
+        ),
+        migrations.RunPython(build_rollup, migrations.RunPython.noop),
+    ]
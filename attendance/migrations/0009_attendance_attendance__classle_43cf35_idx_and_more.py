@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0007_customuser_gender'),
+        ('attendance', '0008_dailyattendancerollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['classlevel', 'date', 'status'], name='attendance__classle_43cf35_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date'], name='attendance__date_61f2e1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyattendancerollup',
+            index=models.Index(fields=['date'], name='attendance__date_20f1bc_idx'),
+        ),
+    ]
@@ -15,12 +15,33 @@ class Attendance(models.Model):
 
     class Meta:
         unique_together = ('student', 'classlevel', 'date')
+        indexes = [
+            models.Index(fields=['classlevel', 'date', 'status']),
+            models.Index(fields=['date']),
+        ]
     
     def __str__(self):
         return f"{self.student.full_name} {self.classlevel.level}on date {self.date}"
     
 
 
+class DailyAttendanceRollup(models.Model):
+    """Per-class daily attendance counts, kept in step with Attendance by attendance.rollup."""
+    classlevel = models.ForeignKey(ClassLevel, on_delete=models.CASCADE, related_name="attendance_rollups")
+    date = models.DateField()
+    present_count = models.PositiveIntegerField(default=0)
+    late_count = models.PositiveIntegerField(default=0)
+    absent_count = models.PositiveIntegerField(default=0)
+    enrolled_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('classlevel', 'date')
+        indexes = [models.Index(fields=['date'])]
+
+    def __str__(self):
+        return f"Class {self.classlevel.level} on {self.date}: {self.present_count}/{self.enrolled_count} present"
+
+
 class AuthorizedDevice(models.Model):
     device_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=True)
     device_name = models.CharField(max_length=100)
@@ -30,4 +51,19 @@ class AuthorizedDevice(models.Model):
     def __str__(self):
         return f"{self.device_name} - {self.device_id}"
 
-    
+
+class DeviceTapEvent(models.Model):
+    """A tap uploaded from a kiosk journal, kept so replays are idempotent."""
+    device = models.ForeignKey(AuthorizedDevice, on_delete=models.CASCADE, related_name="tap_events")
+    event_id = models.UUIDField()
+    student_id = models.PositiveBigIntegerField()
+    captured_at = models.DateTimeField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    result = models.CharField(max_length=30)
+
+    class Meta:
+        unique_together = ('device', 'event_id')
+        indexes = [models.Index(fields=['device', 'captured_at'])]
+
+    def __str__(self):
+        return f"{self.device.device_name} - {self.event_id} ({self.result})"
@@ -0,0 +1,63 @@
+"""
+Precomputed AD -> BS (Bikram Sambat) conversion.
+
+``nepali_datetime.date.from_datetime_date`` walks the calendar on every call,
+which dominates serialization of long attendance histories. The table below
+maps every AD day the library supports (about 46k days) to a packed
+``year * 10000 + month * 100 + day`` integer, so a conversion is one array
+lookup. It is built on first use; dates outside the table fall back to the
+library.
+"""
+import threading
+from array import array
+
+import nepali_datetime
+
+_table = None
+_first_ordinal = None
+_lock = threading.Lock()
+
+
+def _build_table():
+    first_ordinal = nepali_datetime.date.min.to_datetime_date().toordinal()
+    end_ordinal = nepali_datetime.date.max.to_datetime_date().toordinal() + 1
+
+    # Start ordinal of every BS month, plus the end of the supported range
+    month_starts = [
+        (year, month, nepali_datetime.date(year, month, 1).to_datetime_date().toordinal())
+        for year in range(nepali_datetime.MINYEAR, nepali_datetime.MAXYEAR + 1)
+        for month in range(1, 13)
+    ]
+    boundaries = [start for _, _, start in month_starts[1:]] + [end_ordinal]
+
+    table = array("I")
+    for (year, month, start), end in zip(month_starts, boundaries):
+        packed = year * 10000 + month * 100
+        table.extend(range(packed + 1, packed + 1 + end - start))
+    return first_ordinal, table
+
+
+def _get_table():
+    global _table, _first_ordinal
+    if _table is None:
+        with _lock:
+            if _table is None:
+                _first_ordinal, _table = _build_table()
+    return _first_ordinal, _table
+
+
+def ad_to_bs(ad_date):
+    """Return the BS ``(year, month, day)`` for an AD ``date``."""
+    first_ordinal, table = _get_table()
+    index = ad_date.toordinal() - first_ordinal
+    if 0 <= index < len(table):
+        packed = table[index]
+        return packed // 10000, packed // 100 % 100, packed % 100
+    bs_date = nepali_datetime.date.from_datetime_date(ad_date)
+    return bs_date.year, bs_date.month, bs_date.day
+
+
+def format_bs(ad_date):
+    """Return the BS date for an AD ``date`` as ``YYYY-MM-DD``."""
+    year, month, day = ad_to_bs(ad_date)
+    return f"{year}-{month:02d}-{day:02d}"
@@ -0,0 +1,128 @@
+"""
+Maintenance of DailyAttendanceRollup.
+
+Single-row changes to Attendance are applied incrementally by the signal
+handlers in attendance.signals via ``apply_delta``. Bulk writes, which skip
+signals, call ``refresh`` for the (class level, date) pairs they touched, and
+``rebuild`` recomputes a whole date range from scratch.
+"""
+from django.db import connection, transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Greatest
+
+from account.models import StudentClassEnrollment
+from .models import Attendance, DailyAttendanceRollup
+
+STATUS_FIELDS = {
+    "present": "present_count",
+    "late": "late_count",
+    "absent": "absent_count",
+}
+
+
+def enrolled_counts(classlevel_ids=None):
+    """Current enrollment count per class level id."""
+    enrollments = StudentClassEnrollment.objects.filter(is_current=True)
+    if classlevel_ids is not None:
+        enrollments = enrollments.filter(class_level_id__in=classlevel_ids)
+    return dict(
+        enrollments.values("class_level_id")
+        .annotate(total=Count("id"))
+        .values_list("class_level_id", "total")
+    )
+
+
+def apply_delta(classlevel_id, date, status, delta):
+    """Add ``delta`` to the counter for ``status`` on one class level and day."""
+    field = STATUS_FIELDS.get(status)
+    if classlevel_id is None or field is None:
+        return
+    with transaction.atomic():
+        rollup, created = DailyAttendanceRollup.objects.get_or_create(
+            classlevel_id=classlevel_id,
+            date=date,
+            defaults={
+                "enrolled_count": enrolled_counts([classlevel_id]).get(classlevel_id, 0),
+                field: max(delta, 0),
+            },
+        )
+        if not created:
+            DailyAttendanceRollup.objects.filter(pk=rollup.pk).update(
+                **{field: Greatest(F(field) + delta, Value(0))}
+            )
+
+
+def _grouped_counts(attendance):
+    return attendance.exclude(classlevel=None).values("classlevel_id", "date").annotate(
+        present_count=Count("id", filter=Q(status="present")),
+        late_count=Count("id", filter=Q(status="late")),
+        absent_count=Count("id", filter=Q(status="absent")),
+    )
+
+
+@transaction.atomic
+def refresh(pairs):
+    """Recompute the rollup rows for the given (classlevel_id, date) pairs."""
+    pairs = {(classlevel_id, date) for classlevel_id, date in pairs if classlevel_id is not None}
+    if not pairs:
+        return
+    classlevel_ids = {classlevel_id for classlevel_id, _ in pairs}
+    dates = {date for _, date in pairs}
+
+    counts = {
+        (row["classlevel_id"], row["date"]): row
+        for row in _grouped_counts(
+            Attendance.objects.filter(classlevel_id__in=classlevel_ids, date__in=dates)
+        )
+    }
+    enrolled = enrolled_counts(classlevel_ids)
+
+    rollups = []
+    for classlevel_id, date in pairs:
+        row = counts.get((classlevel_id, date), {})
+        rollups.append(DailyAttendanceRollup(
+            classlevel_id=classlevel_id,
+            date=date,
+            present_count=row.get("present_count", 0),
+            late_count=row.get("late_count", 0),
+            absent_count=row.get("absent_count", 0),
+            enrolled_count=enrolled.get(classlevel_id, 0),
+        ))
+    # enrolled_count is a snapshot taken when the day's row is first created
+    DailyAttendanceRollup.objects.bulk_create(
+        rollups,
+        update_conflicts=True,
+        # MySQL upserts on any unique key and rejects an explicit target
+        unique_fields=(
+            ["classlevel", "date"]
+            if connection.features.supports_update_conflicts_with_target else None
+        ),
+        update_fields=["present_count", "late_count", "absent_count"],
+    )
+
+
+@transaction.atomic
+def rebuild(start=None, end=None, batch_size=1000):
+    """
+    Drop and recompute every rollup row between ``start`` and ``end``
+    (inclusive, either may be None). Historical enrollment is not recorded,
+    so rebuilt rows take the current enrollment count. Returns the number of
+    rows written.
+    """
+    attendance = Attendance.objects.all()
+    rollups = DailyAttendanceRollup.objects.all()
+    if start is not None:
+        attendance = attendance.filter(date__gte=start)
+        rollups = rollups.filter(date__gte=start)
+    if end is not None:
+        attendance = attendance.filter(date__lte=end)
+        rollups = rollups.filter(date__lte=end)
+    rollups.delete()
+
+    enrolled = enrolled_counts()
+    rows = [
+        DailyAttendanceRollup(enrolled_count=enrolled.get(row["classlevel_id"], 0), **row)
+        for row in _grouped_counts(attendance).order_by()
+    ]
+    DailyAttendanceRollup.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
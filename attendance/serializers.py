@@ -6,6 +6,7 @@ from .models import Attendance
 import nepali_datetime
 from account.models import ClassLevel, ClassSubject, Subject
 from account.models import CustomUser
+from .nepali_calendar import format_bs
 
 class AttendanceSerializer(serializers.ModelSerializer):
     nepali_date = serializers.SerializerMethodField()
@@ -15,9 +16,7 @@ class AttendanceSerializer(serializers.ModelSerializer):
         fields = ['nepali_date', 'status']
 
     def get_nepali_date(self, obj):
-        ad_date = obj.date
-        bs_date = nepali_datetime.date.from_datetime_date(ad_date)
-        return f"{bs_date.year}-{bs_date.month:02d}-{bs_date.day:02d}"
+        return format_bs(obj.date)
     
 
 class ClassLevelSerializer(serializers.ModelSerializer):
@@ -47,5 +46,22 @@ class StudentSerializer(serializers.ModelSerializer):
 
 class MarkAttendanceSerializer(serializers.Serializer):
     student_id = serializers.IntegerField()
-        
 
+
+class TapSerializer(serializers.Serializer):
+    student_id = serializers.IntegerField()
+    timestamp = serializers.DateTimeField(required=False)
+
+
+class BatchAttendanceSerializer(serializers.Serializer):
+    taps = TapSerializer(many=True, allow_empty=False, max_length=1000)
+
+
+class TapEventSerializer(serializers.Serializer):
+    event_id = serializers.UUIDField()
+    student_id = serializers.IntegerField(min_value=1)
+    captured_at = serializers.DateTimeField()
+
+
+class DeviceSyncSerializer(serializers.Serializer):
+    events = TapEventSerializer(many=True, max_length=1000)
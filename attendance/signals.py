@@ -0,0 +1,46 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import heatmap, rollup
+from .device_cache import device_cache
+from .models import Attendance, AuthorizedDevice
+
+
+@receiver(post_save, sender=AuthorizedDevice)
+@receiver(post_delete, sender=AuthorizedDevice)
+def invalidate_device_cache(sender, instance, **kwargs):
+    # device_id is editable, so the old key may differ from instance.device_id;
+    # devices change rarely enough that dropping every entry is the simple fix.
+    device_cache.clear()
+
+
+@receiver(pre_save, sender=Attendance)
+def remember_previous_attendance(sender, instance, **kwargs):
+    instance._rollup_previous = None
+    if not instance._state.adding and instance.pk is not None:
+        instance._rollup_previous = (
+            Attendance.objects.filter(pk=instance.pk)
+            .values_list("classlevel_id", "date", "status")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Attendance)
+def update_rollup_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    current = (instance.classlevel_id, instance.date, instance.status)
+    previous = getattr(instance, "_rollup_previous", None)
+    if previous == current:
+        return
+    if previous is not None:
+        rollup.apply_delta(*previous, -1)
+        heatmap.invalidate([(instance.student_id, previous[1])])
+    rollup.apply_delta(*current, 1)
+    heatmap.invalidate([(instance.student_id, instance.date)])
+
+
+@receiver(post_delete, sender=Attendance)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    rollup.apply_delta(instance.classlevel_id, instance.date, instance.status, -1)
+    heatmap.invalidate([(instance.student_id, instance.date)])
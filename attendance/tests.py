@@ -1,3 +1,639 @@
-from django.test import TestCase
+import base64
+import json
+import uuid
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import nepali_datetime
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.test import AsyncClient, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from account.models import ClassLevel, CustomUser, StudentClassEnrollment
+from config.testing import QueryPlanMixin
+from . import heatmap, rollup
+from .device_cache import DeviceCache, device_cache
+from .models import Attendance, AuthorizedDevice, DailyAttendanceRollup
+from .nepali_calendar import ad_to_bs, format_bs
+from .serializers import AttendanceSerializer
+from .utils import finalize_absences, get_authorized_device, record_taps
+
+
+class AttendanceTestMixin:
+    """Shared fixtures for the attendance API tests."""
+
+    def create_student(self, classlevel, index):
+        student = CustomUser.objects.create_user(
+            email=f"student{classlevel.level}-{index}@example.com",
+            full_name=f"Student {index}",
+            role="student",
+        )
+        StudentClassEnrollment.objects.create(student=student, class_level=classlevel, is_current=True)
+        return student
+
+    def create_attendance(self, student, classlevel, days, start=date(2024, 1, 1)):
+        statuses = ["present", "late", "absent"]
+        for i in range(days):
+            Attendance.objects.create(
+                student=student,
+                classlevel=classlevel,
+                date=start + timedelta(days=i),
+                status=statuses[i % len(statuses)],
+            )
+
+
+class StudentAttendanceTests(AttendanceTestMixin, TestCase):
+
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user(
+            email="teacher@example.com", full_name="Teacher", role="teacher"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def fetch_roster(self, classlevel):
+        url = reverse("student_attendance", args=[classlevel.id])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_roster_statistics_and_recent_attendance(self):
+        classlevel = ClassLevel.objects.create(level=1)
+        student = self.create_student(classlevel, 0)
+        self.create_attendance(student, classlevel, days=7)
+        idle = self.create_student(classlevel, 1)
+
+        response, _ = self.fetch_roster(classlevel)
+
+        rows = {row["student_id"]: row for row in response.data["data"]}
+        self.assertEqual(response.data["class_level"], 1)
+        self.assertEqual(rows[student.id]["total_days"], 7)
+        self.assertEqual(rows[student.id]["present_days"], 3)
+        self.assertEqual(rows[student.id]["late_days"], 2)
+        self.assertEqual(rows[student.id]["absent_days"], 2)
+        self.assertEqual(rows[student.id]["attendance_percentage"], 42.86)
+        recent = rows[student.id]["recent_attendance"]
+        self.assertEqual(len(recent), 5)
+        self.assertEqual([r["status"] for r in recent], ["present", "absent", "late", "present", "absent"])
+        self.assertEqual(rows[idle.id]["total_days"], 0)
+        self.assertEqual(rows[idle.id]["recent_attendance"], [])
+
+    def test_query_count_does_not_grow_with_class_size(self):
+        small = ClassLevel.objects.create(level=2)
+        large = ClassLevel.objects.create(level=3)
+        for i in range(2):
+            self.create_attendance(self.create_student(small, i), small, days=3)
+        for i in range(30):
+            self.create_attendance(self.create_student(large, i), large, days=8)
+
+        small_response, small_queries = self.fetch_roster(small)
+        large_response, large_queries = self.fetch_roster(large)
+
+        self.assertEqual(len(small_response.data["data"]), 2)
+        self.assertEqual(len(large_response.data["data"]), 30)
+        self.assertEqual(small_queries, large_queries)
+        self.assertLessEqual(large_queries, 4)
+
+
+class MarkAttendanceBatchTests(AttendanceTestMixin, TestCase):
+
+    def setUp(self):
+        self.device = AuthorizedDevice.objects.create(device_name="Gate kiosk")
+        self.classlevel = ClassLevel.objects.create(level=5)
+        self.client = APIClient()
+
+    def post_batch(self, taps, device_id=None):
+        return self.client.post(
+            reverse("mark_attendance_batch"),
+            {"taps": taps},
+            format="json",
+            HTTP_X_DEVICE_ID=str(device_id or self.device.device_id),
+        )
+
+    def test_batch_reports_per_student_outcomes(self):
+        first = self.create_student(self.classlevel, 0)
+        second = self.create_student(self.classlevel, 1)
+        unenrolled = CustomUser.objects.create_user(
+            email="unenrolled@example.com", full_name="Unenrolled", role="student"
+        )
+        Attendance.objects.create(student=second, classlevel=self.classlevel, date=date(2024, 3, 1))
+
+        response = self.post_batch([
+            {"student_id": first.id, "timestamp": "2024-03-01T07:55:00Z"},
+            {"student_id": first.id, "timestamp": "2024-03-01T07:56:00Z"},
+            {"student_id": second.id, "timestamp": "2024-03-01T07:57:00Z"},
+            {"student_id": unenrolled.id},
+            {"student_id": 999999},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row["result"] for row in response.data["results"]],
+            ["marked", "duplicate", "already_marked", "not_enrolled", "student_not_found"],
+        )
+        self.assertTrue(Attendance.objects.filter(student=first, date=date(2024, 3, 1)).exists())
+        self.assertEqual(Attendance.objects.count(), 2)
+
+    def test_unknown_device_is_rejected(self):
+        student = self.create_student(self.classlevel, 0)
+        response = self.post_batch([{"student_id": student.id}], device_id=uuid.uuid4())
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Attendance.objects.exists())
+
+
+class AsyncMarkAttendanceTests(AttendanceTestMixin, TestCase):
+
+    def setUp(self):
+        self.classlevel = ClassLevel.objects.create(level=6)
+        self.student = self.create_student(self.classlevel, 0)
+        self.client = AsyncClient()
+
+    def auth(self, user):
+        return {"headers": {"Authorization": f"Bearer {AccessToken.for_user(user)}"}}
+
+    async def test_self_marking_matches_sync_contract(self):
+        url = reverse("mark_attendance_async")
+        first = await self.client.post(url, **self.auth(self.student))
+        second = await self.client.post(url, **self.auth(self.student))
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(first.json()["status"], "present")
+        self.assertEqual(second.status_code, 400)
+        self.assertEqual(await Attendance.objects.filter(student=self.student).acount(), 1)
+
+    async def test_status_update_and_auth(self):
+        url = reverse("mark_attendance_with_status_async")
+        marked = await self.client.post(url, {"status": "late"}, content_type="application/json", **self.auth(self.student))
+        updated = await self.client.post(url, {"status": "present"}, content_type="application/json", **self.auth(self.student))
+        invalid = await self.client.post(url, {"status": "absent"}, content_type="application/json", **self.auth(self.student))
+        anonymous = await self.client.post(url, {"status": "late"}, content_type="application/json")
+
+        self.assertEqual((marked.status_code, updated.status_code), (201, 200))
+        self.assertEqual(invalid.status_code, 400)
+        self.assertEqual(anonymous.status_code, 401)
+        attendance = await Attendance.objects.aget(student=self.student)
+        self.assertEqual(attendance.status, "present")
+
+    async def test_kiosk_marking(self):
+        device = await AuthorizedDevice.objects.acreate(device_name="Gate kiosk")
+        url = reverse("mark_attendance_by_id_async", args=[self.student.id])
+        body = {"student_id": self.student.id}
+        marked = await self.client.post(url, body, content_type="application/json", headers={"X-Device-Id": str(device.device_id)})
+        again = await self.client.post(url, body, content_type="application/json", headers={"X-Device-Id": str(device.device_id)})
+        unknown = await self.client.post(url, body, content_type="application/json", headers={"X-Device-Id": str(uuid.uuid4())})
+
+        self.assertEqual((marked.status_code, again.status_code), (201, 200))
+        self.assertEqual(unknown.status_code, 403)
+
+
+class DeviceSyncTests(AttendanceTestMixin, TestCase):
+
+    def setUp(self):
+        self.device = AuthorizedDevice.objects.create(device_name="Library kiosk")
+        self.classlevel = ClassLevel.objects.create(level=6)
+        self.client = APIClient()
+
+    def upload(self, events):
+        return self.client.post(
+            reverse("sync_device_attendance"),
+            {"events": events},
+            format="json",
+            HTTP_X_DEVICE_ID=str(self.device.device_id),
+        )
+
+    def test_replaying_a_journal_is_idempotent(self):
+        students = [self.create_student(self.classlevel, i) for i in range(3)]
+        journal = [
+            {"event_id": str(uuid.uuid4()), "student_id": student.id, "captured_at": f"2024-04-0{day}T07:5{i}:00Z"}
+            for day in (1, 2)
+            for i, student in enumerate(students)
+        ]
+
+        first = self.upload(journal)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.data["summary"], {"applied": 6})
+        self.assertEqual(first.json()["high_water_mark"], "2024-04-02T07:52:00Z")
+
+        # The device lost the response and retries with its journal grown by one tap
+        late_tap = {"event_id": str(uuid.uuid4()), "student_id": students[0].id, "captured_at": "2024-04-03T08:10:00Z"}
+        journal.append(late_tap)
+        for _ in range(3):
+            replay = self.upload(journal)
+            self.assertEqual(replay.status_code, 200)
+            self.assertEqual(replay.json()["high_water_mark"], "2024-04-03T08:10:00Z")
+            self.assertEqual(replay.data["results"][0]["status"], "duplicate")
+            self.assertEqual(replay.data["results"][0]["result"], "marked")
+
+        self.assertEqual(Attendance.objects.count(), 7)
+        self.assertEqual(self.device.tap_events.count(), 7)
+
+    def test_high_water_mark_only_covers_acknowledged_events(self):
+        students = [self.create_student(self.classlevel, i) for i in range(4)]
+        journal = [
+            {"event_id": str(uuid.uuid4()), "student_id": student.id, "captured_at": f"2024-04-0{i + 1}T07:50:00Z"}
+            for i, student in enumerate(students)
+        ]
+
+        # The newer half arrives first
+        later = self.upload(journal[2:])
+        self.assertEqual(later.json()["high_water_mark"], "2024-04-04T07:50:00Z")
+
+        # The older half must not be acknowledged past its own events
+        earlier = self.upload(journal[:2])
+        self.assertEqual(earlier.data["summary"], {"applied": 2})
+        self.assertEqual(earlier.json()["high_water_mark"], "2024-04-02T07:50:00Z")
+
+        # Capture times going backwards end the acknowledged run
+        mixed = self.upload([journal[1], journal[3], journal[0]])
+        self.assertEqual(mixed.data["summary"], {"duplicate": 3})
+        self.assertEqual(mixed.json()["high_water_mark"], "2024-04-04T07:50:00Z")
+        self.assertEqual(Attendance.objects.count(), 4)
+
+    def test_repeated_event_in_one_upload_is_applied_once(self):
+        student = self.create_student(self.classlevel, 0)
+        event = {"event_id": str(uuid.uuid4()), "student_id": student.id, "captured_at": "2024-04-01T07:50:00Z"}
+
+        response = self.upload([event, event])
+
+        self.assertEqual([r["status"] for r in response.data["results"]], ["applied", "duplicate"])
+        self.assertEqual(Attendance.objects.count(), 1)
+
+
+class DeviceCacheTests(TestCase):
+
+    def setUp(self):
+        device_cache.clear()
+        self.device = AuthorizedDevice.objects.create(device_name="Gate kiosk")
+
+    def test_cached_device_needs_no_query(self):
+        self.assertEqual(get_authorized_device(str(self.device.device_id)), self.device)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_authorized_device(str(self.device.device_id)), self.device)
+
+    def test_deactivating_a_device_invalidates_the_cache(self):
+        get_authorized_device(str(self.device.device_id))
+        self.device.is_active = False
+        self.device.save()
+        self.assertIsNone(get_authorized_device(str(self.device.device_id)))
+
+    def test_cache_is_size_bounded(self):
+        cache = DeviceCache(ttl=60, max_size=2)
+        for key in ("a", "b", "c"):
+            cache.set(key, key)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), "c")
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+
+class DailyAttendanceRollupTests(AttendanceTestMixin, TestCase):
+
+    def setUp(self):
+        self.classlevel = ClassLevel.objects.create(level=7)
+        self.students = [self.create_student(self.classlevel, i) for i in range(3)]
+        self.day = date(2024, 5, 1)
+
+    def counts(self):
+        row = DailyAttendanceRollup.objects.get(classlevel=self.classlevel, date=self.day)
+        return row.present_count, row.late_count, row.absent_count, row.enrolled_count
+
+    def test_rollup_follows_single_row_changes(self):
+        first = Attendance.objects.create(student=self.students[0], classlevel=self.classlevel, date=self.day)
+        Attendance.objects.create(student=self.students[1], classlevel=self.classlevel, date=self.day, status="late")
+        self.assertEqual(self.counts(), (1, 1, 0, 3))
+
+        first.status = "late"
+        first.save()
+        self.assertEqual(self.counts(), (0, 2, 0, 3))
+
+        first.delete()
+        self.assertEqual(self.counts(), (0, 1, 0, 3))
+
+    def test_bulk_taps_refresh_the_rollup(self):
+        record_taps([(student.id, self.day) for student in self.students])
+        self.assertEqual(self.counts(), (3, 0, 0, 3))
+
+    def test_rebuild_matches_incremental_maintenance(self):
+        self.create_attendance(self.students[0], self.classlevel, days=6, start=self.day)
+        self.create_attendance(self.students[1], self.classlevel, days=4, start=self.day)
+        incremental = list(DailyAttendanceRollup.objects.order_by("date").values_list(
+            "date", "present_count", "late_count", "absent_count"
+        ))
+
+        DailyAttendanceRollup.objects.all().delete()
+        call_command("rebuild_attendance_rollup", stdout=StringIO())
+
+        rebuilt = list(DailyAttendanceRollup.objects.order_by("date").values_list(
+            "date", "present_count", "late_count", "absent_count"
+        ))
+        self.assertEqual(rebuilt, incremental)
+        self.assertEqual(len(rebuilt), 6)
+
+
+class NepaliCalendarTests(TestCase):
+
+    def test_table_matches_library_over_supported_range(self):
+        first = nepali_datetime.date.min.to_datetime_date()
+        last = nepali_datetime.date.max.to_datetime_date()
+        day = first
+        while day <= last:
+            bs_date = nepali_datetime.date.from_datetime_date(day)
+            self.assertEqual(ad_to_bs(day), (bs_date.year, bs_date.month, bs_date.day), day)
+            day += timedelta(days=1)
+
+    def test_dates_outside_table_fall_back_to_library(self):
+        before = nepali_datetime.date.min.to_datetime_date() - timedelta(days=1)
+        with self.assertRaises(OverflowError):
+            format_bs(before)
+        self.assertEqual(format_bs(date(2024, 1, 15)), "2080-10-01")
+
+
+class FinalizeAbsencesTests(AttendanceTestMixin, TestCase):
+
+    def setUp(self):
+        self.day = date(2024, 6, 3)
+        self.classlevel = ClassLevel.objects.create(level=8)
+        self.students = [self.create_student(self.classlevel, i) for i in range(5)]
+        self.holiday_class = ClassLevel.objects.create(level=9)
+        self.create_student(self.holiday_class, 0)
+        Attendance.objects.create(student=self.students[0], classlevel=self.classlevel, date=self.day)
+
+    def test_marks_missing_students_absent_once(self):
+        inserted = finalize_absences(self.day, chunk_size=2)
+        self.assertEqual(inserted, 4)
+        self.assertEqual(finalize_absences(self.day, chunk_size=2), 0)
+
+        statuses = dict(Attendance.objects.filter(date=self.day).values_list("student_id", "status"))
+        self.assertEqual(statuses[self.students[0].id], "present")
+        self.assertEqual(sorted(statuses.values()), ["absent"] * 4 + ["present"])
+        rollup = DailyAttendanceRollup.objects.get(classlevel=self.classlevel, date=self.day)
+        self.assertEqual((rollup.present_count, rollup.absent_count), (1, 4))
+
+    def test_counts_only_rows_actually_inserted(self):
+        atomic = transaction.atomic
+        late_taps = [self.students[1]]
+
+        def tap_first(*args, **kwargs):
+            # A late tap lands after the anti-join read, before the insert
+            if late_taps:
+                Attendance.objects.create(student=late_taps.pop(), classlevel=self.classlevel, date=self.day)
+            return atomic(*args, **kwargs)
+
+        with mock.patch("attendance.utils.transaction.atomic", side_effect=tap_first):
+            inserted = finalize_absences(self.day)
+
+        self.assertEqual(inserted, 3)
+        self.assertEqual(Attendance.objects.filter(date=self.day, status="absent").count(), 3)
+
+    def test_classes_without_attendance_need_all_classes(self):
+        finalize_absences(self.day)
+        self.assertFalse(Attendance.objects.filter(classlevel=self.holiday_class).exists())
+
+        call_command("finalize_absences", "--date", "2024-06-03", "--all-classes", stdout=StringIO())
+        self.assertEqual(Attendance.objects.filter(classlevel=self.holiday_class, status="absent").count(), 1)
+
+
+class LoadTestCommandTests(TestCase):
+
+    def test_seeded_students_are_removed_after_the_run(self):
+        classlevels = ClassLevel.objects.count()
+        out = StringIO()
+
+        # Nothing listens on the discard port, so every request fails fast
+        call_command(
+            "loadtest_attendance", "--url", "http://127.0.0.1:9", "--requests", "4",
+            "--students", "2", "--concurrency", "2", stdout=out, stderr=StringIO(),
+        )
+
+        self.assertIn("4 requests per endpoint, 2 concurrent clients, 2 seeded students per endpoint", out.getvalue())
+        self.assertEqual(out.getvalue().count("statuses:   {'error': 4}"), 2)
+        self.assertFalse(CustomUser.objects.filter(email__endswith="@loadtest.invalid").exists())
+        self.assertEqual(ClassLevel.objects.count(), classlevels)
+
+
+class StudentAttendanceReportTests(AttendanceTestMixin, TestCase):
+
+    def setUp(self):
+        self.classlevel = ClassLevel.objects.create(level=10)
+        self.student = self.create_student(self.classlevel, 0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def test_monthly_breakdown_keeps_years_apart(self):
+        records = [
+            (date(2023, 1, 10), "present"),
+            (date(2023, 1, 11), "late"),
+            (date(2023, 2, 1), "absent"),
+            (date(2024, 1, 10), "present"),
+            (date(2024, 1, 12), "present"),
+        ]
+        for day, status in records:
+            Attendance.objects.create(student=self.student, classlevel=self.classlevel, date=day, status=status)
+
+        response = self.client.get(reverse("student_attendance_report", args=[self.student.id]))
+
+        self.assertEqual(response.status_code, 200)
+        report = response.data["data"]
+        self.assertEqual(report["monthly_breakdown"], [
+            {"year": 2023, "month": 1, "total": 2, "present": 1, "absent": 0, "late": 1},
+            {"year": 2023, "month": 2, "total": 1, "present": 0, "absent": 1, "late": 0},
+            {"year": 2024, "month": 1, "total": 2, "present": 2, "absent": 0, "late": 0},
+        ])
+        self.assertEqual(report["statistics"], {
+            "total_days": 5,
+            "present_days": 3,
+            "absent_days": 1,
+            "late_days": 1,
+            "attendance_percentage": 60.0,
+        })
+        self.assertEqual(len(report["recent_attendance"]), 5)
+
+    def test_report_query_count_is_constant(self):
+        self.create_attendance(self.student, self.classlevel, days=90)
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse("student_attendance_report", args=[self.student.id]))
+        self.assertEqual(len(response.data["data"]["monthly_breakdown"]), 3)
+
+
+class ExportAttendanceTests(AttendanceTestMixin, TestCase):
+
+    def setUp(self):
+        self.classlevel = ClassLevel.objects.create(level=11)
+        self.other_class = ClassLevel.objects.create(level=12)
+        self.student = self.create_student(self.classlevel, 0)
+        self.create_attendance(self.student, self.classlevel, days=3, start=date(2024, 1, 14))
+        self.create_attendance(self.create_student(self.other_class, 0), self.other_class, days=1, start=date(2024, 1, 15))
+        teacher = CustomUser.objects.create_user(email="exporter@example.com", full_name="Teacher", role="teacher")
+        self.client = APIClient()
+        self.client.force_authenticate(teacher)
+
+    def export(self, **params):
+        response = self.client.get(reverse("export_attendance"), params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_export_for_one_class(self):
+        content = self.export(start="2024-01-15", end="2024-01-31", classlevel=self.classlevel.id)
+        self.assertEqual(content.splitlines(), [
+            "date,nepali_date,class_level,student_id,student_name,status",
+            f"2024-01-15,2080-10-01,11,{self.student.id},Student 0,late",
+            f"2024-01-16,2080-10-02,11,{self.student.id},Student 0,absent",
+        ])
+
+    def test_ndjson_export_for_all_classes(self):
+        content = self.export(start="2024-01-15", end="2024-01-15", export_format="ndjson")
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row["class_level"] for row in rows], [11, 12])
+        self.assertEqual(rows[0]["nepali_date"], "2080-10-01")
+
+    def test_invalid_range_is_rejected(self):
+        response = self.client.get(reverse("export_attendance"), {"start": "2024-02-01", "end": "2024-01-01"})
+        self.assertEqual(response.status_code, 400)
+
+
+class AttendanceCalendarTests(AttendanceTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.classlevel = ClassLevel.objects.create(level=4)
+        self.student = self.create_student(self.classlevel, 0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        # BS 2080 starts on 2023-04-14
+        self.create_attendance(self.student, self.classlevel, days=200, start=date(2023, 4, 14))
+
+    def fetch(self, **params):
+        response = self.client.get(
+            reverse("student_attendance_calendar", args=[self.student.id]), {"year": 2080, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_bitmap_round_trips_and_is_compact(self):
+        response = self.fetch()
+        packed = base64.b64decode(response.data["data"])
+        states = [packed[i // 4] >> (i % 4 * 2) & 3 for i in range(response.data["days"])]
+
+        self.assertEqual(response.data["start_date"], "2023-04-14")
+        self.assertEqual(states[:4], [1, 2, 3, 1])
+        self.assertEqual(states[200:], [0] * (response.data["days"] - 200))
+
+        records = Attendance.objects.filter(student=self.student).order_by("date")
+        json_list = JSONRenderer().render(AttendanceSerializer(records, many=True).data)
+        self.assertLess(len(response.content) * 10, len(json_list))
+
+    def test_rle_encoding(self):
+        runs = self.fetch(encoding="rle").data["data"]
+        self.assertEqual(runs[:3], [[1, 1], [2, 1], [3, 1]])
+        self.assertEqual(sum(length for _, length in runs), 365)
+
+    def test_cached_calendar_is_invalidated_on_change(self):
+        self.fetch()
+        with self.assertNumQueries(0):
+            self.fetch()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.filter(student=self.student, date=date(2023, 4, 14)).get().delete()
+
+        packed = base64.b64decode(self.fetch().data["data"])
+        self.assertEqual(packed[0] & 3, 0)
+
+    def test_cached_calendar_expires(self):
+        # Other worker processes are not invalidated, so their entries must expire
+        with mock.patch.object(heatmap.cache, "set", wraps=heatmap.cache.set) as cache_set:
+            self.fetch()
+        self.assertEqual(cache_set.call_args.args[2], settings.ATTENDANCE_CALENDAR_CACHE_TTL)
+
+
+class QueryPlanTests(QueryPlanMixin, TestCase):
+    """
+    EXPLAIN the querysets behind the hot attendance and dashboard endpoints
+    against a seeded dataset and fail on full table scans.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.classes = ClassLevel.objects.bulk_create(ClassLevel(level=level) for level in range(1, 11))
+        students = CustomUser.objects.bulk_create(
+            CustomUser(email=f"plan{i}@example.com", full_name=f"Student {i}", role="student")
+            for i in range(400)
+        )
+        cls.student = students[0]
+        cls.day = date(2024, 3, 1)
+
+        statuses = ["present", "present", "present", "late", "absent"]
+        enrollments, attendance = [], []
+        for i, student in enumerate(students):
+            classlevel = cls.classes[i % len(cls.classes)]
+            enrollments.append(StudentClassEnrollment(student=student, class_level=classlevel, is_current=True))
+            if classlevel.level > 1:
+                # Last year's class, as left behind by promotion
+                enrollments.append(StudentClassEnrollment(
+                    student=student, class_level=cls.classes[classlevel.level - 2], is_current=False
+                ))
+            attendance.extend(
+                Attendance(student=student, classlevel=classlevel, date=cls.day - timedelta(days=d),
+                           status=statuses[(i + d) % len(statuses)])
+                for d in range(60)
+            )
+        StudentClassEnrollment.objects.bulk_create(enrollments)
+        Attendance.objects.bulk_create(attendance, batch_size=2000)
+        rollup.rebuild()
+
+        # Give the planner the statistics a production database would have
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                cursor.execute("ANALYZE")
+            elif connection.vendor == "mysql":
+                for model in (Attendance, DailyAttendanceRollup, StudentClassEnrollment):
+                    cursor.execute(f"ANALYZE TABLE {model._meta.db_table}")
+
+    def test_roll_call_lookups(self):
+        classlevel = self.classes[0]
+        self.assertIndexed(
+            StudentClassEnrollment.objects.filter(student=self.student, is_current=True), "student_id"
+        )
+        self.assertIndexed(
+            Attendance.objects.filter(student=self.student, classlevel=classlevel, date=self.day),
+            "student_id", "classlevel_id", "date",
+        )
+
+    def test_class_roster_and_daily_summary(self):
+        classlevel = self.classes[0]
+        enrollments = StudentClassEnrollment.objects.filter(class_level=classlevel, is_current=True)
+        self.assertIndexed(enrollments, "class_level_id")
+        self.assertNoFullScan(
+            Attendance.objects.filter(classlevel=classlevel, student_id__in=enrollments.values("student_id"))
+            .values("student_id").annotate(present=Count("id", filter=Q(status="present")))
+        )
+        self.assertIndexed(
+            Attendance.objects.filter(classlevel=classlevel, date=self.day, status="absent"),
+            "classlevel_id", "date", "status",
+        )
+
+    def test_student_report_and_export(self):
+        start = self.day - timedelta(days=30)
+        self.assertIndexed(
+            Attendance.objects.filter(student=self.student, classlevel=self.classes[0]).order_by("-date"),
+            "student_id", "classlevel_id",
+        )
+        self.assertIndexed(Attendance.objects.filter(student=self.student, date__range=(start, self.day)), "student_id")
+        self.assertIndexed(
+            Attendance.objects.filter(date__range=(start, self.day)).order_by("date", "student_id"), "date"
+        )
+        # Either the date index or a covering skip-scan of (classlevel, date, status) is fine
+        self.assertNoFullScan(Attendance.objects.filter(date=self.day).values("classlevel_id"))
+
+    def test_dashboard_trend(self):
+        self.assertIndexed(
+            DailyAttendanceRollup.objects.filter(date__range=(self.day - timedelta(days=6), self.day)), "date"
+        )
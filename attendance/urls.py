@@ -7,6 +7,11 @@ from .views import (
     get_student_by_class,
     get_attendance_detail_by_id,
     mark_attendance_by_id,
+    mark_attendance_batch,
+    sync_device_attendance,
+    device_cache_stats,
+    export_attendance,
+    student_attendance_calendar,
     # Enhanced attendance views (student-centric)
     student_attendance,
     mark_attendance_with_status,
@@ -15,6 +20,11 @@ from .views import (
     get_attendance_summary_by_class,
     mark_attendance_by_admin
 )
+from .async_views import (
+    mark_attendance_async,
+    mark_attendance_with_status_async,
+    mark_attendance_by_id_async,
+)
 
 
 urlpatterns = [
@@ -26,6 +36,11 @@ urlpatterns = [
     path("api/get_student_by_class/<int:classlevel>", get_student_by_class, name="get_student_by_class"),
     path("api/get_attendance_detail_by_id/<int:id>/",get_attendance_detail_by_id,name="get_attendance_detail_by_id"),
     path("api/mark_attendance_by_id/<int:id>/", mark_attendance_by_id, name="mark_attendance_by_id"),
+    path("api/mark_attendance_batch/", mark_attendance_batch, name="mark_attendance_batch"),
+    path("api/device_sync/", sync_device_attendance, name="sync_device_attendance"),
+    path("api/device_cache_stats/", device_cache_stats, name="device_cache_stats"),
+    path("api/attendance_export/", export_attendance, name="export_attendance"),
+    path("api/attendance_calendar/<int:student_id>/", student_attendance_calendar, name="student_attendance_calendar"),
     
     # Enhanced student-centric attendance URLs
     path("api/student_attendance/<int:classlevel>/", student_attendance, name="student_attendance"),
@@ -35,5 +50,10 @@ urlpatterns = [
     path("api/student_attendance_report/<int:student_id>/", student_attendance_report, name="student_attendance_report"),
     path("api/get_attendance_summary/<int:classlevel>", get_attendance_summary_by_class, name="get_summary"),
     path("api/mark_attendance_by_admin/<int:student_id>", mark_attendance_by_admin, name="mark_attendance_by_admin"),
+
+    # Async roll-call endpoints, served without blocking under ASGI (config.asgi)
+    path("api/async/mark_attendance/", mark_attendance_async, name="mark_attendance_async"),
+    path("api/async/mark_attendance_with_status/", mark_attendance_with_status_async, name="mark_attendance_with_status_async"),
+    path("api/async/mark_attendance_by_id/<int:id>/", mark_attendance_by_id_async, name="mark_attendance_by_id_async"),
     
 ]
\ No newline at end of file
@@ -0,0 +1,225 @@
+import uuid
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from account.models import CustomUser, StudentClassEnrollment
+from . import heatmap, rollup
+from .device_cache import device_cache
+from .models import Attendance, AuthorizedDevice, DeviceTapEvent
+
+
+def get_authorized_device(device_key):
+    """
+    Return the active AuthorizedDevice for an X-DEVICE-ID value, or None.
+
+    Known devices are served from the in-process device cache, so the kiosk
+    hot path does not touch the database.
+    """
+    try:
+        device_id = uuid.UUID(str(device_key))
+    except ValueError:
+        return None
+
+    device = device_cache.get(device_id)
+    if device is None:
+        try:
+            device = AuthorizedDevice.objects.get(device_id=device_id, is_active=True)
+        except AuthorizedDevice.DoesNotExist:
+            return None
+        device_cache.set(device_id, device)
+    return device
+
+
+async def aget_authorized_device(device_key):
+    """Async counterpart of ``get_authorized_device`` for the ASGI views."""
+    try:
+        device_id = uuid.UUID(str(device_key))
+    except ValueError:
+        return None
+
+    device = device_cache.get(device_id)
+    if device is None:
+        device = await AuthorizedDevice.objects.filter(device_id=device_id, is_active=True).afirst()
+        if device is None:
+            return None
+        device_cache.set(device_id, device)
+    return device
+
+
+@transaction.atomic
+def record_taps(taps):
+    """
+    Mark many students present in bulk.
+
+    ``taps`` is a sequence of ``(student_id, date)`` pairs. Students and their
+    current enrollments are resolved with one query each, already-marked days
+    with a third, and the new rows are written with a single bulk insert, all
+    in one transaction.
+    Returns one outcome per tap, in input order: ``marked``, ``already_marked``,
+    ``duplicate`` (repeated earlier in the same batch), ``student_not_found``
+    or ``not_enrolled``.
+    """
+    student_ids = {student_id for student_id, _ in taps}
+    dates = {tap_date for _, tap_date in taps}
+
+    students = CustomUser.objects.filter(role="student").in_bulk(student_ids)
+
+    # Same enrollment that StudentClassEnrollment...first() would pick
+    class_levels = {}
+    enrollments = StudentClassEnrollment.objects.filter(
+        student_id__in=student_ids, is_current=True
+    ).order_by("id").values_list("student_id", "class_level_id")
+    for student_id, class_level_id in enrollments:
+        class_levels.setdefault(student_id, class_level_id)
+
+    marked = set(
+        Attendance.objects.filter(
+            student_id__in=student_ids, date__in=dates
+        ).values_list("student_id", "classlevel_id", "date")
+    )
+
+    outcomes = []
+    new_rows = []
+    batch = set()
+    for student_id, tap_date in taps:
+        if student_id not in students:
+            outcomes.append("student_not_found")
+            continue
+        class_level_id = class_levels.get(student_id)
+        if class_level_id is None:
+            outcomes.append("not_enrolled")
+            continue
+        key = (student_id, class_level_id, tap_date)
+        if key in batch:
+            outcomes.append("duplicate")
+            continue
+        batch.add(key)
+        if key in marked:
+            outcomes.append("already_marked")
+            continue
+        outcomes.append("marked")
+        new_rows.append(Attendance(
+            student_id=student_id,
+            classlevel_id=class_level_id,
+            date=tap_date,
+            status="present",
+        ))
+
+    # A concurrent tap may win the unique constraint; that row is simply skipped.
+    Attendance.objects.bulk_create(new_rows, ignore_conflicts=True)
+    rollup.refresh((row.classlevel_id, row.date) for row in new_rows)
+    heatmap.invalidate((row.student_id, row.date) for row in new_rows)
+
+    return outcomes
+
+
+@transaction.atomic
+def sync_tap_events(device, events):
+    """
+    Apply a kiosk's offline journal exactly once.
+
+    ``events`` are dicts with ``event_id``, ``student_id`` and ``captured_at``.
+    Events the device has uploaded before are reported with their original
+    result and not re-applied; the rest go through ``record_taps`` and are
+    stored so later replays are recognised. Returns the per-event results and
+    the high-water mark up to which the device may truncate its journal.
+
+    The mark only covers this upload: it is the latest capture time of the
+    leading run of events whose capture times do not go backwards. Events
+    stored by earlier uploads are not considered, since the device may still
+    hold older events it has not sent yet (chunked or out-of-order uploads).
+    """
+    known = dict(
+        DeviceTapEvent.objects.filter(
+            device=device, event_id__in=[event["event_id"] for event in events]
+        ).values_list("event_id", "result")
+    )
+
+    fresh = []
+    for event in events:
+        if event["event_id"] not in known:
+            # Guard against the same event appearing twice in one upload
+            known[event["event_id"]] = None
+            fresh.append(event)
+
+    outcomes = record_taps([
+        (event["student_id"], timezone.localdate(event["captured_at"])) for event in fresh
+    ])
+    applied = {}
+    new_events = []
+    for event, outcome in zip(fresh, outcomes):
+        applied[event["event_id"]] = known[event["event_id"]] = outcome
+        new_events.append(DeviceTapEvent(
+            device=device,
+            event_id=event["event_id"],
+            student_id=event["student_id"],
+            captured_at=event["captured_at"],
+            result=outcome,
+        ))
+    DeviceTapEvent.objects.bulk_create(new_events, ignore_conflicts=True)
+
+    results = []
+    for event in events:
+        event_id = event["event_id"]
+        if event_id in applied:
+            results.append({"event_id": event_id, "status": "applied", "result": applied.pop(event_id)})
+        else:
+            results.append({"event_id": event_id, "status": "duplicate", "result": known[event_id]})
+
+    high_water_mark = None
+    for event in events:
+        if high_water_mark is not None and event["captured_at"] < high_water_mark:
+            break
+        high_water_mark = event["captured_at"]
+    return results, high_water_mark
+
+
+def finalize_absences(day, chunk_size=5000, all_classes=False):
+    """
+    Write an ``absent`` row for every currently enrolled student with no
+    attendance record on ``day``.
+
+    By default only classes that recorded some attendance that day are
+    finalized, so running it on a holiday does not mark everyone absent.
+    Enrollments are walked by primary key in chunks with an anti-join against
+    the day's records, each chunk is bulk-inserted in its own transaction,
+    and rerunning for the same day inserts nothing. Returns the number of
+    rows inserted. A tap or a concurrent run can fill a gap between the
+    anti-join and the insert, so each chunk's rows for the day are counted
+    before and after its insert.
+    """
+    enrollments = StudentClassEnrollment.objects.filter(is_current=True).exclude(
+        Exists(Attendance.objects.filter(student_id=OuterRef("student_id"), date=day))
+    )
+    if not all_classes:
+        enrollments = enrollments.filter(
+            class_level_id__in=Attendance.objects.filter(date=day).values("classlevel_id")
+        )
+
+    inserted = 0
+    last_id = 0
+    while True:
+        chunk = list(
+            enrollments.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "student_id", "class_level_id")[:chunk_size]
+        )
+        if not chunk:
+            return inserted
+        last_id = chunk[-1][0]
+
+        rows = {}
+        for _, student_id, class_level_id in chunk:
+            # A student's first current enrollment is the one attendance uses
+            rows.setdefault(student_id, Attendance(
+                student_id=student_id, classlevel_id=class_level_id, date=day, status="absent"
+            ))
+        day_rows = Attendance.objects.filter(date=day, student_id__in=list(rows))
+        with transaction.atomic():
+            before = day_rows.count()
+            Attendance.objects.bulk_create(rows.values(), ignore_conflicts=True)
+            inserted += day_rows.count() - before
+            rollup.refresh((row.classlevel_id, day) for row in rows.values())
+        heatmap.invalidate((student_id, day) for student_id in rows)
@@ -1,5 +1,6 @@
 
 from django.shortcuts import render, get_object_or_404
+from django.http import StreamingHttpResponse
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from drf_yasg.utils import swagger_auto_schema
@@ -7,14 +8,22 @@ from .models import Attendance, AuthorizedDevice
 from account.models import StudentClassEnrollment, CustomUser
 from rest_framework import status 
 from rest_framework.permissions import IsAuthenticated
-from .serializers import AttendanceSerializer, StudentSerializer
+from .serializers import AttendanceSerializer, StudentSerializer, BatchAttendanceSerializer, DeviceSyncSerializer
+from .utils import get_authorized_device, record_taps, sync_tap_events
+from .device_cache import device_cache
+from .export import export_rows, stream_csv, stream_ndjson
+from .nepali_calendar import ad_to_bs
+from . import heatmap
+import nepali_datetime
 from django.db import IntegrityError
 from account.models import ClassLevel, ClassSubject, Subject
 from attendance.serializers import ClassLevelSerializer, SubjectOnlySerializer, MarkAttendanceSerializer
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from django.db.models import Count, Q
-from datetime import datetime, timedelta
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber, TruncMonth
+from datetime import date, datetime, timedelta
+from collections import Counter
 from django.db.models import Count
 from drf_yasg import openapi
 
@@ -60,22 +69,45 @@ def student_attendance(request, classlevel):
             enrollments = StudentClassEnrollment.objects.filter(
                 class_level=classlevel_obj, 
                 is_current=True
+            ).select_related("student")
+            
+            # Per-student statistics in one conditional-aggregation query
+            class_attendance = Attendance.objects.filter(
+                classlevel=classlevel_obj,
+                student_id__in=enrollments.values("student_id")
             )
+            stats = {
+                row["student_id"]: row
+                for row in class_attendance.values("student_id").annotate(
+                    total_days=Count("id"),
+                    present_days=Count("id", filter=Q(status="present")),
+                    absent_days=Count("id", filter=Q(status="absent")),
+                    late_days=Count("id", filter=Q(status="late")),
+                )
+            }
+            
+            # Latest five records per student in one windowed query
+            recent = {}
+            recent_rows = class_attendance.annotate(
+                row_number=Window(
+                    expression=RowNumber(),
+                    partition_by=[F("student_id")],
+                    order_by=F("date").desc(),
+                )
+            ).filter(row_number__lte=5).order_by("student_id", "-date")
+            for record in recent_rows:
+                recent.setdefault(record.student_id, []).append(record)
             
             attendance_data = []
             for enrollment in enrollments:
                 student = enrollment.student
-                # Get attendance for this student in this class
-                student_attendance = Attendance.objects.filter(
-                    student=student, 
-                    classlevel=classlevel_obj
-                ).order_by('-date')
+                student_stats = stats.get(student.id, {})
                 
                 # Calculate attendance statistics
-                total_days = student_attendance.count()
-                present_days = student_attendance.filter(status="present").count()
-                absent_days = student_attendance.filter(status="absent").count()
-                late_days = student_attendance.filter(status="late").count()
+                total_days = student_stats.get("total_days", 0)
+                present_days = student_stats.get("present_days", 0)
+                absent_days = student_stats.get("absent_days", 0)
+                late_days = student_stats.get("late_days", 0)
                 
                 attendance_percentage = (present_days / total_days * 100) if total_days > 0 else 0
                 
@@ -87,7 +119,7 @@ def student_attendance(request, classlevel):
                     "absent_days": absent_days,
                     "late_days": late_days,
                     "attendance_percentage": round(attendance_percentage, 2),
-                    "recent_attendance": AttendanceSerializer(student_attendance[:5], many=True).data
+                    "recent_attendance": AttendanceSerializer(recent.get(student.id, []), many=True).data
                 })
             
             return Response({
@@ -334,7 +366,7 @@ def student_attendance_report(request, student_id):
         enrollment = StudentClassEnrollment.objects.filter(
             student=student, 
             is_current=True
-        ).first()
+        ).select_related("class_level").first()
         
         if not enrollment:
             return Response({
@@ -347,20 +379,31 @@ def student_attendance_report(request, student_id):
             classlevel=enrollment.class_level
         ).order_by('-date')
         
-        # Calculate statistics
-        total_days = attendance_data.count()
-        present_days = attendance_data.filter(status="present").count()
-        absent_days = attendance_data.filter(status="absent").count()
-        late_days = attendance_data.filter(status="late").count()
+        # Monthly breakdown and totals in one grouped query
+        monthly_stats = [
+            {
+                "year": row["month_start"].year,
+                "month": row["month_start"].month,
+                "total": row["total"],
+                "present": row["present"],
+                "absent": row["absent"],
+                "late": row["late"],
+            }
+            for row in attendance_data.annotate(
+                month_start=TruncMonth("date")
+            ).values("month_start").annotate(
+                total=Count('id'),
+                present=Count('id', filter=Q(status='present')),
+                absent=Count('id', filter=Q(status='absent')),
+                late=Count('id', filter=Q(status='late'))
+            ).order_by("month_start")
+        ]
         
-        # Monthly breakdown
-        monthly_stats = attendance_data.extra(
-            select={'month': "EXTRACT(month FROM date)"}
-        ).values('month').annotate(
-            present=Count('id', filter=Q(status='present')),
-            absent=Count('id', filter=Q(status='absent')),
-            late=Count('id', filter=Q(status='late'))
-        ).order_by('month')
+        # Calculate statistics
+        total_days = sum(month["total"] for month in monthly_stats)
+        present_days = sum(month["present"] for month in monthly_stats)
+        absent_days = sum(month["absent"] for month in monthly_stats)
+        late_days = sum(month["late"] for month in monthly_stats)
         
         report = {
             "student": {
@@ -379,7 +422,7 @@ def student_attendance_report(request, student_id):
                 "late_days": late_days,
                 "attendance_percentage": round((present_days / total_days * 100), 2) if total_days > 0 else 0
             },
-            "monthly_breakdown": list(monthly_stats),
+            "monthly_breakdown": monthly_stats,
             "recent_attendance": AttendanceSerializer(attendance_data[:10], many=True).data
         }
         
@@ -479,9 +522,8 @@ def mark_attendance_by_id(request, id):
         device_key = request.headers.get('X-DEVICE-ID')
         if not device_key:
             return Response({'error': 'Missing device key'}, status=status.HTTP_400_BAD_REQUEST)
-        try:
-            device = AuthorizedDevice.objects.get(device_id=device_key, is_active=True)
-        except AuthorizedDevice.DoesNotExist:
+        device = get_authorized_device(device_key)
+        if device is None:
             return Response({'error': 'Unauthorized device'}, status=status.HTTP_403_FORBIDDEN)
 
         if serializer.is_valid():
@@ -512,6 +554,183 @@ def mark_attendance_by_id(request, id):
         return Response({"error": "Internal Server Error", "details": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@swagger_auto_schema(
+    method="post",
+    request_body=BatchAttendanceSerializer,
+    manual_parameters=[
+        openapi.Parameter("X-DEVICE-ID", openapi.IN_HEADER, description="Authorized device UUID", type=openapi.TYPE_STRING, required=True),
+    ],
+    responses={
+        200: openapi.Response("Per-student outcomes for the batch"),
+        400: openapi.Response("Missing device key or invalid payload"),
+        403: openapi.Response("Unauthorized device"),
+    },
+)
+@api_view(['POST'])
+def mark_attendance_batch(request):
+    """Mark attendance for many students in one request from an authorized kiosk"""
+    device_key = request.headers.get('X-DEVICE-ID')
+    if not device_key:
+        return Response({'error': 'Missing device key'}, status=status.HTTP_400_BAD_REQUEST)
+    if get_authorized_device(device_key) is None:
+        return Response({'error': 'Unauthorized device'}, status=status.HTTP_403_FORBIDDEN)
+
+    serializer = BatchAttendanceSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    today = timezone.now().date()
+    taps = [
+        (tap["student_id"], timezone.localdate(tap["timestamp"]) if "timestamp" in tap else today)
+        for tap in serializer.validated_data["taps"]
+    ]
+    outcomes = record_taps(taps)
+
+    results = [
+        {"student_id": student_id, "date": tap_date, "result": outcome}
+        for (student_id, tap_date), outcome in zip(taps, outcomes)
+    ]
+    return Response({
+        "message": "Batch processed",
+        "summary": Counter(outcomes),
+        "results": results,
+    }, status=status.HTTP_200_OK)
+
+
+@swagger_auto_schema(
+    method="post",
+    request_body=DeviceSyncSerializer,
+    manual_parameters=[
+        openapi.Parameter("X-DEVICE-ID", openapi.IN_HEADER, description="Authorized device UUID", type=openapi.TYPE_STRING, required=True),
+    ],
+    responses={
+        200: openapi.Response("Per-event results and the device high-water mark"),
+        400: openapi.Response("Missing device key or invalid payload"),
+        403: openapi.Response("Unauthorized device"),
+    },
+)
+@api_view(['POST'])
+def sync_device_attendance(request):
+    """Upload a kiosk's offline tap journal; replaying the same events is safe"""
+    device_key = request.headers.get('X-DEVICE-ID')
+    if not device_key:
+        return Response({'error': 'Missing device key'}, status=status.HTTP_400_BAD_REQUEST)
+    device = get_authorized_device(device_key)
+    if device is None:
+        return Response({'error': 'Unauthorized device'}, status=status.HTTP_403_FORBIDDEN)
+
+    serializer = DeviceSyncSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    results, high_water_mark = sync_tap_events(device, serializer.validated_data["events"])
+    return Response({
+        "message": "Journal synced",
+        "high_water_mark": high_water_mark,
+        "summary": Counter(result["status"] for result in results),
+        "results": results,
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def device_cache_stats(request):
+    """Hit/miss counters of this worker's kiosk device cache (Admin only)"""
+    if request.user.role != "admin":
+        return Response({
+            "message": "Only admins can view device cache statistics"
+        }, status=status.HTTP_403_FORBIDDEN)
+    return Response(device_cache.stats(), status=status.HTTP_200_OK)
+
+
+@swagger_auto_schema(
+    method="get",
+    manual_parameters=[
+        openapi.Parameter("start", openapi.IN_QUERY, description="First date (YYYY-MM-DD)", type=openapi.TYPE_STRING, required=True),
+        openapi.Parameter("end", openapi.IN_QUERY, description="Last date (YYYY-MM-DD)", type=openapi.TYPE_STRING, required=True),
+        openapi.Parameter("classlevel", openapi.IN_QUERY, description="Class level ID; omit to export every class", type=openapi.TYPE_INTEGER),
+        openapi.Parameter("export_format", openapi.IN_QUERY, description="csv (default) or ndjson", type=openapi.TYPE_STRING),
+    ],
+    responses={
+        200: openapi.Response("Streamed CSV or NDJSON file"),
+        400: openapi.Response("Invalid date range or format"),
+        403: openapi.Response("Not a teacher or admin"),
+    },
+)
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def export_attendance(request):
+    """Stream attendance records for a date range as CSV or NDJSON (Teacher/Admin only)"""
+    if request.user.role not in ["teacher", "admin"]:
+        return Response({
+            "message": "You are not authorized to export attendance"
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        start = date.fromisoformat(request.query_params.get("start", ""))
+        end = date.fromisoformat(request.query_params.get("end", ""))
+    except ValueError:
+        return Response({
+            "message": "start and end are required dates in YYYY-MM-DD format"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if start > end:
+        return Response({"message": "start must not be after end"}, status=status.HTTP_400_BAD_REQUEST)
+
+    classlevel = request.query_params.get("classlevel")
+    if classlevel is not None and not classlevel.isdigit():
+        return Response({"message": "classlevel must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+    export_format = request.query_params.get("export_format", "csv")
+    if export_format == "csv":
+        stream, content_type = stream_csv, "text/csv"
+    elif export_format == "ndjson":
+        stream, content_type = stream_ndjson, "application/x-ndjson"
+    else:
+        return Response({"message": "export_format must be 'csv' or 'ndjson'"}, status=status.HTTP_400_BAD_REQUEST)
+
+    rows = export_rows(start, end, classlevel_id=int(classlevel) if classlevel else None)
+    response = StreamingHttpResponse(stream(rows), content_type=content_type)
+    scope = f"class-{classlevel}" if classlevel else "all-classes"
+    response["Content-Disposition"] = f'attachment; filename="attendance-{scope}-{start}-{end}.{export_format}"'
+    return response
+
+
+@swagger_auto_schema(
+    method="get",
+    manual_parameters=[
+        openapi.Parameter("year", openapi.IN_QUERY, description="BS academic year; defaults to the current one", type=openapi.TYPE_INTEGER),
+        openapi.Parameter("encoding", openapi.IN_QUERY, description="bitmap (default) or rle", type=openapi.TYPE_STRING),
+    ],
+    responses={
+        200: openapi.Response("Encoded attendance calendar"),
+        400: openapi.Response("Invalid year or encoding"),
+        403: openapi.Response("Students can only view their own calendar"),
+    },
+)
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def student_attendance_calendar(request, student_id):
+    """Compact attendance calendar of one student for a BS academic year"""
+    if request.user.role == "student" and request.user.id != student_id:
+        return Response({
+            "message": "You can only view your own attendance"
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    year = request.query_params.get("year")
+    if year is None:
+        year = ad_to_bs(timezone.now().date())[0]
+    elif not year.isdigit() or not nepali_datetime.MINYEAR <= int(year) <= nepali_datetime.MAXYEAR:
+        return Response({
+            "message": f"year must be a BS year between {nepali_datetime.MINYEAR} and {nepali_datetime.MAXYEAR}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    encoding = request.query_params.get("encoding", "bitmap")
+    if encoding not in heatmap.ENCODINGS:
+        return Response({"message": "encoding must be 'bitmap' or 'rle'"}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(heatmap.get_calendar(student_id, int(year), encoding), status=status.HTTP_200_OK)
+
+
 @api_view(['GET'])
 def get_attendance_summary_by_class(request, classlevel):
     
@@ -148,6 +148,19 @@ SIMPLE_JWT = {
 }
 
 
+# In-process cache of active attendance kiosks (attendance.device_cache)
+DEVICE_CACHE_TTL = 300  # seconds
+DEVICE_CACHE_MAX_SIZE = 1024
+
+# Cached attendance calendars (attendance.heatmap). The default cache is
+# per process, so this bounds how long other workers serve a stale calendar.
+ATTENDANCE_CALENDAR_CACHE_TTL = 300  # seconds
+
+# Cached class rankings and score distributions (marksheet.ranking,
+# marksheet.distribution), per process like the above
+MARKSHEET_RANKING_CACHE_TTL = 300  # seconds
+MARKSHEET_DISTRIBUTION_CACHE_TTL = 300  # seconds
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -0,0 +1,72 @@
+"""
+Test helpers shared by the apps' test suites.
+"""
+import json
+import re
+
+from django.db import connection
+
+
+class QueryPlanMixin:
+    """
+    Assertions on the query plan the database picks for a queryset, for
+    tests that EXPLAIN hot querysets against seeded data and fail on full
+    table scans. Supports SQLite and MySQL; other backends skip the test.
+    """
+
+    def query_plan(self, queryset):
+        """
+        ``(table, full_scan, indexed_columns)`` for every table the plan
+        reads, where ``indexed_columns`` are the columns the chosen index
+        is searched on.
+        """
+        if connection.vendor == "sqlite":
+            tables = set(connection.introspection.table_names())
+            plan = []
+            for line in queryset.explain().splitlines():
+                search = re.search(r"SEARCH (\w+) USING (?:COVERING )?INDEX \w+ \((.*)\)$", line)
+                scan = re.search(r"\bSCAN (\w+)", line)
+                if search:
+                    # A skip-scan (ANY(col)) walks every value of the leading column
+                    columns = set() if "ANY(" in search[2] else set(re.findall(r"(\w+)[=<>]", search[2]))
+                    plan.append((search[1], False, columns))
+                elif scan and scan[1] in tables:
+                    plan.append((scan[1], True, set()))
+            return plan
+        if connection.vendor == "mysql":
+            plan = []
+
+            def walk(node):
+                if isinstance(node, dict):
+                    if "table_name" in node:
+                        plan.append((
+                            node["table_name"],
+                            node.get("access_type") == "ALL",
+                            set(node.get("used_key_parts", [])),
+                        ))
+                    nodes = node.values()
+                elif isinstance(node, list):
+                    nodes = node
+                else:
+                    return
+                for child in nodes:
+                    walk(child)
+
+            walk(json.loads(queryset.explain(format="json")))
+            return plan
+        self.skipTest(f"No query plan parser for {connection.vendor}")
+
+    def assertNoFullScan(self, queryset):
+        scans = [table for table, full_scan, _ in self.query_plan(queryset) if full_scan]
+        self.assertEqual(scans, [], queryset.explain())
+
+    def assertIndexed(self, queryset, *columns):
+        """The plan searches the queryset's table on an index covering ``columns``."""
+        table = queryset.model._meta.db_table
+        plan = self.query_plan(queryset)
+        indexed = [used for name, full_scan, used in plan if name == table and not full_scan]
+        self.assertTrue(
+            any(set(columns) <= used for used in indexed),
+            f"No index on {columns} used for {table}:\n{queryset.explain()}",
+        )
+        self.assertNoFullScan(queryset)
@@ -0,0 +1,151 @@
+"""
+Maintenance of StudentMarkAggregate.
+
+Each aggregate row covers one (student, class level, subject, exam type) key
+and holds the count, sum, minimum and maximum of ``marks / full_marks`` over
+its marksheets. Marks with zero full marks count as 0.
+
+Single-row changes to Marksheet are applied incrementally by the signal
+handlers in marksheet.signals via ``add`` and ``remove``. Bulk writes, which
+skip signals, call ``refresh`` for the keys they touched. ``rebuild``
+recomputes the table from scratch, and ``find_mismatches`` compares it with
+Marksheet.
+"""
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Max, Min, Q, Sum, Value, When
+from django.db.models.functions import Cast, Greatest, Least
+
+from .models import Marksheet, StudentMarkAggregate
+
+KEY_FIELDS = ("student_id", "classlevel_id", "subject_id", "examtype_id")
+# Float sums drift a little under repeated add/remove
+TOLERANCE = 1e-9
+
+FRACTION = Case(
+    When(full_marks__gt=0, then=Cast("marks", FloatField()) / Cast("full_marks", FloatField())),
+    default=Value(0.0),
+    output_field=FloatField(),
+)
+
+
+def key_of(mark):
+    return tuple(getattr(mark, field) for field in KEY_FIELDS)
+
+
+def fraction_of(mark):
+    full_marks = float(mark.full_marks)
+    return float(mark.marks) / full_marks if full_marks > 0 else 0.0
+
+
+def _key_filter(key):
+    # filter(classlevel_id=None) matches IS NULL, which the nullable keys need
+    return dict(zip(KEY_FIELDS, key))
+
+
+def _grouped(marks):
+    return marks.values(*KEY_FIELDS).annotate(
+        mark_count=Count("id"),
+        fraction_sum=Sum(FRACTION),
+        min_fraction=Min(FRACTION),
+        max_fraction=Max(FRACTION),
+    ).order_by()
+
+
+def average_fraction(aggregates):
+    """Mean of marks / full_marks over the marks behind a StudentMarkAggregate queryset, or None if empty."""
+    totals = aggregates.aggregate(count=Sum("mark_count"), fractions=Sum("fraction_sum"))
+    if not totals["count"]:
+        return None
+    return totals["fractions"] / totals["count"]
+
+
+def add(key, fraction):
+    """Count one more mark with the given fraction under ``key``."""
+    with transaction.atomic():
+        # The unique key makes a concurrent insert fail, which get_or_create
+        # answers by locking and reading the winner's row
+        aggregate, created = StudentMarkAggregate.objects.select_for_update().get_or_create(
+            **_key_filter(key),
+            defaults={
+                "mark_count": 1,
+                "fraction_sum": fraction,
+                "min_fraction": fraction,
+                "max_fraction": fraction,
+            },
+        )
+        if not created:
+            StudentMarkAggregate.objects.filter(pk=aggregate.pk).update(
+                mark_count=F("mark_count") + 1,
+                fraction_sum=F("fraction_sum") + fraction,
+                min_fraction=Least(F("min_fraction"), Value(fraction)),
+                max_fraction=Greatest(F("max_fraction"), Value(fraction)),
+            )
+
+
+def remove(key, fraction):
+    """Take one mark with the given fraction out of ``key``."""
+    with transaction.atomic():
+        rows = StudentMarkAggregate.objects.filter(**_key_filter(key))
+        rows.update(
+            mark_count=Greatest(F("mark_count") - 1, Value(0)),
+            fraction_sum=F("fraction_sum") - fraction,
+        )
+        rows.filter(mark_count=0).delete()
+        # Only a removed extreme needs the remaining marks re-read
+        if rows.filter(Q(min_fraction__gte=fraction) | Q(max_fraction__lte=fraction)).exists():
+            extremes = Marksheet.objects.filter(**_key_filter(key)).aggregate(
+                min_fraction=Min(FRACTION), max_fraction=Max(FRACTION)
+            )
+            if extremes["min_fraction"] is not None:
+                rows.update(**extremes)
+
+
+@transaction.atomic
+def refresh(keys, batch_size=1000):
+    """
+    Recompute the aggregate rows for the given keys from Marksheet. Every
+    row of the students involved is recomputed, which keeps the queries to
+    a few per batch of students.
+    """
+    student_ids = sorted({key[0] for key in keys})
+    for start in range(0, len(student_ids), batch_size):
+        batch = student_ids[start:start + batch_size]
+        StudentMarkAggregate.objects.filter(student_id__in=batch).delete()
+        rows = [
+            StudentMarkAggregate(**row)
+            for row in _grouped(Marksheet.objects.filter(student_id__in=batch))
+        ]
+        StudentMarkAggregate.objects.bulk_create(rows, batch_size=batch_size)
+
+
+@transaction.atomic
+def rebuild(batch_size=1000):
+    """Drop and recompute every aggregate row. Returns the number of rows written."""
+    StudentMarkAggregate.objects.all().delete()
+    rows = [StudentMarkAggregate(**row) for row in _grouped(Marksheet.objects.all())]
+    StudentMarkAggregate.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def find_mismatches():
+    """
+    Keys whose aggregate row does not match Marksheet, as a list of
+    ``(key, expected, stored)``. Either side is None when its row is missing.
+    """
+    fields = ("mark_count", "fraction_sum", "min_fraction", "max_fraction")
+    expected = {
+        tuple(row[field] for field in KEY_FIELDS): row
+        for row in _grouped(Marksheet.objects.all())
+    }
+    stored = {
+        tuple(row[field] for field in KEY_FIELDS): row
+        for row in StudentMarkAggregate.objects.values(*KEY_FIELDS, *fields)
+    }
+    mismatches = []
+    for key in expected.keys() | stored.keys():
+        want, have = expected.get(key), stored.get(key)
+        if want is None or have is None or want["mark_count"] != have["mark_count"] or any(
+            abs(want[field] - have[field]) > TOLERANCE for field in fields[1:]
+        ):
+            mismatches.append((key, want, have))
+    return sorted(mismatches, key=lambda item: tuple(-1 if value is None else value for value in item[0]))
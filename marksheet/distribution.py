@@ -0,0 +1,133 @@
+"""
+Score distribution of a class for one exam, overall or for one subject.
+
+Each mark's percentage (``marks / full_marks``) is put into a band with
+``Case``/``When`` and the marks are grouped by band in one query. Band
+sums and sums of squares give the mean and standard deviation. The median
+is read with one ordered slice. Marks with zero full marks are left out.
+
+Distributions are cached per (class level, subject, exam type, band set),
+and ``invalidate`` drops them when marks in that class and exam change. The
+default cache is local to each worker process and ``invalidate`` only clears
+the worker that made the change, so entries expire after
+MARKSHEET_DISTRIBUTION_CACHE_TTL seconds to bound how long other workers
+serve an old distribution.
+"""
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, CharField, Count, F, FloatField, Sum, Value, When
+from django.db.models.functions import Cast
+
+from .grading import GRADE_BANDS
+from .models import Marksheet
+
+CACHE_TIMEOUT = getattr(settings, "MARKSHEET_DISTRIBUTION_CACHE_TTL", 300)
+
+# (lowest percentage, label), highest band first
+BAND_SETS = {
+    "deciles": [(lower, f"{lower}-{lower + 10}") for lower in range(90, -1, -10)],
+    "grades": [(lower, letter) for lower, letter, _ in GRADE_BANDS],
+}
+
+PERCENTAGE = Cast("marks", FloatField()) * 100.0 / Cast("full_marks", FloatField())
+
+
+def cache_key(classlevel_id, subject_id, examtype_id, bands):
+    return f"marksheet_distribution:{classlevel_id}:{subject_id or 'all'}:{examtype_id}:{bands}"
+
+
+def _marks(classlevel_id, subject_id, examtype_id):
+    marks = Marksheet.objects.filter(
+        classlevel_id=classlevel_id, examtype_id=examtype_id, full_marks__gt=0
+    )
+    if subject_id is not None:
+        marks = marks.filter(subject_id=subject_id)
+    return marks.annotate(percentage=PERCENTAGE)
+
+
+def _median(marks, count):
+    if not count:
+        return None
+    middle = list(
+        marks.order_by("percentage").values_list("percentage", flat=True)[(count - 1) // 2:count // 2 + 1]
+    )
+    return round(sum(middle) / len(middle), 2)
+
+
+def compute_distribution(classlevel_id, examtype_id, subject_id=None, bands="deciles"):
+    band_set = BAND_SETS[bands]
+    marks = _marks(classlevel_id, subject_id, examtype_id)
+    grouped = {
+        row["band"]: row
+        for row in marks.annotate(
+            band=Case(
+                *[When(percentage__gte=lower, then=Value(label)) for lower, label in band_set],
+                default=Value(band_set[-1][1]),
+                output_field=CharField(),
+            ),
+            square=F("percentage") * F("percentage"),
+        ).values("band").annotate(
+            count=Count("id"), total=Sum("percentage"), squares=Sum("square")
+        ).order_by()
+    }
+
+    count = sum(row["count"] for row in grouped.values())
+    mean = sum(row["total"] for row in grouped.values()) / count if count else None
+    variance = (
+        max(sum(row["squares"] for row in grouped.values()) / count - mean * mean, 0.0)
+        if count else None
+    )
+
+    histogram = []
+    upper = 100
+    for lower, label in band_set:
+        histogram.append({
+            "band": label,
+            "min_percentage": lower,
+            "max_percentage": upper,
+            "count": grouped.get(label, {}).get("count", 0),
+        })
+        upper = lower
+    histogram.reverse()
+
+    return {
+        "classlevel_id": classlevel_id,
+        "examtype_id": examtype_id,
+        "subject_id": subject_id,
+        "bands": bands,
+        "count": count,
+        "mean": round(mean, 2) if count else None,
+        "median": _median(marks, count),
+        "std_dev": round(math.sqrt(variance), 2) if count else None,
+        "histogram": histogram,
+    }
+
+
+def get_distribution(classlevel_id, examtype_id, subject_id=None, bands="deciles"):
+    key = cache_key(classlevel_id, subject_id, examtype_id, bands)
+    distribution = cache.get(key)
+    if distribution is None:
+        distribution = compute_distribution(classlevel_id, examtype_id, subject_id, bands)
+        cache.set(key, distribution, CACHE_TIMEOUT)
+    return distribution
+
+
+def invalidate(triples):
+    """
+    Drop cached distributions for the given (classlevel_id, subject_id,
+    examtype_id) triples, both for the subject and for the whole exam, once
+    the current transaction commits.
+    """
+    keys = set()
+    for classlevel_id, subject_id, examtype_id in triples:
+        if classlevel_id is None or examtype_id is None:
+            continue
+        for bands in BAND_SETS:
+            keys.add(cache_key(classlevel_id, None, examtype_id, bands))
+            if subject_id is not None:
+                keys.add(cache_key(classlevel_id, subject_id, examtype_id, bands))
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,37 @@
+"""
+Letter grades and grade points on the NEB scale, for whole arrays of
+percentages at once.
+"""
+import numpy as np
+
+# (lowest percentage, grade, grade point), highest band first
+GRADE_BANDS = [
+    (90, "A+", 4.0),
+    (80, "A", 3.6),
+    (70, "B+", 3.2),
+    (60, "B", 2.8),
+    (50, "C+", 2.4),
+    (40, "C", 2.0),
+    (35, "D", 1.6),
+    (0, "NG", 0.0),
+]
+PASS_PERCENTAGE = 35
+
+# Ascending lower bounds, for searchsorted
+_BOUNDS = np.array([band[0] for band in reversed(GRADE_BANDS)], dtype=float)
+_LETTERS = np.array([band[1] for band in reversed(GRADE_BANDS)], dtype=object)
+_POINTS = np.array([band[2] for band in reversed(GRADE_BANDS)], dtype=float)
+
+
+def grade(percentages):
+    """
+    Letter grades and grade points for an array of percentages. Missing
+    values (NaN) get no grade (None) and a NaN grade point.
+    """
+    percentages = np.asarray(percentages, dtype=float)
+    missing = np.isnan(percentages)
+    band = np.searchsorted(_BOUNDS, np.where(missing, 0, percentages), side="right") - 1
+    band = np.clip(band, 0, len(_BOUNDS) - 1)
+    letters = np.where(missing, None, _LETTERS[band])
+    points = np.where(missing, np.nan, _POINTS[band])
+    return letters, points
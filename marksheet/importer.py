@@ -0,0 +1,243 @@
+"""
+Import of exam results from a student x subject spreadsheet.
+
+The first column of the sheet holds student ids and every other column is
+named after a subject taught in the class (a ``student_name`` column is
+ignored). Rows are streamed from the file and validated and written in
+chunks, so memory use does not grow with the size of the sheet. Existing
+marks for the same student, subject, class and exam are updated in place.
+"""
+import csv
+import io
+import zipfile
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from rest_framework import serializers
+
+from account.models import ClassSubject, StudentClassEnrollment
+from . import aggregates, distribution, ranking
+from .models import Marksheet
+
+IGNORED_COLUMNS = {"student_name", "full_name", "name"}
+
+# Same limits as Marksheet.marks
+MARK_FIELD = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=0)
+
+
+class MarksImportError(ValueError):
+    """The sheet as a whole cannot be imported (unreadable file, unknown columns)."""
+
+
+def read_rows(file, filename):
+    """
+    Yield the rows of an uploaded ``.csv`` or ``.xlsx`` file as lists of cell
+    values. Files that cannot be decoded or parsed raise MarksImportError,
+    possibly only once iteration reaches the bad part of the file.
+    """
+    name = filename.lower()
+    if name.endswith(".xlsx"):
+        try:
+            from openpyxl import load_workbook
+            from openpyxl.utils.exceptions import InvalidFileException
+        except ImportError:
+            raise MarksImportError("Reading .xlsx files requires openpyxl; upload a .csv instead.")
+        # A file that is not a valid workbook fails as a bad zip archive or
+        # with a missing or malformed part
+        errors = (InvalidFileException, zipfile.BadZipFile, KeyError, ValueError, OSError)
+        try:
+            workbook = load_workbook(file, read_only=True, data_only=True)
+        except errors as e:
+            raise MarksImportError(f"Could not read the file: {e}")
+        try:
+            for row in workbook.active.iter_rows(values_only=True):
+                yield list(row)
+        except errors as e:
+            raise MarksImportError(f"Could not read the file: {e}")
+        finally:
+            workbook.close()
+    elif name.endswith(".csv"):
+        try:
+            yield from csv.reader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+        except UnicodeDecodeError:
+            raise MarksImportError("Could not read the file: it is not UTF-8 encoded text.")
+        except csv.Error as e:
+            raise MarksImportError(f"Could not read the file: {e}")
+    else:
+        raise MarksImportError("Only .csv and .xlsx files are supported.")
+
+
+def _is_blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _student_id(value):
+    try:
+        number = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError
+    if number != number.to_integral_value() or number <= 0:
+        raise ValueError
+    return int(number)
+
+
+def _map_columns(header, classlevel):
+    """``[(column index, Subject)]`` for the subject columns of the header row."""
+    if not header or _is_blank(header[0]) or str(header[0]).strip().lower() != "student_id":
+        raise MarksImportError("The first column must be 'student_id'.")
+
+    subjects = {
+        class_subject.subject.name.strip().lower(): class_subject.subject
+        for class_subject in ClassSubject.objects.filter(class_level=classlevel).select_related("subject")
+    }
+    columns, unknown = [], []
+    for index, cell in enumerate(header[1:], start=1):
+        if _is_blank(cell):
+            continue
+        name = str(cell).strip()
+        if name.lower() in IGNORED_COLUMNS:
+            continue
+        subject = subjects.get(name.lower())
+        if subject is None:
+            unknown.append(name)
+        else:
+            columns.append((index, subject))
+    if unknown:
+        raise MarksImportError(
+            f"Columns do not match subjects of {classlevel}: {', '.join(unknown)}"
+        )
+    if not columns:
+        raise MarksImportError("No subject columns found.")
+    return columns
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_sheet(rows, classlevel, examtype, full_marks, dry_run=False, chunk_size=500):
+    """
+    Import marks for ``examtype`` in ``classlevel`` from an iterable of rows,
+    the first of which is the header.
+
+    Nothing is written if any cell fails validation, or if ``dry_run`` is set.
+    Returns a summary of created, updated and unchanged marks, the errors
+    found (with 1-based sheet row numbers), and on a dry run the list of
+    changes that would be made.
+    """
+    rows = iter(rows)
+    columns = _map_columns(next(rows, None), classlevel)
+    result = {
+        "summary": {"created": 0, "updated": 0, "unchanged": 0},
+        "errors": [],
+    }
+    if dry_run:
+        result["changes"] = []
+
+    seen = set()
+    with transaction.atomic():
+        for chunk in _chunks(enumerate(rows, start=2), chunk_size):
+            _import_chunk(chunk, columns, classlevel, examtype, full_marks, dry_run, seen, result)
+        if result["errors"]:
+            transaction.set_rollback(True)
+        elif not dry_run:
+            # bulk writes skip signals
+            ranking.invalidate([(classlevel.id, examtype.id)])
+    return result
+
+
+def _import_chunk(chunk, columns, classlevel, examtype, full_marks, dry_run, seen, result):
+    errors = result["errors"]
+
+    parsed = []
+    for line, row in chunk:
+        if all(_is_blank(cell) for cell in row):
+            continue
+        try:
+            student_id = _student_id(row[0])
+        except ValueError:
+            errors.append({"row": line, "column": "student_id", "error": f"Invalid student id {row[0]!r}."})
+            continue
+        if student_id in seen:
+            errors.append({"row": line, "column": "student_id", "error": f"Student {student_id} appears more than once."})
+            continue
+        seen.add(student_id)
+
+        marks = {}
+        for index, subject in columns:
+            value = row[index] if index < len(row) else None
+            if _is_blank(value):
+                continue
+            try:
+                mark = MARK_FIELD.run_validation(str(value))
+            except serializers.ValidationError as exc:
+                errors.append({"row": line, "column": subject.name, "error": str(exc.detail[0])})
+                continue
+            if mark > full_marks:
+                errors.append({"row": line, "column": subject.name, "error": "Marks cannot exceed full marks"})
+                continue
+            marks[subject] = mark
+        parsed.append((line, student_id, marks))
+
+    student_ids = [student_id for _, student_id, _ in parsed]
+    enrolled = set(
+        StudentClassEnrollment.objects.filter(
+            class_level=classlevel, is_current=True, student_id__in=student_ids
+        ).values_list("student_id", flat=True)
+    )
+    # Marksheet has no unique key, so the latest row per subject is the one updated
+    existing = {
+        (student_id, subject_id): (mark_id, marks, mark_full_marks)
+        for mark_id, student_id, subject_id, marks, mark_full_marks in Marksheet.objects.filter(
+            classlevel=classlevel, examtype=examtype, student_id__in=enrolled
+        ).order_by("id").values_list("id", "student_id", "subject_id", "marks", "full_marks")
+    }
+
+    to_create, to_update, touched = [], [], set()
+    for line, student_id, marks in parsed:
+        if student_id not in enrolled:
+            errors.append({
+                "row": line, "column": "student_id",
+                "error": f"Student {student_id} is not currently enrolled in {classlevel}.",
+            })
+            continue
+        for subject, mark in marks.items():
+            current = existing.get((student_id, subject.id))
+            if current is None:
+                action = "created"
+                to_create.append(Marksheet(
+                    student_id=student_id, classlevel_id=classlevel.id, subject_id=subject.id,
+                    examtype_id=examtype.id, marks=mark, full_marks=full_marks,
+                ))
+            elif current[1] == mark and current[2] == full_marks:
+                action = "unchanged"
+            else:
+                action = "updated"
+                to_update.append(Marksheet(id=current[0], marks=mark, full_marks=full_marks))
+            if action != "unchanged":
+                touched.add((student_id, classlevel.id, subject.id, examtype.id))
+            result["summary"][action] += 1
+            if dry_run and action != "unchanged":
+                result["changes"].append({
+                    "row": line,
+                    "student_id": student_id,
+                    "subject": subject.name,
+                    "action": action,
+                    "old_marks": str(current[1]) if current else None,
+                    "new_marks": str(mark),
+                })
+
+    # Once a cell has failed the import is rolled back, so later chunks are only validated
+    if not dry_run and not errors:
+        Marksheet.objects.bulk_create(to_create, batch_size=1000)
+        Marksheet.objects.bulk_update(to_update, ["marks", "full_marks"], batch_size=1000)
+        # bulk writes skip signals
+        aggregates.refresh(touched)
+        distribution.invalidate({key[1:] for key in touched})
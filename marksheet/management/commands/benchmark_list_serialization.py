@@ -0,0 +1,95 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from rest_framework.renderers import JSONRenderer
+
+from account.models import ClassLevel, CustomUser, Subject
+from marksheet.models import ClassParticipation, ExamType, Marksheet
+from marksheet.serializers import (
+    ClassParticipationListSerializer,
+    MarksheetListSerializer,
+    serialize_marksheet_list,
+    serialize_participation_list,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the nested list serializers with the values()-based fast path "
+        "for marks and participation lists. Seed data is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=50_000, help="Rows per list.")
+        parser.add_argument("--subjects", type=int, default=10)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            classlevel = self.seed(options["rows"], options["subjects"])
+            cases = [
+                (
+                    "marks",
+                    Marksheet.objects.filter(classlevel=classlevel).order_by("id"),
+                    lambda qs: MarksheetListSerializer(qs, many=True).data,
+                    serialize_marksheet_list,
+                ),
+                (
+                    "participation",
+                    ClassParticipation.objects.filter(classlevel=classlevel).order_by("id"),
+                    lambda qs: ClassParticipationListSerializer(qs, many=True).data,
+                    serialize_participation_list,
+                ),
+            ]
+            renderer = JSONRenderer()
+            for label, queryset, nested, fast in cases:
+                nested_queries, nested_time, nested_data = self.measure(nested, queryset)
+                fast_queries, fast_time, fast_data = self.measure(fast, queryset)
+                identical = renderer.render(nested_data) == renderer.render(fast_data)
+                self.stdout.write(f"{label}: {len(fast_data)} rows")
+                self.stdout.write(f"  nested serializer: {nested_queries:>6} queries, {nested_time * 1000:8.1f} ms")
+                self.stdout.write(f"  values() fast path: {fast_queries:>5} queries, {fast_time * 1000:8.1f} ms")
+                style = self.style.SUCCESS if identical else self.style.ERROR
+                self.stdout.write(style(
+                    f"  speedup: {nested_time / fast_time:.1f}x, identical output: {identical}"
+                ))
+            transaction.set_rollback(True)
+
+    def measure(self, serialize, queryset):
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with connection.execute_wrapper(count):
+            data = serialize(queryset.all())
+        return queries, time.perf_counter() - started, data
+
+    def seed(self, rows, subject_count):
+        top_level = ClassLevel.objects.aggregate(top=Max("level"))["top"] or 0
+        classlevel = ClassLevel.objects.create(level=top_level + 1000)
+        examtype = ExamType.objects.create(name="Benchmark exam")
+        teacher = CustomUser.objects.create(email="benchmark-teacher@example.com", full_name="Benchmark", role="teacher")
+        subjects = Subject.objects.bulk_create(
+            Subject(name=f"Benchmark subject {i}") for i in range(subject_count)
+        )
+        students = CustomUser.objects.bulk_create(
+            CustomUser(email=f"benchmark{i}@example.com", full_name=f"Benchmark {i}", role="student")
+            for i in range(-(-rows // subject_count))
+        )
+        pairs = [(student, subject) for student in students for subject in subjects][:rows]
+        Marksheet.objects.bulk_create(
+            (Marksheet(student=student, classlevel=classlevel, subject=subject, examtype=examtype,
+                       full_marks=100, marks=i % 100) for i, (student, subject) in enumerate(pairs)),
+            batch_size=2000,
+        )
+        ClassParticipation.objects.bulk_create(
+            (ClassParticipation(student=student, classlevel=classlevel, subject=subject,
+                                added_by=teacher, mark=i % 6) for i, (student, subject) in enumerate(pairs)),
+            batch_size=2000,
+        )
+        return classlevel
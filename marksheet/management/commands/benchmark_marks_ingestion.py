@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework import serializers
+
+from account.models import ClassLevel, CustomUser, Subject
+from marksheet.models import ExamType, Marksheet
+from marksheet.serializers import MarksheetSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-row and bulk ingestion of marks through MarksheetSerializer. "
+        "Seed data and inserted marks are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000, help="Marks to ingest per run.")
+        parser.add_argument("--subjects", type=int, default=8)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rows = self.seed(options["rows"], options["subjects"])
+
+            per_row = serializers.ListSerializer(child=MarksheetSerializer(), data=rows)
+            per_row_stats = self.measure(per_row)
+            Marksheet.objects.filter(examtype_id=rows[0]["examtype_id"]).delete()
+
+            bulk = MarksheetSerializer(data=rows, many=True)
+            bulk_stats = self.measure(bulk)
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"rows ingested: {len(rows)}")
+        for label, (queries, elapsed) in (("per-row", per_row_stats), ("bulk", bulk_stats)):
+            self.stdout.write(f"{label:>8}: {queries:>6} queries, {elapsed * 1000:8.1f} ms")
+        self.stdout.write(self.style.SUCCESS(
+            f"speedup: {per_row_stats[1] / bulk_stats[1]:.1f}x, "
+            f"{per_row_stats[0] - bulk_stats[0]} fewer queries"
+        ))
+
+    def measure(self, serializer):
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with connection.execute_wrapper(count):
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+        return queries, time.perf_counter() - started
+
+    def seed(self, count, subject_count):
+        classlevel = ClassLevel.objects.order_by("id").first() or ClassLevel.objects.create(level=99)
+        examtype = ExamType.objects.create(name="Benchmark exam")
+        subjects = Subject.objects.bulk_create(
+            Subject(name=f"Benchmark subject {i}") for i in range(subject_count)
+        )
+        students = CustomUser.objects.bulk_create(
+            CustomUser(email=f"benchmark{i}@example.com", full_name=f"Benchmark {i}", role="student")
+            for i in range(-(-count // subject_count))
+        )
+        return [
+            {
+                "student_id": students[i // subject_count].id,
+                "subject_id": subjects[i % subject_count].id,
+                "classlevel_id": classlevel.id,
+                "examtype_id": examtype.id,
+                "full_marks": "100.00",
+                "marks": f"{i % 100}.00",
+            }
+            for i in range(count)
+        ]
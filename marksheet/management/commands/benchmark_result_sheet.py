@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from account.models import ClassLevel, CustomUser, Subject
+from marksheet.models import ExamType, Marksheet
+from marksheet.result_sheet import result_sheet_csv, result_sheet_json
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the class result sheet (JSON and CSV) for a seeded class. "
+        "Seed data is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=500)
+        parser.add_argument("--subjects", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per format; the best is reported.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            classlevel, examtype = self.seed(options["students"], options["subjects"])
+            for label, build in (("json", result_sheet_json), ("csv", result_sheet_csv)):
+                timings = []
+                for _ in range(options["repeat"]):
+                    started = time.perf_counter()
+                    build(classlevel.id, examtype.id)
+                    timings.append(time.perf_counter() - started)
+                self.stdout.write(
+                    f"{label}: {options['students']} students x {options['subjects']} subjects, "
+                    f"best {min(timings) * 1000:.1f} ms, worst {max(timings) * 1000:.1f} ms"
+                )
+            transaction.set_rollback(True)
+
+    def seed(self, student_count, subject_count):
+        top_level = ClassLevel.objects.aggregate(top=Max("level"))["top"] or 0
+        classlevel = ClassLevel.objects.create(level=top_level + 1000)
+        examtype = ExamType.objects.create(name="Benchmark exam")
+        subjects = Subject.objects.bulk_create(
+            Subject(name=f"Benchmark subject {i}") for i in range(subject_count)
+        )
+        students = CustomUser.objects.bulk_create(
+            CustomUser(email=f"benchmark{i}@example.com", full_name=f"Benchmark {i}", role="student")
+            for i in range(student_count)
+        )
+        Marksheet.objects.bulk_create(
+            (Marksheet(student=student, classlevel=classlevel, subject=subject, examtype=examtype,
+                       full_marks=100, marks=(i * 7 + j * 13) % 101)
+             for i, student in enumerate(students) for j, subject in enumerate(subjects)),
+            batch_size=2000,
+        )
+        return classlevel, examtype
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from marksheet import aggregates
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the StudentMarkAggregate table with Marksheet records and "
+        "report keys that disagree. Use --fix to recompute them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Recompute the aggregates of the students with mismatches.")
+        parser.add_argument("--limit", type=int, default=20, help="Mismatches to print.")
+
+    def handle(self, *args, **options):
+        mismatches = aggregates.find_mismatches()
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("Student mark aggregates match Marksheet."))
+            return
+
+        for key, expected, stored in mismatches[:options["limit"]]:
+            label = ", ".join(f"{field}={value}" for field, value in zip(aggregates.KEY_FIELDS, key))
+            self.stdout.write(f"{label}: expected {self.summary(expected)}, stored {self.summary(stored)}")
+        if len(mismatches) > options["limit"]:
+            self.stdout.write(f"... and {len(mismatches) - options['limit']} more")
+
+        if options["fix"]:
+            aggregates.refresh(key for key, _, _ in mismatches)
+            self.stdout.write(self.style.SUCCESS(f"Recomputed {len(mismatches)} mismatched aggregates."))
+        else:
+            raise CommandError(f"{len(mismatches)} student mark aggregates do not match Marksheet.")
+
+    @staticmethod
+    def summary(row):
+        if row is None:
+            return "no row"
+        return (
+            f"count={row['mark_count']} sum={row['fraction_sum']:.6f} "
+            f"min={row['min_fraction']:.6f} max={row['max_fraction']:.6f}"
+        )
@@ -0,0 +1,56 @@
+import json
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from account.models import ClassLevel
+from marksheet.importer import MarksImportError, import_sheet, read_rows
+from marksheet.models import ExamType
+
+
+class Command(BaseCommand):
+    help = (
+        "Import exam results from a CSV/XLSX student x subject sheet. "
+        "The first column holds student ids; the others are subject names."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to a .csv or .xlsx file.")
+        parser.add_argument("--classlevel", type=int, required=True, help="Class level id.")
+        parser.add_argument("--exam", required=True, help="Exam type id or name.")
+        parser.add_argument("--full-marks", type=Decimal, default=Decimal("100"))
+        parser.add_argument("--dry-run", action="store_true", help="Report the changes without saving them.")
+        parser.add_argument("--chunk-size", type=int, default=500, help="Sheet rows validated per query batch.")
+
+    def handle(self, *args, **options):
+        try:
+            classlevel = ClassLevel.objects.get(id=options["classlevel"])
+        except ClassLevel.DoesNotExist:
+            raise CommandError("Class level does not exist.")
+        exam = options["exam"]
+        examtype = ExamType.objects.filter(**({"id": int(exam)} if exam.isdigit() else {"name__iexact": exam})).first()
+        if examtype is None:
+            raise CommandError("Exam type does not exist.")
+
+        try:
+            with open(options["path"], "rb") as file:
+                result = import_sheet(
+                    read_rows(file, options["path"]),
+                    classlevel,
+                    examtype,
+                    options["full_marks"],
+                    dry_run=options["dry_run"],
+                    chunk_size=options["chunk_size"],
+                )
+        except (OSError, MarksImportError) as e:
+            raise CommandError(str(e))
+
+        for change in result.get("changes", []):
+            self.stdout.write(json.dumps(change))
+        for error in result["errors"]:
+            self.stderr.write(f"row {error['row']}, {error['column']}: {error['error']}")
+        summary = ", ".join(f"{count} {action}" for action, count in result["summary"].items())
+        if result["errors"]:
+            raise CommandError(f"{len(result['errors'])} errors, no marks were saved ({summary}).")
+        prefix = "Dry run, nothing saved" if options["dry_run"] else "Imported"
+        self.stdout.write(self.style.SUCCESS(f"{prefix}: {summary}."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from marksheet import aggregates
+
+
+class Command(BaseCommand):
+    help = "Rebuild the StudentMarkAggregate table from Marksheet records."
+
+    def handle(self, *args, **options):
+        written = aggregates.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} student mark aggregate rows."))
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0007_customuser_gender'),
+        ('marksheet', '0006_classparticipation_added_by_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='marksheet',
+            index=models.Index(fields=['student', 'classlevel'], name='marksheet_m_student_d5a2ea_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='marksheet',
+            index=models.Index(fields=['classlevel', 'examtype'], name='marksheet_m_classle_d4c137_idx'),
+        ),
+    ]
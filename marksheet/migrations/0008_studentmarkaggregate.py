@@ -0,0 +1,63 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Count, FloatField, Max, Min, Sum, Value, When
+from django.db.models.functions import Cast
+
+
+def build_aggregates(apps, schema_editor):
+    Marksheet = apps.get_model('marksheet', 'Marksheet')
+    StudentMarkAggregate = apps.get_model('marksheet', 'StudentMarkAggregate')
+
+    fraction = Case(
+        When(full_marks__gt=0, then=Cast('marks', FloatField()) / Cast('full_marks', FloatField())),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    rows = (
+        Marksheet.objects
+        .values('student_id', 'classlevel_id', 'subject_id', 'examtype_id')
+        .annotate(
+            mark_count=Count('id'),
+            fraction_sum=Sum(fraction),
+            min_fraction=Min(fraction),
+            max_fraction=Max(fraction),
+        )
+        .order_by()
+    )
+    StudentMarkAggregate.objects.bulk_create(
+        [StudentMarkAggregate(**row) for row in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0007_customuser_gender'),
+        ('marksheet', '0007_marksheet_marksheet_m_student_d5a2ea_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentMarkAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mark_count', models.PositiveIntegerField(default=0)),
+                ('fraction_sum', models.FloatField(default=0)),
+                ('min_fraction', models.FloatField(default=0)),
+                ('max_fraction', models.FloatField(default=0)),
+                ('classlevel', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='account.classlevel')),
+                ('examtype', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='marksheet.examtype')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mark_aggregates', to=settings.AUTH_USER_MODEL)),
+                ('subject', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='account.subject')),
+            ],
+            options={
+                'unique_together': {('student', 'classlevel', 'subject', 'examtype')},
+            },
+        ),
+        migrations.RunPython(build_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:11
+
+import importlib
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+build_aggregates = importlib.import_module(
+    'marksheet.migrations.0008_studentmarkaggregate'
+).build_aggregates
+
+
+def rebuild_aggregates(apps, schema_editor):
+    # Concurrent adds could have left duplicate NULL-keyed rows, which the
+    # new constraint would reject
+    apps.get_model('marksheet', 'StudentMarkAggregate').objects.all().delete()
+    build_aggregates(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0007_customuser_gender'),
+        ('marksheet', '0008_studentmarkaggregate'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='studentmarkaggregate',
+            unique_together=set(),
+        ),
+        migrations.RunPython(rebuild_aggregates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='studentmarkaggregate',
+            constraint=models.UniqueConstraint(models.F('student'), django.db.models.functions.comparison.Coalesce('classlevel', models.Value(0)), django.db.models.functions.comparison.Coalesce('subject', models.Value(0)), django.db.models.functions.comparison.Coalesce('examtype', models.Value(0)), name='marksheet_aggregate_unique_key'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from account.models import ClassLevel, Subject
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -25,10 +26,47 @@ class Marksheet(models.Model):
 
     date = models.DateField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['student', 'classlevel']),
+            models.Index(fields=['classlevel', 'examtype']),
+        ]
+
     def __str__(self):
         return f"{self.student} - {self.subject} ({self.marks}/{self.full_marks})"
 
 
+class StudentMarkAggregate(models.Model):
+    """Per-student marks summary for one subject and exam, kept in step with Marksheet by marksheet.aggregates."""
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="mark_aggregates"
+    )
+    classlevel = models.ForeignKey(ClassLevel, on_delete=models.CASCADE, blank=True, null=True)
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, blank=True, null=True)
+    examtype = models.ForeignKey(ExamType, on_delete=models.CASCADE, null=True)
+    # Fractions are marks / full_marks; marks with zero full marks count as 0
+    mark_count = models.PositiveIntegerField(default=0)
+    fraction_sum = models.FloatField(default=0)
+    min_fraction = models.FloatField(default=0)
+    max_fraction = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            # NULLs never conflict in a plain unique index, so the nullable
+            # keys are compared as 0, which no row id takes
+            models.UniqueConstraint(
+                "student",
+                Coalesce("classlevel", models.Value(0)),
+                Coalesce("subject", models.Value(0)),
+                Coalesce("examtype", models.Value(0)),
+                name="marksheet_aggregate_unique_key",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.student} - {self.subject} ({self.mark_count} marks)"
+
+
 class ClassParticipation(models.Model):
     
     student = models.ForeignKey(
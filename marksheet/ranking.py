@@ -0,0 +1,153 @@
+"""
+Rank-in-class and percentile per exam type, overall and per subject.
+
+A student's result is ``sum(marks) / sum(full_marks)`` over their marksheets
+for the exam, or for one subject of it. Ranks are competition ranks (ties
+share the best rank, the next rank is skipped). A percentile is the share of
+the other students who scored strictly lower, so the top student of a class
+of more than one gets 100. Rows with zero full marks carry no percentage and
+are left out.
+
+Ranks are computed with SQL window functions where the backend has them.
+Otherwise they are computed with NumPy from the same grouped rows. Rankings
+are cached per (class level, exam type), and ``invalidate`` drops them when
+marks in that class and exam change. The default cache is local to each
+worker process and ``invalidate`` only clears the worker that made the
+change, so entries expire after MARKSHEET_RANKING_CACHE_TTL seconds to bound
+how long other workers serve old ranks.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, FloatField, Sum, Window
+from django.db.models.functions import Cast, PercentRank, Rank
+import numpy as np
+
+from .models import Marksheet
+
+CACHE_TIMEOUT = getattr(settings, "MARKSHEET_RANKING_CACHE_TTL", 300)
+OUTPUT_NAMES = {"student__full_name": "student_name", "subject__name": "subject_name"}
+
+
+def cache_key(classlevel_id, examtype_id):
+    return f"marksheet_ranking:{classlevel_id}:{examtype_id}"
+
+
+def _grouped(classlevel_id, examtype_id, fields):
+    return (
+        Marksheet.objects.filter(classlevel_id=classlevel_id, examtype_id=examtype_id, full_marks__gt=0)
+        .values(*fields)
+        .annotate(
+            total_marks=Sum("marks"),
+            total_full_marks=Sum("full_marks"),
+            percentage=Cast(Sum("marks"), FloatField()) * 100.0 / Cast(Sum("full_marks"), FloatField()),
+        )
+        .order_by()
+    )
+
+
+def _window_rows(rows, partition):
+    partition_by = [F(partition)] if partition else None
+    return rows.annotate(
+        rank=Window(Rank(), partition_by=partition_by, order_by=F("percentage").desc()),
+        percent_rank=Window(PercentRank(), partition_by=partition_by, order_by=F("percentage").asc()),
+    )
+
+
+def _numpy_rows(rows, partition):
+    """Same columns as ``_window_rows``, with the ranks computed in NumPy."""
+    rows = list(rows)
+    groups = {}
+    for index, row in enumerate(rows):
+        groups.setdefault(row[partition] if partition else None, []).append(index)
+    for indexes in groups.values():
+        scores = np.array([rows[i]["percentage"] for i in indexes], dtype=float)
+        ordered = np.sort(scores)
+        lower = np.searchsorted(ordered, scores, side="left")
+        higher = len(scores) - np.searchsorted(ordered, scores, side="right")
+        percent_rank = lower / (len(scores) - 1) if len(scores) > 1 else np.zeros(len(scores))
+        for i, rank, share in zip(indexes, higher + 1, percent_rank):
+            rows[i]["rank"] = int(rank)
+            rows[i]["percent_rank"] = float(share)
+    return rows
+
+
+def _ranked(classlevel_id, examtype_id, fields, partition=None, use_window=None):
+    if use_window is None:
+        use_window = connection.features.supports_over_clause
+    rows = _grouped(classlevel_id, examtype_id, fields)
+    rows = _window_rows(rows, partition) if use_window else _numpy_rows(rows, partition)
+    return [
+        {
+            **{OUTPUT_NAMES.get(field, field): row[field] for field in fields},
+            "total_marks": float(row["total_marks"]),
+            "total_full_marks": float(row["total_full_marks"]),
+            "percentage": round(row["percentage"], 2),
+            "rank": row["rank"],
+            "percentile": round(row["percent_rank"] * 100, 2),
+        }
+        for row in rows
+    ]
+
+
+def compute_ranking(classlevel_id, examtype_id, use_window=None):
+    """
+    Overall and per-subject ranking of a class for one exam type. Pass
+    ``use_window=False`` to force the NumPy path.
+    """
+    students = _ranked(
+        classlevel_id, examtype_id, ("student_id", "student__full_name"), use_window=use_window
+    )
+    students.sort(key=lambda row: (row["rank"], row["student_id"]))
+
+    subjects = {}
+    for row in _ranked(
+        classlevel_id, examtype_id,
+        ("subject_id", "subject__name", "student_id", "student__full_name"),
+        partition="subject_id", use_window=use_window,
+    ):
+        if row["subject_id"] is None:
+            continue
+        subject = subjects.setdefault(row["subject_id"], {
+            "subject_id": row["subject_id"],
+            "subject_name": row["subject_name"],
+            "students": [],
+        })
+        subject["students"].append({key: row[key] for key in (
+            "student_id", "student_name", "total_marks", "total_full_marks",
+            "percentage", "rank", "percentile",
+        )})
+    for subject in subjects.values():
+        subject["students"].sort(key=lambda row: (row["rank"], row["student_id"]))
+
+    return {
+        "classlevel_id": classlevel_id,
+        "examtype_id": examtype_id,
+        "student_count": len(students),
+        "students": students,
+        "subjects": sorted(subjects.values(), key=lambda subject: subject["subject_name"]),
+    }
+
+
+def get_ranking(classlevel_id, examtype_id):
+    key = cache_key(classlevel_id, examtype_id)
+    ranking = cache.get(key)
+    if ranking is None:
+        ranking = compute_ranking(classlevel_id, examtype_id)
+        cache.set(key, ranking, CACHE_TIMEOUT)
+    return ranking
+
+
+def invalidate(pairs):
+    """
+    Drop cached rankings for the given (classlevel_id, examtype_id) pairs once
+    the current transaction commits, so a concurrent read cannot re-cache the
+    old ranking.
+    """
+    keys = {
+        cache_key(classlevel_id, examtype_id)
+        for classlevel_id, examtype_id in pairs
+        if classlevel_id is not None and examtype_id is not None
+    }
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
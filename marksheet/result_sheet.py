@@ -0,0 +1,125 @@
+"""
+Class result sheet for one exam: a student x subject matrix with
+percentages, NEB grades, GPA, totals and pass/fail.
+
+The marks are read with a single ``values_list`` query and pivoted with
+pandas, and every figure is computed column-wise with NumPy. Several marks
+for the same student and subject are summed. GPA is the plain mean of the
+subject grade points, because subjects carry no credit hours here. A
+student passes when every subject they sat is at or above
+``PASS_PERCENTAGE``.
+"""
+import numpy as np
+import pandas as pd
+
+from .grading import PASS_PERCENTAGE, grade
+from .models import Marksheet
+
+COLUMNS = ["student_id", "student_name", "subject", "marks", "full_marks"]
+
+
+def _percent(marks, full_marks):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(full_marks > 0, marks * 100 / full_marks, np.nan)
+
+
+def _none_if_nan(values):
+    return [None if value != value else value for value in values.tolist()]
+
+
+def build_result_sheet(classlevel_id, examtype_id):
+    """
+    Return ``(subjects, frame)``. ``frame`` has one row per student, ordered
+    by name, and the per-subject columns ``<subject> marks``, ``full_marks``,
+    ``percentage``, ``grade`` and ``grade_point``.
+    """
+    rows = Marksheet.objects.filter(
+        classlevel_id=classlevel_id, examtype_id=examtype_id, subject__isnull=False
+    ).values_list("student_id", "student__full_name", "subject__name", "marks", "full_marks")
+    data = pd.DataFrame.from_records(list(rows), columns=COLUMNS)
+    if data.empty:
+        return [], pd.DataFrame()
+    data["marks"] = data["marks"].astype(float)
+    data["full_marks"] = data["full_marks"].astype(float)
+
+    pivot = data.pivot_table(
+        index=["student_id", "student_name"], columns="subject",
+        values=["marks", "full_marks"], aggfunc="sum",
+    )
+    subjects = sorted(pivot["marks"].columns)
+    marks = pivot["marks"][subjects].to_numpy()
+    full_marks = pivot["full_marks"][subjects].to_numpy()
+    percentages = _percent(marks, full_marks)
+    letters, points = grade(percentages)
+
+    sat = ~np.isnan(percentages)
+    total_marks = np.nansum(marks, axis=1)
+    total_full_marks = np.nansum(full_marks, axis=1)
+    percentage = _percent(total_marks, total_full_marks)
+    with np.errstate(invalid="ignore"):
+        gpa = np.nansum(points, axis=1) / sat.sum(axis=1)
+    passed = ~np.any(sat & (percentages < PASS_PERCENTAGE), axis=1) & sat.any(axis=1)
+
+    frame = pivot.index.to_frame(index=False)
+    for i, subject in enumerate(subjects):
+        frame[f"{subject} marks"] = marks[:, i]
+        frame[f"{subject} full_marks"] = full_marks[:, i]
+        frame[f"{subject} percentage"] = np.round(percentages[:, i], 2)
+        frame[f"{subject} grade"] = letters[:, i]
+        frame[f"{subject} grade_point"] = points[:, i]
+    frame["total_marks"] = total_marks
+    frame["total_full_marks"] = total_full_marks
+    frame["percentage"] = np.round(percentage, 2)
+    frame["grade"] = grade(percentage)[0]
+    frame["gpa"] = np.round(gpa, 2)
+    frame["result"] = np.where(passed, "Pass", "Fail")
+    frame = frame.sort_values(["student_name", "student_id"], kind="stable", ignore_index=True)
+    return subjects, frame
+
+
+def result_sheet_json(classlevel_id, examtype_id):
+    subjects, frame = build_result_sheet(classlevel_id, examtype_id)
+    fields = ("marks", "full_marks", "percentage", "grade", "grade_point")
+    columns = {
+        (subject, field): _none_if_nan(frame[f"{subject} {field}"].to_numpy())
+        for subject in subjects for field in fields
+    }
+    totals = {
+        name: _none_if_nan(frame[name].to_numpy()) if name in frame else []
+        for name in ("student_id", "student_name", "total_marks", "total_full_marks",
+                     "percentage", "grade", "gpa", "result")
+    }
+
+    students = []
+    for i, student_id in enumerate(totals["student_id"]):
+        students.append({
+            "student_id": student_id,
+            "student_name": totals["student_name"][i],
+            "subjects": {
+                subject: {field: columns[subject, field][i] for field in fields}
+                for subject in subjects
+                if columns[subject, "marks"][i] is not None
+            },
+            **{name: totals[name][i] for name in ("total_marks", "total_full_marks", "percentage", "grade", "gpa", "result")},
+        })
+
+    passed = totals["result"].count("Pass")
+    gpas = [gpa for gpa in totals["gpa"] if gpa is not None]
+    return {
+        "classlevel_id": classlevel_id,
+        "examtype_id": examtype_id,
+        "subjects": subjects,
+        "students": students,
+        "summary": {
+            "student_count": len(students),
+            "pass_count": passed,
+            "fail_count": len(students) - passed,
+            "pass_percentage": round(passed * 100 / len(students), 2) if students else 0,
+            "average_gpa": round(sum(gpas) / len(gpas), 2) if gpas else None,
+        },
+    }
+
+
+def result_sheet_csv(classlevel_id, examtype_id):
+    _, frame = build_result_sheet(classlevel_id, examtype_id)
+    return frame.to_csv(index=False)
@@ -1,4 +1,7 @@
+from django.db import connection, transaction
+from django.db.models import Max
 from rest_framework import serializers 
+from . import aggregates, distribution, ranking
 from .models import Marksheet, ExamType, ClassParticipation
 from account.models import CustomUser, Subject, ClassLevel
 from django.contrib.auth import get_user_model
@@ -22,6 +25,91 @@ class ExamTypeSerializer(serializers.ModelSerializer):
         model = ExamType
         fields = '__all__'
 
+class MarksheetBulkSerializer(serializers.ListSerializer):
+    """
+    List serializer used for bulk mark uploads (``many=True``).
+
+    Every referenced student, subject, class level and exam type is checked
+    with one ``in_bulk`` query per model instead of four lookups per row,
+    errors are reported per row, and the rows are written with a single
+    ``bulk_create`` in one transaction. Backends that cannot return rows
+    from a bulk insert (MySQL) leave the new primary keys unset, so they are
+    read back by (student, classlevel, subject, examtype) in the same
+    transaction.
+    """
+    related_models = {
+        'student_id': ('student', CustomUser, "Student does not exist."),
+        'subject_id': ('subject', Subject, "Subject does not exist."),
+        'classlevel_id': ('classlevel', ClassLevel, "Class level does not exist."),
+        'examtype_id': ('examtype', ExamType, "Exam type does not exist."),
+    }
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            return super().to_internal_value(data)
+
+        rows = []
+        errors = []
+        for item in data:
+            try:
+                rows.append(self.run_child_validation(item))
+                errors.append({})
+            except serializers.ValidationError as exc:
+                rows.append(None)
+                errors.append(exc.detail)
+
+        # One query per related model for all rows
+        found = {
+            field: model.objects.in_bulk({row[field] for row in rows if row})
+            for field, (_, model, _) in self.related_models.items()
+        }
+        for row, row_errors in zip(rows, errors):
+            if row is None:
+                continue
+            for field, (name, _, message) in self.related_models.items():
+                if row[field] not in found[field]:
+                    row_errors[field] = [message]
+            if not row_errors:
+                for field, (name, _, _) in self.related_models.items():
+                    row[name] = found[field][row.pop(field)]
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return rows
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            if connection.features.can_return_rows_from_bulk_insert:
+                last_id = None
+            else:
+                last_id = Marksheet.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+            marks = Marksheet.objects.bulk_create(
+                [Marksheet(**row) for row in validated_data], batch_size=1000
+            )
+            if last_id is not None:
+                self._read_back_ids(marks, last_id)
+            # bulk_create skips signals
+            aggregates.refresh({aggregates.key_of(mark) for mark in marks})
+            ranking.invalidate({(mark.classlevel_id, mark.examtype_id) for mark in marks})
+            distribution.invalidate({(mark.classlevel_id, mark.subject_id, mark.examtype_id) for mark in marks})
+            return marks
+
+    @staticmethod
+    def _read_back_ids(marks, last_id):
+        """
+        Set the primary keys of marks inserted after ``last_id``. A key can
+        repeat, so rows with the same key get their ids in insertion order.
+        """
+        key = lambda mark: (mark.student_id, mark.classlevel_id, mark.subject_id, mark.examtype_id)
+        ids = {}
+        for row in Marksheet.objects.filter(
+            id__gt=last_id, student_id__in={mark.student_id for mark in marks}
+        ).order_by('id').values_list('id', 'student_id', 'classlevel_id', 'subject_id', 'examtype_id'):
+            ids.setdefault(row[1:], []).append(row[0])
+        for mark in marks:
+            mark.id = ids[key(mark)].pop(0)
+
+
 class MarksheetSerializer(serializers.ModelSerializer):
     student = UserSerializer(read_only=True)
     student_id = serializers.IntegerField(write_only=True)
@@ -39,6 +127,7 @@ class MarksheetSerializer(serializers.ModelSerializer):
             'full_marks', 'marks','date'
         ]
         read_only_fields = ['id', 'date']
+        list_serializer_class = MarksheetBulkSerializer
 
     def validate(self, data):
         # Validate that marks cannot exceed full_marks
@@ -220,6 +309,16 @@ class ClassParticipationSerializer(serializers.ModelSerializer):
         return instance
 
 
+PARTICIPATION_GRADES = {
+    0: "No participation",
+    1: "Very poor",
+    2: "Poor",
+    3: "Average",
+    4: "Good",
+    5: "Excellent"
+}
+
+
 class ClassParticipationListSerializer(serializers.ModelSerializer):
     """
     Optimized serializer for listing class participation records.
@@ -247,15 +346,7 @@ class ClassParticipationListSerializer(serializers.ModelSerializer):
         """
         Get a descriptive text for the participation grade.
         """
-        grade_map = {
-            0: "No participation",
-            1: "Very poor",
-            2: "Poor", 
-            3: "Average",
-            4: "Good",
-            5: "Excellent"
-        }
-        return grade_map.get(obj.mark, "Unknown")
+        return PARTICIPATION_GRADES.get(obj.mark, "Unknown")
 
     def get_is_excellent(self, obj):
         """
@@ -264,6 +355,75 @@ class ClassParticipationListSerializer(serializers.ModelSerializer):
         return obj.mark == 5
 
 
+class ClassParticipationBulkSerializer(serializers.ListSerializer):
+    """
+    List serializer used for bulk participation uploads (``many=True``).
+
+    Students, subjects and class levels are checked with one ``in_bulk``
+    query each, errors are reported per row, and all rows are upserted on
+    (student, classlevel, subject) with a single ``bulk_create``, so marks
+    can be entered again for the same class.
+    """
+    related_models = {
+        'student_id': (CustomUser, "Student does not exist."),
+        'subject_id': (Subject, "Subject does not exist."),
+        'classlevel_id': (ClassLevel, "Class level does not exist."),
+    }
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            return super().to_internal_value(data)
+
+        rows = []
+        errors = []
+        for item in data:
+            try:
+                rows.append(self.run_child_validation(item))
+                errors.append({})
+            except serializers.ValidationError as exc:
+                rows.append(None)
+                errors.append(exc.detail)
+
+        # One query per related model for all rows
+        found = {
+            field: model.objects.in_bulk({row[field] for row in rows if row})
+            for field, (model, _) in self.related_models.items()
+        }
+        seen = set()
+        for row, row_errors in zip(rows, errors):
+            if row is None:
+                continue
+            for field, (_, message) in self.related_models.items():
+                if row[field] not in found[field]:
+                    row_errors[field] = [message]
+            student = found['student_id'].get(row['student_id'])
+            if student is not None and student.role != 'student':
+                row_errors['student_id'] = ["Selected user is not a student."]
+            key = (row['student_id'], row['classlevel_id'], row['subject_id'])
+            if key in seen:
+                row_errors['non_field_errors'] = ["Duplicate student, class level and subject in this request."]
+            seen.add(key)
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return rows
+
+    def create(self, validated_data):
+        added_by = self.context['request'].user
+        with transaction.atomic():
+            return ClassParticipation.objects.bulk_create(
+                [ClassParticipation(added_by=added_by, **row) for row in validated_data],
+                batch_size=1000,
+                update_conflicts=True,
+                # MySQL upserts on any unique key and rejects an explicit target
+                unique_fields=(
+                    ['student', 'classlevel', 'subject']
+                    if connection.features.supports_update_conflicts_with_target else None
+                ),
+                update_fields=['mark', 'added_by'],
+            )
+
+
 class ClassParticipationCreateSerializer(serializers.ModelSerializer):
     """
     Simplified serializer for bulk creation of class participation records.
@@ -275,6 +435,7 @@ class ClassParticipationCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = ClassParticipation
         fields = ['student_id', 'subject_id', 'classlevel_id', 'mark']
+        list_serializer_class = ClassParticipationBulkSerializer
 
     def validate_mark(self, value):
         if value < 0 or value > 5:
@@ -282,6 +443,10 @@ class ClassParticipationCreateSerializer(serializers.ModelSerializer):
         return value
 
     def validate(self, data):
+        # Bulk uploads check every row's references at once in ClassParticipationBulkSerializer
+        if isinstance(self.parent, ClassParticipationBulkSerializer):
+            return data
+
         # Validate student exists and is a student
         try:
             student = CustomUser.objects.get(id=data['student_id'])
@@ -305,19 +470,107 @@ class ClassParticipationCreateSerializer(serializers.ModelSerializer):
         return data
 
     def create(self, validated_data):
-        student_id = validated_data.pop('student_id')
-        subject_id = validated_data.pop('subject_id')
-        classlevel_id = validated_data.pop('classlevel_id')
-
-        student = CustomUser.objects.get(id=student_id)
-        subject = Subject.objects.get(id=subject_id)
-        classlevel = ClassLevel.objects.get(id=classlevel_id)
-
-        participation = ClassParticipation.objects.create(
-            student=student,
-            subject=subject,
-            classlevel=classlevel,
-            added_by=self.context['request'].user,
-            **validated_data
+        # Entering a mark again for the same student, class and subject replaces it
+        participation, _ = ClassParticipation.objects.update_or_create(
+            student_id=validated_data.pop('student_id'),
+            subject_id=validated_data.pop('subject_id'),
+            classlevel_id=validated_data.pop('classlevel_id'),
+            defaults={'added_by': self.context['request'].user, **validated_data},
         )
         return participation
+
+
+class MarksImportSerializer(serializers.Serializer):
+    """
+    Upload of a student x subject results sheet for one class and exam.
+    """
+    file = serializers.FileField()
+    classlevel_id = serializers.IntegerField()
+    examtype_id = serializers.IntegerField()
+    full_marks = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=0, default=100)
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        try:
+            data['classlevel'] = ClassLevel.objects.get(id=data['classlevel_id'])
+        except ClassLevel.DoesNotExist:
+            raise serializers.ValidationError("Class level does not exist.")
+        try:
+            data['examtype'] = ExamType.objects.get(id=data['examtype_id'])
+        except ExamType.DoesNotExist:
+            raise serializers.ValidationError("Exam type does not exist.")
+        return data
+
+
+# Fast list serialization
+#
+# The list endpoints return thousands of rows, and the nested serializers
+# above build four serializer instances and lazy-load each relation per row.
+# The functions below read only the needed columns with joins through
+# values_list() and build the same output from tuples. They reuse the
+# serializers' own field to_representation, so the output is identical.
+
+MARKSHEET_LIST_COLUMNS = (
+    "id", "student_id", "student__full_name", "student__email", "student__role",
+    "classlevel_id", "classlevel__level", "subject_id", "subject__name",
+    "examtype_id", "examtype__name", "full_marks", "marks", "date",
+)
+
+PARTICIPATION_LIST_COLUMNS = (
+    "id", "student_id", "student__full_name", "student__email", "student__role",
+    "subject_id", "subject__name", "classlevel_id", "classlevel__level",
+    "added_by_id", "added_by__full_name", "added_by__email", "added_by__role",
+    "mark", "added_at",
+)
+
+
+def _user(id, full_name, email, role):
+    return {"id": id, "full_name": full_name, "email": email, "role": role}
+
+
+def serialize_marksheet_list(queryset):
+    """Same output as ``MarksheetListSerializer(queryset, many=True).data``."""
+    fields = MarksheetListSerializer().fields
+    full_marks_repr = fields["full_marks"].to_representation
+    marks_repr = fields["marks"].to_representation
+    date_repr = fields["date"].to_representation
+
+    data = []
+    for (id, student_id, student_name, student_email, student_role,
+         classlevel_id, level, subject_id, subject_name,
+         examtype_id, examtype_name, full_marks, marks, date) in queryset.values_list(*MARKSHEET_LIST_COLUMNS):
+        data.append({
+            "id": id,
+            "student": _user(student_id, student_name, student_email, student_role),
+            "classlevel": {"id": classlevel_id, "level": level} if classlevel_id is not None else None,
+            "subject": {"id": subject_id, "name": subject_name} if subject_id is not None else None,
+            "examtype": {"id": examtype_id, "name": examtype_name} if examtype_id is not None else None,
+            "full_marks": full_marks_repr(full_marks),
+            "marks": marks_repr(marks),
+            "date": date_repr(date),
+            "percentage": round((marks / full_marks) * 100, 2) if full_marks > 0 else 0,
+        })
+    return data
+
+
+def serialize_participation_list(queryset):
+    """Same output as ``ClassParticipationListSerializer(queryset, many=True).data``."""
+    added_at_repr = ClassParticipationListSerializer().fields["added_at"].to_representation
+
+    data = []
+    for (id, student_id, student_name, student_email, student_role,
+         subject_id, subject_name, classlevel_id, level,
+         added_by_id, added_by_name, added_by_email, added_by_role,
+         mark, added_at) in queryset.values_list(*PARTICIPATION_LIST_COLUMNS):
+        data.append({
+            "id": id,
+            "student": _user(student_id, student_name, student_email, student_role),
+            "subject": {"id": subject_id, "name": subject_name},
+            "classlevel": {"id": classlevel_id, "level": level},
+            "added_by": _user(added_by_id, added_by_name, added_by_email, added_by_role),
+            "mark": mark,
+            "grade_description": PARTICIPATION_GRADES.get(mark, "Unknown"),
+            "is_excellent": mark == 5,
+            "added_at": added_at_repr(added_at),
+        })
+    return data
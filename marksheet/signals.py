@@ -0,0 +1,53 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import aggregates, distribution, ranking
+from .models import Marksheet
+
+
+@receiver(pre_save, sender=Marksheet)
+def remember_previous_mark(sender, instance, **kwargs):
+    instance._previous_mark = None
+    if not instance._state.adding and instance.pk is not None:
+        instance._previous_mark = (
+            Marksheet.objects.filter(pk=instance.pk)
+            .only(*aggregates.KEY_FIELDS, "marks", "full_marks")
+            .first()
+        )
+
+
+def _unchanged(previous, instance):
+    """
+    Whether a save leaves the mark as it was. Rankings weight results by full
+    marks, so a rescale that keeps the percentage (70/100 to 35/50) is still
+    a change.
+    """
+    return (
+        (aggregates.key_of(previous), previous.marks, previous.full_marks)
+        == (aggregates.key_of(instance), instance.marks, instance.full_marks)
+    )
+
+
+@receiver(post_save, sender=Marksheet)
+def update_aggregates_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    key, fraction = aggregates.key_of(instance), aggregates.fraction_of(instance)
+    previous = getattr(instance, "_previous_mark", None)
+    if previous is not None:
+        if _unchanged(previous, instance):
+            return
+        previous_key, previous_fraction = aggregates.key_of(previous), aggregates.fraction_of(previous)
+        aggregates.remove(previous_key, previous_fraction)
+        ranking.invalidate([(previous.classlevel_id, previous.examtype_id)])
+        distribution.invalidate([(previous.classlevel_id, previous.subject_id, previous.examtype_id)])
+    aggregates.add(key, fraction)
+    ranking.invalidate([(instance.classlevel_id, instance.examtype_id)])
+    distribution.invalidate([(instance.classlevel_id, instance.subject_id, instance.examtype_id)])
+
+
+@receiver(post_delete, sender=Marksheet)
+def update_aggregates_on_delete(sender, instance, **kwargs):
+    aggregates.remove(aggregates.key_of(instance), aggregates.fraction_of(instance))
+    ranking.invalidate([(instance.classlevel_id, instance.examtype_id)])
+    distribution.invalidate([(instance.classlevel_id, instance.subject_id, instance.examtype_id)])
@@ -0,0 +1,183 @@
+"""
+Student performance and participation statistics.
+
+Marks are grouped by subject, exam type and exam date in the database. The
+overall, per-subject, per-exam-type and per-date figures are all rolled up
+from those few groups in Python. Percentages are weighted by full marks,
+i.e. ``sum(marks) / sum(full_marks)``.
+
+Participation counts come from one conditional aggregate. A second grouped
+query puts the student's average next to their current class.
+"""
+from django.db.models import Avg, Count, Max, Min, Q, Subquery, Sum
+
+from account.models import StudentClassEnrollment
+from .models import ClassParticipation
+
+
+def percentage(marks, full_marks):
+    return round(float(marks) * 100 / float(full_marks), 2) if full_marks else 0
+
+
+class _Bucket:
+    __slots__ = ("count", "marks", "full_marks", "max_marks", "min_marks")
+
+    def __init__(self):
+        self.count = 0
+        self.marks = 0
+        self.full_marks = 0
+        self.max_marks = None
+        self.min_marks = None
+
+    def add(self, group):
+        self.count += group["count"]
+        self.marks += group["total_marks"]
+        self.full_marks += group["total_full_marks"]
+        if self.max_marks is None or group["max_marks"] > self.max_marks:
+            self.max_marks = group["max_marks"]
+        if self.min_marks is None or group["min_marks"] < self.min_marks:
+            self.min_marks = group["min_marks"]
+
+    @property
+    def average_percentage(self):
+        return percentage(self.marks, self.full_marks)
+
+
+def performance_groups(marks):
+    """Marks grouped by subject, exam type and date, with their sums and extremes."""
+    return (
+        marks.values(
+            "student__full_name", "subject_id", "subject__name",
+            "examtype_id", "examtype__name", "date",
+        )
+        .annotate(
+            count=Count("id"),
+            total_marks=Sum("marks"),
+            total_full_marks=Sum("full_marks"),
+            max_marks=Max("marks"),
+            min_marks=Min("marks"),
+        )
+        .order_by()
+    )
+
+
+def performance_summary(marks):
+    """
+    Statistics for a queryset of one student's marks, or None if it is empty.
+    """
+    groups = list(performance_groups(marks))
+    if not groups:
+        return None
+
+    overall = _Bucket()
+    subjects, examtypes, dates = {}, {}, {}
+    for group in groups:
+        overall.add(group)
+        subjects.setdefault((group["subject_id"], group["subject__name"]), _Bucket()).add(group)
+        examtypes.setdefault((group["examtype_id"], group["examtype__name"]), _Bucket()).add(group)
+        dates.setdefault(group["date"], _Bucket()).add(group)
+
+    subject_wise = [
+        {
+            "subject_id": subject_id,
+            "subject_name": name,
+            "exam_count": bucket.count,
+            "average_percentage": bucket.average_percentage,
+            "avg_marks": round(float(bucket.marks) / bucket.count, 2),
+            "max_marks": float(bucket.max_marks),
+            "min_marks": float(bucket.min_marks),
+        }
+        for (subject_id, name), bucket in subjects.items()
+    ]
+    subject_wise.sort(key=lambda row: row["subject_name"] or "")
+    ranked = sorted(
+        (row for row in subject_wise if row["subject_id"] is not None),
+        key=lambda row: row["average_percentage"],
+    )
+
+    def subject_ref(row):
+        return {key: row[key] for key in ("subject_id", "subject_name", "average_percentage")}
+
+    return {
+        "student_name": groups[0]["student__full_name"],
+        # distinct subjects, counting marks without a subject as one, as before
+        "total_subjects": len(subjects),
+        "total_exams": overall.count,
+        "average_percentage": overall.average_percentage,
+        "best_subject": subject_ref(ranked[-1]) if ranked else None,
+        "worst_subject": subject_ref(ranked[0]) if ranked else None,
+        "subject_wise_stats": subject_wise,
+        "exam_type_stats": sorted(
+            (
+                {
+                    "examtype_id": examtype_id,
+                    "examtype_name": name,
+                    "exam_count": bucket.count,
+                    "average_percentage": bucket.average_percentage,
+                }
+                for (examtype_id, name), bucket in examtypes.items()
+            ),
+            key=lambda row: row["examtype_name"] or "",
+        ),
+        "trend": [
+            {
+                "date": date,
+                "exam_count": bucket.count,
+                "average_percentage": bucket.average_percentage,
+            }
+            for date, bucket in sorted(dates.items())
+        ],
+    }
+
+
+def participation_summary(participations):
+    """
+    Counts and average of a queryset of one student's participation
+    records in one query, or None if it is empty.
+    """
+    summary = participations.aggregate(
+        student_name=Max("student__full_name"),
+        total_subjects=Count("subject", distinct=True),
+        total_participations=Count("id"),
+        average_mark=Avg("mark"),
+        excellent_count=Count("id", filter=Q(mark=5)),
+        good_count=Count("id", filter=Q(mark__gte=4)),
+    )
+    if not summary["total_participations"]:
+        return None
+    summary["average_mark"] = round(summary["average_mark"], 2)
+    return summary
+
+
+def participation_class_comparison(student_id):
+    """
+    The student's average participation mark next to the mean and size of
+    their current class, and their percentile: the share of classmates with
+    a lower average. None when the student has no current class or the
+    class has no records.
+    """
+    current_class = StudentClassEnrollment.objects.filter(
+        student_id=student_id, is_current=True
+    ).order_by("-id").values("class_level_id")[:1]
+    rows = list(
+        ClassParticipation.objects.filter(classlevel_id=Subquery(current_class))
+        .values("classlevel_id", "student_id")
+        .annotate(total=Sum("mark"), count=Count("id"))
+        .order_by()
+    )
+    if not rows:
+        return None
+
+    averages = {row["student_id"]: row["total"] / row["count"] for row in rows}
+    own = averages.get(student_id)
+    others = [average for other, average in averages.items() if other != student_id]
+    return {
+        "classlevel_id": rows[0]["classlevel_id"],
+        "class_size": len(averages),
+        "class_mean": round(sum(row["total"] for row in rows) / sum(row["count"] for row in rows), 2),
+        "student_average": round(own, 2) if own is not None else None,
+        "percentile": (
+            round(sum(average < own for average in others) * 100 / len(others), 2)
+            if own is not None and others else None
+        ),
+    }
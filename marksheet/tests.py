@@ -1,3 +1,886 @@
+import io
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from account.models import ClassLevel, ClassSubject, CustomUser, StudentClassEnrollment, Subject
+from config.testing import QueryPlanMixin
+from studentapp.utils import score_prediction_utils
+from . import aggregates, distribution, grading, ranking
+from .models import ClassParticipation, ExamType, Marksheet, StudentMarkAggregate
+from .serializers import (
+    ClassParticipationListSerializer,
+    MarksheetListSerializer,
+    serialize_marksheet_list,
+    serialize_participation_list,
+)
+
+
+class MarksheetTestMixin:
+    """Shared fixtures for the marksheet API tests."""
+
+    def create_students(self, count, prefix="student"):
+        return CustomUser.objects.bulk_create(
+            CustomUser(email=f"{prefix}{i}@example.com", full_name=f"Student {i}", role="student")
+            for i in range(count)
+        )
+
+
+class BulkAddMarksTests(MarksheetTestMixin, TestCase):
+
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user(
+            email="teacher@example.com", full_name="Teacher", role="teacher"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        self.classlevel = ClassLevel.objects.create(level=8)
+        self.examtype = ExamType.objects.create(name="First Term")
+        self.subjects = Subject.objects.bulk_create(Subject(name=f"Subject {i}") for i in range(8))
+        self.students = self.create_students(40)
+
+    def rows(self):
+        return [
+            {
+                "student_id": student.id,
+                "subject_id": subject.id,
+                "classlevel_id": self.classlevel.id,
+                "examtype_id": self.examtype.id,
+                "full_marks": "100.00",
+                "marks": f"{(i + j) % 100}.50",
+            }
+            for i, student in enumerate(self.students)
+            for j, subject in enumerate(self.subjects)
+        ]
+
+    def test_bulk_upload_uses_constant_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("add_marks"), self.rows(), format="json")
+
+        # One in_bulk lookup per related model and one to refresh the mark
+        # aggregates; the inserts are batched by the backend
+        selects = [q["sql"] for q in queries.captured_queries if q["sql"].startswith("SELECT")]
+        self.assertEqual(len(selects), 5)
+        self.assertLess(len(queries), 20)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["data"]), 320)
+        self.assertEqual(response.data["data"][0]["student"]["id"], self.students[0].id)
+        self.assertEqual(response.data["data"][0]["subject"]["name"], "Subject 0")
+        self.assertEqual(Marksheet.objects.filter(classlevel=self.classlevel).count(), 320)
+
+    def test_errors_are_reported_per_row_and_nothing_is_written(self):
+        rows = self.rows()[:4]
+        rows[1]["student_id"] = 999999
+        rows[2]["marks"] = "120.00"
+        rows[3]["examtype_id"] = 999999
+
+        response = self.client.post(reverse("add_marks"), rows, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        errors = response.data["errors"]
+        self.assertEqual(len(errors), 4)
+        self.assertEqual(errors[0], {})
+        self.assertIn("student_id", errors[1])
+        self.assertIn("non_field_errors", errors[2])
+        self.assertIn("examtype_id", errors[3])
+        self.assertFalse(Marksheet.objects.exists())
+
+    def test_bulk_response_has_ids_on_every_backend(self):
+        response = self.client.post(reverse("add_marks"), self.rows()[:2], format="json")
+        self.assertEqual(
+            [row["id"] for row in response.data["data"]],
+            list(Marksheet.objects.order_by("id").values_list("id", flat=True)),
+        )
+
+        # MySQL does not return primary keys from bulk inserts
+        with mock.patch.object(
+            type(connection.features), "can_return_rows_from_bulk_insert", new_callable=mock.PropertyMock, return_value=False
+        ):
+            # The same key twice gets the ids in request order
+            rows = self.rows()[2:4] + [{**self.rows()[2], "marks": "1.00"}]
+            response = self.client.post(reverse("add_marks"), rows, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [(row["id"], row["marks"]) for row in response.data["data"]],
+            [(mark.id, f"{mark.marks:.2f}") for mark in Marksheet.objects.order_by("id")[2:]],
+        )
+
+    def test_single_mark_still_supported(self):
+        response = self.client.post(reverse("add_marks"), self.rows()[0], format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Marksheet.objects.count(), 1)
+
+
+class ImportMarksTests(MarksheetTestMixin, TestCase):
+
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user(
+            email="teacher@example.com", full_name="Teacher", role="teacher"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        self.classlevel = ClassLevel.objects.create(level=9)
+        self.examtype = ExamType.objects.create(name="Final")
+        self.math, self.science = Subject.objects.bulk_create([Subject(name="Math"), Subject(name="Science")])
+        ClassSubject.objects.bulk_create(
+            ClassSubject(class_level=self.classlevel, subject=subject) for subject in (self.math, self.science)
+        )
+        self.students = self.create_students(3)
+        StudentClassEnrollment.objects.bulk_create(
+            StudentClassEnrollment(student=student, class_level=self.classlevel, is_current=True)
+            for student in self.students[:2]
+        )
+        Marksheet.objects.create(
+            student=self.students[0], classlevel=self.classlevel, subject=self.math,
+            examtype=self.examtype, full_marks=100, marks=50,
+        )
+
+    def upload(self, content, name="results.csv", **extra):
+        upload = SimpleUploadedFile(name, content)
+        return self.client.post(reverse("import_marks"), {
+            "file": upload,
+            "classlevel_id": self.classlevel.id,
+            "examtype_id": self.examtype.id,
+            **extra,
+        }, format="multipart")
+
+    def csv_sheet(self):
+        first, second = self.students[:2]
+        return (
+            "student_id,student_name,math,Science\n"
+            f"{first.id},Student 0,72.5,\n"
+            f"{second.id},Student 1,60,81\n"
+        ).encode()
+
+    def test_dry_run_returns_diff_without_saving(self):
+        response = self.upload(self.csv_sheet(), dry_run=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["summary"], {"created": 2, "updated": 1, "unchanged": 0})
+        self.assertEqual(response.data["changes"][0], {
+            "row": 2, "student_id": self.students[0].id, "subject": "Math",
+            "action": "updated", "old_marks": "50.00", "new_marks": "72.50",
+        })
+        self.assertEqual(Marksheet.objects.count(), 1)
+
+    def test_unreadable_files_are_rejected(self):
+        first = self.students[0]
+        latin1 = f"student_id,student_name,math\n{first.id},José,72\n".encode("latin-1")
+        not_a_workbook = b"student_id,math\n1,50\n"
+
+        for content, name in ((latin1, "results.csv"), (not_a_workbook, "results.xlsx")):
+            response = self.upload(content, name=name)
+            self.assertEqual(response.status_code, 400, name)
+            self.assertTrue(response.data["message"].startswith("Could not read the file"), name)
+        self.assertEqual(Marksheet.objects.count(), 1)
+
+        with tempfile.NamedTemporaryFile(suffix=".xlsx") as sheet:
+            sheet.write(not_a_workbook)
+            sheet.flush()
+            with self.assertRaisesMessage(CommandError, "Could not read the file"):
+                call_command("import_marks", sheet.name, classlevel=self.classlevel.id, exam=str(self.examtype.id))
+
+    def test_import_upserts_marks(self):
+        response = self.upload(self.csv_sheet())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Marksheet.objects.count(), 3)
+        self.assertEqual(Marksheet.objects.get(student=self.students[0], subject=self.math).marks, Decimal("72.50"))
+
+        again = self.upload(self.csv_sheet())
+        self.assertEqual(again.data["summary"], {"created": 0, "updated": 0, "unchanged": 3})
+        self.assertEqual(Marksheet.objects.count(), 3)
+
+    def test_invalid_cells_abort_the_whole_import(self):
+        first, _, unenrolled = self.students
+        sheet = (
+            "student_id,Math,Science\n"
+            f"{first.id},101,40\n"
+            f"{unenrolled.id},50,50\n"
+            "abc,1,1\n"
+        ).encode()
+
+        response = self.upload(sheet)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([(e["row"], e["column"]) for e in response.data["errors"]], [
+            (2, "Math"), (4, "student_id"), (3, "student_id"),
+        ])
+        self.assertEqual(Marksheet.objects.count(), 1)
+        self.assertEqual(Marksheet.objects.get().marks, 50)
+
+    def test_unknown_subject_column_is_rejected(self):
+        response = self.upload(b"student_id,Math,History\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("History", response.data["message"])
+
+    def test_xlsx_sheet(self):
+        from openpyxl import Workbook
+
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["student_id", "Math", "Science"])
+        sheet.append([self.students[1].id, 88, 91.5])
+        content = io.BytesIO()
+        workbook.save(content)
+
+        response = self.upload(content.getvalue(), name="results.xlsx")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["summary"]["created"], 2)
+        self.assertEqual(Marksheet.objects.get(student=self.students[1], subject=self.science).marks, Decimal("91.50"))
+
+
+class FastListSerializationTests(MarksheetTestMixin, TestCase):
+
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user(
+            email="teacher@example.com", full_name="Teacher", role="teacher"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        self.classlevel = ClassLevel.objects.create(level=10)
+        self.examtype = ExamType.objects.create(name="Mid Term")
+        subjects = Subject.objects.bulk_create(Subject(name=f"Subject {i}") for i in range(3))
+        students = self.create_students(5)
+        Marksheet.objects.bulk_create(
+            Marksheet(student=student, classlevel=self.classlevel, subject=subject, examtype=self.examtype,
+                      full_marks=75, marks=(i * 7 + j * 3) % 76 + Decimal("0.25"))
+            for i, student in enumerate(students) for j, subject in enumerate(subjects)
+        )
+        # Nullable relations and zero full marks take the serializer's edge cases
+        Marksheet.objects.create(student=students[0], classlevel=None, subject=None, examtype=None,
+                                 full_marks=0, marks=0)
+        ClassParticipation.objects.bulk_create(
+            ClassParticipation(student=student, classlevel=self.classlevel, subject=subject,
+                               added_by=self.teacher, mark=(i + j) % 7)
+            for i, student in enumerate(students) for j, subject in enumerate(subjects)
+        )
+
+    def assertSameJSON(self, fast, reference):
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(fast), renderer.render(reference))
+
+    def test_marksheet_list_matches_serializer(self):
+        marks = Marksheet.objects.order_by("id")
+        self.assertSameJSON(serialize_marksheet_list(marks), MarksheetListSerializer(marks, many=True).data)
+
+    def test_participation_list_matches_serializer(self):
+        participations = ClassParticipation.objects.order_by("id")
+        self.assertSameJSON(
+            serialize_participation_list(participations),
+            ClassParticipationListSerializer(participations, many=True).data,
+        )
+
+    def test_list_endpoints_use_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("marks_by_class", args=[self.classlevel.id]))
+        self.assertEqual(response.data["count"], 15)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("get_class_participation_list"))
+        self.assertEqual(response.data["count"], 15)
+
+
+class PerformanceStatsTests(MarksheetTestMixin, TestCase):
+
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user(
+            email="teacher@example.com", full_name="Teacher", role="teacher"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        classlevel = ClassLevel.objects.create(level=7)
+        self.first_term, self.final = ExamType.objects.bulk_create([ExamType(name="First Term"), ExamType(name="Final")])
+        self.math, self.science = Subject.objects.bulk_create([Subject(name="Math"), Subject(name="Science")])
+        self.student = self.create_students(1)[0]
+        rows = [
+            (self.math, self.first_term, "2025-01-10", 50, 40),
+            (self.science, self.first_term, "2025-01-10", 100, 60),
+            (self.math, self.final, "2025-03-10", 50, 45),
+            (self.science, self.final, "2025-03-10", 100, 70),
+        ]
+        for subject, examtype, day, full_marks, marks in rows:
+            mark = Marksheet.objects.create(student=self.student, classlevel=classlevel, subject=subject,
+                                            examtype=examtype, full_marks=full_marks, marks=marks)
+            Marksheet.objects.filter(pk=mark.pk).update(date=day)
+
+    def url(self, **params):
+        return reverse("student_performance_stats", args=[self.student.id]), params
+
+    def test_summary_is_one_query(self):
+        url, params = self.url()
+        with self.assertNumQueries(1):
+            response = self.client.get(url, params)
+
+        data = response.data["data"]
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["student_name"], "Student 0")
+        self.assertEqual(data["total_subjects"], 2)
+        self.assertEqual(data["total_exams"], 4)
+        self.assertEqual(data["average_percentage"], 71.67)
+        self.assertNotIn("marksheets", data)
+
+        self.assertEqual(data["best_subject"], {"subject_id": self.math.id, "subject_name": "Math", "average_percentage": 85.0})
+        self.assertEqual(data["worst_subject"]["subject_name"], "Science")
+        self.assertEqual(data["subject_wise_stats"][0], {
+            "subject_id": self.math.id, "subject_name": "Math", "exam_count": 2,
+            "average_percentage": 85.0, "avg_marks": 42.5, "max_marks": 45.0, "min_marks": 40.0,
+        })
+        self.assertEqual(
+            [(row["examtype_name"], row["average_percentage"]) for row in data["exam_type_stats"]],
+            [("Final", 76.67), ("First Term", 66.67)],
+        )
+        self.assertEqual(
+            [(str(row["date"]), row["average_percentage"]) for row in data["trend"]],
+            [("2025-01-10", 66.67), ("2025-03-10", 76.67)],
+        )
+
+    def test_marksheets_are_paginated(self):
+        url, params = self.url(include_marksheets="true", page=2, page_size=3)
+        with self.assertNumQueries(2):
+            response = self.client.get(url, params)
+
+        data = response.data["data"]
+        self.assertEqual(data["marksheets_page"], {"page": 2, "page_size": 3, "total": 4})
+        self.assertEqual(len(data["marksheets"]), 1)
+        self.assertEqual(data["marksheets"][0]["subject"]["name"], "Science")
+
+    def test_no_marks(self):
+        response = self.client.get(reverse("student_performance_stats", args=[self.teacher.id]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ClassRankingTests(MarksheetTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = CustomUser.objects.create_user(
+            email="teacher@example.com", full_name="Teacher", role="teacher"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        self.classlevel = ClassLevel.objects.create(level=6)
+        self.examtype = ExamType.objects.create(name="First Term")
+        self.math, self.science = Subject.objects.bulk_create([Subject(name="Math"), Subject(name="Science")])
+        self.students = self.create_students(4)
+        # Overall: 150/200, 150/200, 100/200, 40/100; students 0 and 1 tie
+        scores = [(80, 70), (70, 80), (50, 50), (40, None)]
+        for student, (math, science) in zip(self.students, scores):
+            for subject, marks in ((self.math, math), (self.science, science)):
+                if marks is not None:
+                    Marksheet.objects.create(student=student, classlevel=self.classlevel, subject=subject,
+                                             examtype=self.examtype, full_marks=100, marks=marks)
+        cache.clear()
+
+    def test_ranks_and_percentiles(self):
+        result = ranking.compute_ranking(self.classlevel.id, self.examtype.id)
+
+        self.assertEqual(
+            [(row["student_id"], row["percentage"], row["rank"], row["percentile"]) for row in result["students"]],
+            [
+                (self.students[0].id, 75.0, 1, 66.67),
+                (self.students[1].id, 75.0, 1, 66.67),
+                (self.students[2].id, 50.0, 3, 33.33),
+                (self.students[3].id, 40.0, 4, 0.0),
+            ],
+        )
+        math, science = result["subjects"]
+        self.assertEqual(math["subject_name"], "Math")
+        self.assertEqual([row["rank"] for row in math["students"]], [1, 2, 3, 4])
+        self.assertEqual(math["students"][0]["percentile"], 100.0)
+        self.assertEqual(len(science["students"]), 3)
+        self.assertEqual(science["students"][0]["student_id"], self.students[1].id)
+
+    def test_numpy_fallback_matches_window_functions(self):
+        self.assertEqual(
+            ranking.compute_ranking(self.classlevel.id, self.examtype.id, use_window=False),
+            ranking.compute_ranking(self.classlevel.id, self.examtype.id, use_window=True),
+        )
+
+    def test_ranking_is_cached_until_marks_change(self):
+        url = reverse("class_ranking", args=[self.classlevel.id, self.examtype.id])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Marksheet.objects.filter(student=self.students[3]).get().delete()
+        response = self.client.get(url)
+        self.assertEqual(response.data["data"]["student_count"], 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("add_marks"), [{
+                "student_id": self.students[3].id, "subject_id": self.math.id,
+                "classlevel_id": self.classlevel.id, "examtype_id": self.examtype.id,
+                "full_marks": "100.00", "marks": "99.00",
+            }], format="json")
+        response = self.client.get(url)
+        self.assertEqual(response.data["data"]["students"][0]["student_id"], self.students[3].id)
+
+    def test_rescaled_mark_invalidates_ranking(self):
+        url = reverse("class_ranking", args=[self.classlevel.id, self.examtype.id])
+        self.client.get(url)
+
+        # Saving an unchanged mark keeps the cached ranking
+        mark = Marksheet.objects.get(student=self.students[0], subject=self.science)
+        with self.captureOnCommitCallbacks(execute=True):
+            mark.save()
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        # 70/100 -> 35/50 keeps the subject percentage, but rankings weight
+        # by full marks: student 0 moves to 115/150 and leads alone
+        mark.marks, mark.full_marks = 35, 50
+        with self.captureOnCommitCallbacks(execute=True):
+            mark.save()
+        students = self.client.get(url).data["data"]["students"]
+        self.assertEqual(
+            [(row["student_id"], row["percentage"], row["rank"]) for row in students[:2]],
+            [(self.students[0].id, 76.67, 1), (self.students[1].id, 75.0, 2)],
+        )
+
+    def test_rescale_with_the_same_percentage_drops_the_cached_ranking(self):
+        ranking.get_ranking(self.classlevel.id, self.examtype.id)
+        key = ranking.cache_key(self.classlevel.id, self.examtype.id)
+        self.assertIsNotNone(cache.get(key))
+
+        mark = Marksheet.objects.get(student=self.students[2], subject=self.math)
+        mark.marks, mark.full_marks = 25, 50
+        with self.captureOnCommitCallbacks(execute=True):
+            mark.save()
+
+        self.assertIsNone(cache.get(key))
+        aggregate = StudentMarkAggregate.objects.get(student=self.students[2], subject=self.math)
+        self.assertEqual((aggregate.mark_count, aggregate.fraction_sum), (1, 0.5))
+
+    def test_cached_ranking_expires(self):
+        # Other worker processes are not invalidated, so their entries must expire
+        with mock.patch.object(ranking.cache, "set", wraps=ranking.cache.set) as cache_set:
+            ranking.get_ranking(self.classlevel.id, self.examtype.id)
+        self.assertEqual(cache_set.call_args.args[2], settings.MARKSHEET_RANKING_CACHE_TTL)
+
+    def test_students_only_see_their_own_rows(self):
+        self.client.force_authenticate(self.students[2])
+        response = self.client.get(reverse("class_ranking", args=[self.classlevel.id, self.examtype.id]))
+
+        data = response.data["data"]
+        self.assertEqual(data["student_count"], 4)
+        self.assertEqual([row["rank"] for row in data["students"]], [3])
+        self.assertEqual([len(subject["students"]) for subject in data["subjects"]], [1, 1])
+
+
+class ResultSheetTests(MarksheetTestMixin, TestCase):
+
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user(
+            email="teacher@example.com", full_name="Teacher", role="teacher"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        self.classlevel = ClassLevel.objects.create(level=5)
+        self.examtype = ExamType.objects.create(name="Final")
+        math, science, nepali = Subject.objects.bulk_create(
+            [Subject(name="Math"), Subject(name="Science"), Subject(name="Nepali")]
+        )
+        self.students = self.create_students(3)
+        rows = [
+            (self.students[0], math, 100, 95), (self.students[0], science, 50, 41), (self.students[0], nepali, 100, 72),
+            (self.students[1], math, 100, 30), (self.students[1], science, 50, 30),
+            # Two marks for the same subject are summed
+            (self.students[2], math, 50, 20), (self.students[2], math, 50, 25),
+        ]
+        Marksheet.objects.bulk_create(
+            Marksheet(student=student, classlevel=self.classlevel, subject=subject, examtype=self.examtype,
+                      full_marks=full_marks, marks=marks)
+            for student, subject, full_marks, marks in rows
+        )
+
+    def url(self):
+        return reverse("class_result_sheet", args=[self.classlevel.id, self.examtype.id])
+
+    def test_grade_bands(self):
+        letters, points = grading.grade([100, 90, 89.99, 35, 34.99, 0, float("nan")])
+        self.assertEqual(list(letters), ["A+", "A+", "A", "D", "NG", "NG", None])
+        self.assertEqual(list(points[:6]), [4.0, 4.0, 3.6, 1.6, 0.0, 0.0])
+
+    def test_json_sheet(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url())
+
+        data = response.data["data"]
+        self.assertEqual(data["subjects"], ["Math", "Nepali", "Science"])
+        first, second, third = data["students"]
+        self.assertEqual(first["subjects"]["Science"], {
+            "marks": 41.0, "full_marks": 50.0, "percentage": 82.0, "grade": "A", "grade_point": 3.6,
+        })
+        self.assertEqual(
+            (first["total_marks"], first["total_full_marks"], first["percentage"], first["grade"], first["gpa"], first["result"]),
+            (208.0, 250.0, 83.2, "A", 3.6, "Pass"),
+        )
+        self.assertNotIn("Nepali", second["subjects"])
+        self.assertEqual((second["gpa"], second["result"]), (1.4, "Fail"))
+        self.assertEqual(third["subjects"]["Math"]["marks"], 45.0)
+        self.assertEqual((third["grade"], third["result"]), ("C", "Pass"))
+        self.assertEqual(data["summary"], {
+            "student_count": 3, "pass_count": 2, "fail_count": 1, "pass_percentage": 66.67, "average_gpa": 2.33,
+        })
+
+    def test_csv_sheet(self):
+        response = self.client.get(self.url(), {"export_format": "csv"})
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        lines = response.content.decode().splitlines()
+        self.assertTrue(lines[0].startswith("student_id,student_name,Math marks,Math full_marks,"))
+        self.assertTrue(lines[0].endswith(",total_marks,total_full_marks,percentage,grade,gpa,result"))
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[2].endswith(",Fail"))
+
+    def test_students_cannot_view_the_sheet(self):
+        self.client.force_authenticate(self.students[0])
+        self.assertEqual(self.client.get(self.url()).status_code, 403)
+
+
+class StudentMarkAggregateTests(MarksheetTestMixin, TestCase):
+
+    def setUp(self):
+        self.past, self.current = ClassLevel.objects.bulk_create([ClassLevel(level=3), ClassLevel(level=4)])
+        self.first_term, self.final = ExamType.objects.bulk_create([ExamType(name="First Term"), ExamType(name="Final")])
+        self.math, self.science = Subject.objects.bulk_create([Subject(name="Math"), Subject(name="Science")])
+        self.student = self.create_students(1)[0]
+        StudentClassEnrollment.objects.create(student=self.student, class_level=self.current, is_current=True)
+
+    def mark(self, classlevel, subject, examtype, marks, full_marks=100):
+        return Marksheet.objects.create(student=self.student, classlevel=classlevel, subject=subject,
+                                        examtype=examtype, full_marks=full_marks, marks=marks)
+
+    def assertConsistent(self):
+        self.assertEqual(aggregates.find_mismatches(), [])
+
+    def test_single_row_changes_are_applied_incrementally(self):
+        low = self.mark(self.current, self.math, self.first_term, 40)
+        self.mark(self.current, self.math, self.first_term, 30, full_marks=50)
+        high = self.mark(self.current, self.math, self.first_term, 90)
+        self.mark(self.current, None, None, 5, full_marks=0)
+
+        aggregate = StudentMarkAggregate.objects.get(subject=self.math)
+        self.assertEqual(aggregate.mark_count, 3)
+        self.assertAlmostEqual(aggregate.fraction_sum, 1.9)
+        self.assertEqual((aggregate.min_fraction, aggregate.max_fraction), (0.4, 0.9))
+        self.assertConsistent()
+
+        # Removing an extreme re-reads the remaining marks
+        high.delete()
+        aggregate.refresh_from_db()
+        self.assertEqual((aggregate.mark_count, aggregate.max_fraction), (2, 0.6))
+        self.assertConsistent()
+
+        # Moving a mark to another exam updates both keys
+        low.examtype = self.final
+        low.marks = 70
+        low.save()
+        self.assertConsistent()
+        self.assertEqual(StudentMarkAggregate.objects.get(examtype=self.final).max_fraction, 0.7)
+
+        Marksheet.objects.get(subject=self.math, examtype=self.first_term).delete()
+        self.assertFalse(StudentMarkAggregate.objects.filter(subject=self.math, examtype=self.first_term).exists())
+        self.assertConsistent()
+
+    def test_null_keys_share_one_aggregate_row(self):
+        self.mark(self.current, None, None, 20)
+        self.mark(self.current, None, None, 40)
+        aggregate = StudentMarkAggregate.objects.get(student=self.student, subject=None, examtype=None)
+        self.assertEqual(aggregate.mark_count, 2)
+
+        # A racing insert of the same NULL-keyed row is rejected by the key
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            StudentMarkAggregate.objects.create(student=self.student, classlevel=self.current)
+        self.assertConsistent()
+
+    def test_bulk_writes_refresh_aggregates(self):
+        teacher = CustomUser.objects.create_user(email="teacher@example.com", full_name="Teacher", role="teacher")
+        client = APIClient()
+        client.force_authenticate(teacher)
+        client.post(reverse("add_marks"), [
+            {"student_id": self.student.id, "subject_id": subject.id, "classlevel_id": self.current.id,
+             "examtype_id": self.final.id, "full_marks": "100.00", "marks": "60.00"}
+            for subject in (self.math, self.science)
+        ], format="json")
+        self.assertEqual(StudentMarkAggregate.objects.count(), 2)
+        self.assertConsistent()
+
+        ClassSubject.objects.create(class_level=self.current, subject=self.math)
+        sheet = f"student_id,Math\n{self.student.id},80\n".encode()
+        client.post(reverse("import_marks"), {
+            "file": SimpleUploadedFile("results.csv", sheet),
+            "classlevel_id": self.current.id, "examtype_id": self.final.id,
+        }, format="multipart")
+        self.assertEqual(StudentMarkAggregate.objects.get(subject=self.math).max_fraction, 0.8)
+        self.assertConsistent()
+
+    def test_check_and_rebuild_commands(self):
+        self.mark(self.current, self.math, self.first_term, 40)
+        StudentMarkAggregate.objects.update(mark_count=7)
+
+        with self.assertRaises(CommandError):
+            call_command("check_mark_aggregates", stdout=io.StringIO())
+        call_command("check_mark_aggregates", "--fix", stdout=io.StringIO())
+        self.assertConsistent()
+
+        StudentMarkAggregate.objects.all().delete()
+        call_command("rebuild_mark_aggregates", stdout=io.StringIO())
+        self.assertConsistent()
+
+    def test_past_and_internal_marks_read_aggregates(self):
+        self.mark(self.past, self.math, self.final, 80)
+        self.mark(self.past, self.science, self.final, 30, full_marks=50)
+        self.mark(self.current, self.math, self.first_term, 45, full_marks=50)
+        self.mark(self.current, self.science, self.first_term, 10, full_marks=0)
+
+        with self.assertNumQueries(2):
+            self.assertAlmostEqual(score_prediction_utils.get_past_mark(self.student.id), 0.7)
+        self.assertAlmostEqual(score_prediction_utils.get_internal_assesment_marks(self.student.id), 0.45)
+
+
+class BulkClassParticipationTests(MarksheetTestMixin, TestCase):
+
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user(
+            email="teacher@example.com", full_name="Teacher", role="teacher"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        self.classlevel = ClassLevel.objects.create(level=8)
+        self.subjects = Subject.objects.bulk_create(Subject(name=f"Subject {i}") for i in range(5))
+        self.students = self.create_students(30)
+
+    def rows(self, mark=3):
+        return [
+            {"student_id": student.id, "subject_id": subject.id, "classlevel_id": self.classlevel.id, "mark": mark}
+            for student in self.students for subject in self.subjects
+        ]
+
+    def test_bulk_upsert_uses_constant_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("add_class_participation"), self.rows(), format="json")
+
+        self.assertEqual(response.status_code, 201)
+        selects = [q["sql"] for q in queries.captured_queries if q["sql"].startswith("SELECT")]
+        self.assertEqual(len(selects), 3)
+        self.assertLess(len(queries), 8)
+        self.assertEqual(ClassParticipation.objects.filter(added_by=self.teacher).count(), 150)
+
+        # Entering the class again updates the marks instead of failing on the unique key
+        response = self.client.post(reverse("add_class_participation"), self.rows(mark=5), format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["data"]), 150)
+        self.assertEqual(ClassParticipation.objects.count(), 150)
+        self.assertEqual(set(ClassParticipation.objects.values_list("mark", flat=True)), {5})
+
+    def test_errors_are_reported_per_row(self):
+        rows = self.rows()[:5]
+        rows[1]["student_id"] = self.teacher.id
+        rows[2]["subject_id"] = 999999
+        rows[3]["mark"] = 9
+        rows[4] = dict(rows[0])
+
+        response = self.client.post(reverse("add_class_participation"), rows, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        errors = response.data["errors"]
+        self.assertEqual(errors[0], {})
+        self.assertIn("student_id", errors[1])
+        self.assertIn("subject_id", errors[2])
+        self.assertIn("mark", errors[3])
+        self.assertIn("non_field_errors", errors[4])
+        self.assertFalse(ClassParticipation.objects.exists())
+
+    def test_single_mark_is_replaced_when_entered_again(self):
+        row = self.rows()[0]
+        self.client.post(reverse("add_class_participation"), row, format="json")
+        response = self.client.post(reverse("add_class_participation"), {**row, "mark": 1}, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(ClassParticipation.objects.get().mark, 1)
+
+
+class ParticipationStatsTests(MarksheetTestMixin, TestCase):
+
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user(
+            email="teacher@example.com", full_name="Teacher", role="teacher"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        past, self.classlevel = ClassLevel.objects.bulk_create([ClassLevel(level=6), ClassLevel(level=7)])
+        subjects = Subject.objects.bulk_create(Subject(name=f"Subject {i}") for i in range(3))
+        self.students = self.create_students(4)
+        StudentClassEnrollment.objects.bulk_create(
+            StudentClassEnrollment(student=student, class_level=self.classlevel, is_current=True)
+            for student in self.students
+        )
+        # Current class averages: 4.0, 5.0, 2.0, 3.0
+        marks = [(5, 4, 3), (5, 5, 5), (2, 2, 2), (3, 3, 3)]
+        ClassParticipation.objects.bulk_create(
+            ClassParticipation(student=student, classlevel=self.classlevel, subject=subject,
+                               added_by=self.teacher, mark=mark)
+            for student, row in zip(self.students, marks) for subject, mark in zip(subjects, row)
+        )
+        ClassParticipation.objects.create(student=self.students[0], classlevel=past, subject=subjects[0],
+                                          added_by=self.teacher, mark=1)
+
+    def url(self, student):
+        return reverse("student_participation_stats", args=[student.id])
+
+    def test_summary_and_class_comparison(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url(self.students[0]))
+
+        data = response.data["data"]
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data["student_name"], "Student 0")
+        self.assertEqual(
+            (data["total_subjects"], data["total_participations"], data["average_mark"],
+             data["excellent_count"], data["good_count"]),
+            (3, 4, 3.25, 1, 2),
+        )
+        self.assertEqual(data["class_comparison"], {
+            "classlevel_id": self.classlevel.id, "class_size": 4, "class_mean": 3.5,
+            "student_average": 4.0, "percentile": 66.67,
+        })
+        self.assertNotIn("participation_records", data)
+
+    def test_records_are_optional_and_joined(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url(self.students[1]), {"include_records": "true"})
+
+        data = response.data["data"]
+        self.assertEqual(data["class_comparison"]["percentile"], 100.0)
+        self.assertEqual(len(data["participation_records"]), 3)
+        self.assertEqual(data["participation_records"][0]["added_by"]["full_name"], "Teacher")
+
+    def test_no_records(self):
+        self.assertEqual(self.client.get(self.url(self.teacher)).status_code, 404)
+
+
+class ScoreDistributionTests(MarksheetTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = CustomUser.objects.create_user(
+            email="teacher@example.com", full_name="Teacher", role="teacher"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        self.classlevel = ClassLevel.objects.create(level=9)
+        self.examtype = ExamType.objects.create(name="Final")
+        self.math, self.science = Subject.objects.bulk_create([Subject(name="Math"), Subject(name="Science")])
+        students = self.create_students(5)
+        rows = [(self.math, 95, 100), (self.math, 45, 50), (self.math, 34, 100), (self.math, 60, 100),
+                (self.science, 20, 40), (self.science, 0, 0)]
+        Marksheet.objects.bulk_create(
+            Marksheet(student=student, classlevel=self.classlevel, subject=subject, examtype=self.examtype,
+                      marks=marks, full_marks=full_marks)
+            for student, (subject, marks, full_marks) in zip(students * 2, rows)
+        )
+
+    def url(self):
+        return reverse("score_distribution", args=[self.classlevel.id, self.examtype.id])
+
+    def test_deciles_for_one_subject(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url(), {"subject_id": self.math.id})
+
+        data = response.data["data"]
+        self.assertEqual((data["count"], data["mean"], data["median"], data["std_dev"]), (4, 69.75, 75.0, 24.6))
+        counts = {row["band"]: row["count"] for row in data["histogram"]}
+        self.assertEqual(len(counts), 10)
+        self.assertEqual((counts["30-40"], counts["60-70"], counts["90-100"], counts["80-90"]), (1, 1, 2, 0))
+        self.assertEqual(data["histogram"][0], {"band": "0-10", "min_percentage": 0, "max_percentage": 10, "count": 0})
+
+    def test_grade_bands_for_the_whole_exam(self):
+        data = self.client.get(self.url(), {"bands": "grades"}).data["data"]
+
+        # The mark with zero full marks is left out
+        self.assertEqual(data["count"], 5)
+        self.assertEqual([row["band"] for row in data["histogram"]], ["NG", "D", "C", "C+", "B", "B+", "A", "A+"])
+        self.assertEqual({row["band"]: row["count"] for row in data["histogram"] if row["count"]},
+                         {"NG": 1, "C+": 1, "B": 1, "A+": 2})
+        self.assertEqual(data["median"], 60.0)
+
+    def test_cached_until_marks_change(self):
+        self.client.get(self.url())
+        with self.assertNumQueries(0):
+            self.client.get(self.url())
+
+        mark = Marksheet.objects.get(subject=self.math, marks=34)
+        mark.marks = 94
+        with self.captureOnCommitCallbacks(execute=True):
+            mark.save()
+        counts = {row["band"]: row["count"] for row in self.client.get(self.url()).data["data"]["histogram"]}
+        self.assertEqual(counts["30-40"], 0)
+        self.assertEqual(counts["90-100"], 3)
+
+    def test_invalid_bands(self):
+        self.assertEqual(self.client.get(self.url(), {"bands": "quartiles"}).status_code, 400)
+
+    def test_cached_distribution_expires(self):
+        # Other worker processes are not invalidated, so their entries must expire
+        with mock.patch.object(distribution.cache, "set", wraps=distribution.cache.set) as cache_set:
+            distribution.get_distribution(self.classlevel.id, self.examtype.id)
+        self.assertEqual(cache_set.call_args.args[2], settings.MARKSHEET_DISTRIBUTION_CACHE_TTL)
+
+
+class MarksheetQueryPlanTests(QueryPlanMixin, TestCase):
+    """
+    EXPLAIN the marksheet lookups behind the result, ranking and dashboard
+    endpoints against a seeded dataset and fail on full table scans.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.classes = ClassLevel.objects.bulk_create(ClassLevel(level=level) for level in range(1, 11))
+        subjects = Subject.objects.bulk_create(Subject(name=f"Subject {i}") for i in range(8))
+        cls.exams = ExamType.objects.bulk_create(ExamType(name=name) for name in ("First Term", "Mid Term", "Final"))
+        students = CustomUser.objects.bulk_create(
+            CustomUser(email=f"plan{i}@example.com", full_name=f"Student {i}", role="student")
+            for i in range(400)
+        )
+        cls.student = students[0]
+        Marksheet.objects.bulk_create(
+            (
+                Marksheet(student=student, classlevel=cls.classes[i % len(cls.classes)], subject=subject,
+                          examtype=exam, full_marks=100, marks=(i + j) % 100)
+                for i, student in enumerate(students)
+                for j, subject in enumerate(subjects)
+                for exam in cls.exams
+            ),
+            batch_size=2000,
+        )
+
+        # Give the planner the statistics a production database would have
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                cursor.execute("ANALYZE")
+            elif connection.vendor == "mysql":
+                cursor.execute(f"ANALYZE TABLE {Marksheet._meta.db_table}")
 
-# Create your tests here.
+    def test_marksheet_lookups(self):
+        classlevel = self.classes[0]
+        self.assertIndexed(
+            Marksheet.objects.filter(student=self.student, classlevel=classlevel), "student_id", "classlevel_id"
+        )
+        self.assertIndexed(
+            Marksheet.objects.filter(classlevel=classlevel, examtype=self.exams[0]), "classlevel_id", "examtype_id"
+        )
+        self.assertIndexed(Marksheet.objects.filter(classlevel=classlevel), "classlevel_id")
@@ -8,11 +8,21 @@ urlpatterns = [
     
     # Marks CRUD APIs
     path("api/marks/add/", views.add_marks, name="add_marks"),
+    path("api/marks/import/", views.import_marks, name="import_marks"),
     path("api/marks/update/<int:mark_id>/", views.update_mark, name="update_mark"),
     path("api/marks/delete/<int:mark_id>/", views.delete_mark, name="delete_mark"),
     path("api/marks/<int:mark_id>/", views.get_mark_detail, name="get_mark_detail"),
     path("api/marks/", views.mark_list, name="mark_list"),
     path("api/marks/class/<int:classlevel>/", views.mark_list_by_class, name="marks_by_class"),
+
+    # Ranking API
+    path("api/ranking/<int:classlevel>/<int:examtype_id>/", views.class_ranking, name="class_ranking"),
+
+    # Result Sheet API
+    path("api/result-sheet/<int:classlevel>/<int:examtype_id>/", views.class_result_sheet, name="class_result_sheet"),
+
+    # Score Distribution API
+    path("api/distribution/<int:classlevel>/<int:examtype_id>/", views.score_distribution, name="score_distribution"),
     
     # Performance Statistics API
     path("api/performance/<int:student_id>/", views.student_performance_stats, name="student_performance_stats"),
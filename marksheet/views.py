@@ -1,6 +1,8 @@
+from django.http import HttpResponse
 from django.shortcuts import render, get_object_or_404
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, parser_classes
+from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Avg, Max, Min, ExpressionWrapper, FloatField
 from rest_framework import status
@@ -11,9 +13,16 @@ from .serializers import (
     ExamTypeSerializer,
     ClassParticipationSerializer,
     ClassParticipationListSerializer,
-    ClassParticipationCreateSerializer
+    ClassParticipationCreateSerializer,
+    MarksImportSerializer,
+    serialize_marksheet_list,
+    serialize_participation_list
 )
+from .importer import MarksImportError, import_sheet, read_rows
 from .models import ExamType, Marksheet, ClassParticipation
+from .stats import participation_class_comparison, participation_summary, performance_summary
+from .result_sheet import result_sheet_csv, result_sheet_json
+from . import distribution, ranking
 from .permissions import (
     IsAdminOrTeacher, 
     CanViewMarks, 
@@ -24,6 +33,9 @@ from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from account.models import CustomUser
 
+MARKSHEET_PAGE_SIZE = 50
+MAX_MARKSHEET_PAGE_SIZE = 500
+
 
 @swagger_auto_schema(
     method='post',
@@ -68,6 +80,58 @@ def add_marks(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@swagger_auto_schema(
+    method='post',
+    request_body=MarksImportSerializer,
+    responses={
+        200: 'Import summary (and the list of changes on a dry run)',
+        400: 'Unreadable sheet or validation errors; nothing is saved',
+        403: 'Permission Denied'
+    },
+    operation_description="Import exam results from a CSV/XLSX student x subject sheet (Admin/Teacher only)"
+)
+@api_view(['POST'])
+@permission_classes([IsAdminOrTeacher])
+@parser_classes([MultiPartParser, FormParser])
+def import_marks(request):
+    """
+    Import marks for one class and exam from a spreadsheet.
+    The first column holds student ids and the other columns are subject names.
+    With dry_run the changes are reported but not saved.
+    """
+    serializer = MarksImportSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({
+            "message": "Validation error",
+            "errors": serializer.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    data = serializer.validated_data
+    upload = data['file']
+    try:
+        result = import_sheet(
+            read_rows(upload.file, upload.name),
+            data['classlevel'],
+            data['examtype'],
+            data['full_marks'],
+            dry_run=data['dry_run'],
+        )
+    except MarksImportError as e:
+        return Response({
+            "message": str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if result["errors"]:
+        return Response({
+            "message": "Validation error, no marks were saved",
+            **result
+        }, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        "message": "Dry run, no marks were saved" if data['dry_run'] else "Marks imported successfully",
+        **result
+    }, status=status.HTTP_200_OK)
+
+
 @swagger_auto_schema(
     method='put',
     request_body=MarksheetSerializer,
@@ -174,11 +238,11 @@ def mark_list_by_class(request, classlevel):
             # Admin and teachers can view all marks
         marks = Marksheet.objects.filter(classlevel_id=classlevel)
         
-        serializer = MarksheetListSerializer(marks, many=True)
+        data = serialize_marksheet_list(marks)
         return Response({
             "message": "Marks retrieved successfully",
-            "data": serializer.data,
-            "count": len(serializer.data)
+            "data": data,
+            "count": len(data)
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -188,6 +252,138 @@ def mark_list_by_class(request, classlevel):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@swagger_auto_schema(
+    method='get',
+    responses={
+        200: 'Overall and per-subject rank and percentile of each student',
+        403: 'Permission Denied'
+    },
+    operation_description="Get class ranking for an exam type (Admin/Teacher can view all, Students can view their own)"
+)
+@api_view(['GET'])
+@permission_classes([IsAdminOrTeacherOrStudent])
+def class_ranking(request, classlevel, examtype_id):
+    """
+    Rank and percentile of every student in a class for one exam type,
+    overall and per subject. Students only get their own rows.
+    """
+    try:
+        data = ranking.get_ranking(classlevel, examtype_id)
+
+        if request.user.role == 'student':
+            data = {
+                **data,
+                "students": [row for row in data["students"] if row["student_id"] == request.user.id],
+                "subjects": [
+                    {**subject, "students": [
+                        row for row in subject["students"] if row["student_id"] == request.user.id
+                    ]}
+                    for subject in data["subjects"]
+                ],
+            }
+
+        return Response({
+            "message": "Class ranking retrieved successfully",
+            "data": data
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({
+            "message": "Error occurred while retrieving class ranking",
+            "error": str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter("export_format", openapi.IN_QUERY, description="json (default) or csv", type=openapi.TYPE_STRING),
+    ],
+    responses={
+        200: 'Student x subject result sheet with grades, GPA and pass/fail',
+        400: 'Invalid export format',
+        403: 'Permission Denied'
+    },
+    operation_description="Get the result sheet of a class for an exam type (Admin/Teacher only)"
+)
+@api_view(['GET'])
+@permission_classes([IsAdminOrTeacher])
+def class_result_sheet(request, classlevel, examtype_id):
+    """
+    Result sheet of a class for one exam type: marks, percentage and NEB
+    grade per subject, and totals, GPA and result per student.
+    """
+    export_format = request.query_params.get('export_format', 'json')
+    if export_format not in ('json', 'csv'):
+        return Response({
+            "message": "export_format must be 'json' or 'csv'"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        if export_format == 'csv':
+            response = HttpResponse(result_sheet_csv(classlevel, examtype_id), content_type="text/csv")
+            response["Content-Disposition"] = f'attachment; filename="result-sheet-class-{classlevel}-exam-{examtype_id}.csv"'
+            return response
+
+        return Response({
+            "message": "Result sheet retrieved successfully",
+            "data": result_sheet_json(classlevel, examtype_id)
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({
+            "message": "Error occurred while building result sheet",
+            "error": str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter("subject_id", openapi.IN_QUERY, description="Limit to one subject; omit for every subject", type=openapi.TYPE_INTEGER),
+        openapi.Parameter("bands", openapi.IN_QUERY, description="deciles (default) or grades", type=openapi.TYPE_STRING),
+    ],
+    responses={
+        200: 'Histogram of percentages with count, mean, median and standard deviation',
+        400: 'Invalid subject or bands',
+        403: 'Permission Denied'
+    },
+    operation_description="Get the score distribution of a class for an exam type (Admin/Teacher only)"
+)
+@api_view(['GET'])
+@permission_classes([IsAdminOrTeacher])
+def score_distribution(request, classlevel, examtype_id):
+    """
+    Histogram of mark percentages in a class for one exam type, overall or
+    for one subject, in decile or grade bands.
+    """
+    bands = request.query_params.get('bands', 'deciles')
+    if bands not in distribution.BAND_SETS:
+        return Response({
+            "message": "bands must be 'deciles' or 'grades'"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    subject_id = request.query_params.get('subject_id')
+    if subject_id is not None and not subject_id.isdigit():
+        return Response({
+            "message": "subject_id must be an integer"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        data = distribution.get_distribution(
+            classlevel, examtype_id, int(subject_id) if subject_id else None, bands
+        )
+        return Response({
+            "message": "Score distribution retrieved successfully",
+            "data": data
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({
+            "message": "Error occurred while retrieving score distribution",
+            "error": str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @swagger_auto_schema(
     method='get',
     responses={
@@ -226,11 +422,11 @@ def mark_list(request):
         if examtype_id:
             marks = marks.filter(examtype_id=examtype_id)
         
-        serializer = MarksheetListSerializer(marks, many=True)
+        data = serialize_marksheet_list(marks)
         return Response({
             "message": "Marks retrieved successfully",
-            "data": serializer.data,
-            "count": len(serializer.data)
+            "data": data,
+            "count": len(data)
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -354,6 +550,11 @@ def get_exam_type(request):
 
 @swagger_auto_schema(
     method='get',
+    manual_parameters=[
+        openapi.Parameter("include_marksheets", openapi.IN_QUERY, description="Also return the raw marksheets, one page at a time", type=openapi.TYPE_BOOLEAN),
+        openapi.Parameter("page", openapi.IN_QUERY, description="Marksheet page (default 1)", type=openapi.TYPE_INTEGER),
+        openapi.Parameter("page_size", openapi.IN_QUERY, description=f"Marksheets per page (default {MARKSHEET_PAGE_SIZE}, max {MAX_MARKSHEET_PAGE_SIZE})", type=openapi.TYPE_INTEGER),
+    ],
     responses={
         200: 'Student performance statistics',
         403: 'Permission Denied'
@@ -364,43 +565,46 @@ def get_exam_type(request):
 def student_performance_stats(request, student_id):
     
     try:
+        include_marksheets = request.GET.get('include_marksheets', '').lower() in ('1', 'true', 'yes')
+        try:
+            page = int(request.GET.get('page', 1))
+            page_size = min(int(request.GET.get('page_size', MARKSHEET_PAGE_SIZE)), MAX_MARKSHEET_PAGE_SIZE)
+            if page < 1 or page_size < 1:
+                raise ValueError
+        except ValueError:
+            return Response({
+                "message": "page and page_size must be positive integers"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
         marks = Marksheet.objects.filter(student_id=student_id)
 
-        if not marks.exists():
+        # Every figure comes from one grouped aggregate query
+        summary = performance_summary(marks)
+        if summary is None:
             return Response({
                 "message": "No marks found for this student"
             }, status=status.HTTP_404_NOT_FOUND)
 
-        try:
-            student = CustomUser.objects.get(id=student_id)
-            
-        except:
-            return Response("Something happen in the system")
-        
-        
-        total_subjects = marks.values('subject').distinct().count()
-        total_exams = marks.count()
+        data = {
+            "student_id": student_id,
+            "student_name": summary.pop("student_name"),
+            **summary,
+        }
 
-        average_percentage = marks.aggregate(
-            avg_percentage=ExpressionWrapper(
-                (Avg('marks') * 100.0) / Avg('full_marks'),
-                output_field=FloatField()
+        if include_marksheets:
+            offset = (page - 1) * page_size
+            data["marksheets"] = serialize_marksheet_list(
+                marks.order_by('date', 'id')[offset:offset + page_size]
             )
-        )['avg_percentage'] or 0
-
-        # Serialize all marksheet records
-        marksheet_data = MarksheetSerializer(marks, many=True).data
+            data["marksheets_page"] = {
+                "page": page,
+                "page_size": page_size,
+                "total": summary["total_exams"],
+            }
 
         return Response({
             "message": "Performance statistics retrieved successfully",
-            "data": {
-                "student_id": student_id,
-                'student_name': student.full_name,
-                "total_subjects": total_subjects,
-                "total_exams": total_exams,
-                "average_percentage": round(average_percentage, 2),
-                "marksheets": marksheet_data  # all raw fields of marksheet
-            }
+            "data": data
         }, status=status.HTTP_200_OK)
 
     except Exception as e:
@@ -492,11 +696,11 @@ def get_class_participation_list(request):
         if classlevel_id:
             participations = participations.filter(classlevel_id=classlevel_id)
         
-        serializer = ClassParticipationListSerializer(participations, many=True)
+        data = serialize_participation_list(participations)
         return Response({
             "message": "Class participation records retrieved successfully",
-            "data": serializer.data,
-            "count": len(serializer.data)
+            "data": data,
+            "count": len(data)
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -630,6 +834,9 @@ def delete_class_participation(request, participation_id):
 
 @swagger_auto_schema(
     method='get',
+    manual_parameters=[
+        openapi.Parameter("include_records", openapi.IN_QUERY, description="Also return every participation record", type=openapi.TYPE_BOOLEAN),
+    ],
     responses={
         200: 'Student participation statistics',
         403: 'Permission Denied'
@@ -646,39 +853,27 @@ def student_participation_stats(request, student_id):
     try:
         participations = ClassParticipation.objects.filter(student_id=student_id)
 
-        if not participations.exists():
+        # All counts and the average come from one conditional aggregate
+        summary = participation_summary(participations)
+        if summary is None:
             return Response({
                 "message": "No participation records found for this student"
             }, status=status.HTTP_404_NOT_FOUND)
 
-        try:
-            student = CustomUser.objects.get(id=student_id)
-        except CustomUser.DoesNotExist:
-            return Response({
-                "message": "Student not found"
-            }, status=status.HTTP_404_NOT_FOUND)
-        
-        total_subjects = participations.values('subject').distinct().count()
-        total_participations = participations.count()
-        average_mark = participations.aggregate(avg_mark=Avg('mark'))['avg_mark'] or 0
-        excellent_count = participations.filter(mark=5).count()
-        good_count = participations.filter(mark__gte=4).count()
+        data = {
+            "student_id": student_id,
+            "student_name": summary.pop("student_name"),
+            **summary,
+            "class_comparison": participation_class_comparison(student_id),
+        }
 
-        # Serialize all participation records
-        participation_data = ClassParticipationListSerializer(participations, many=True).data
+        if request.GET.get('include_records', '').lower() in ('1', 'true', 'yes'):
+            records = participations.select_related('student', 'subject', 'classlevel', 'added_by').order_by('id')
+            data["participation_records"] = ClassParticipationListSerializer(records, many=True).data
 
         return Response({
             "message": "Participation statistics retrieved successfully",
-            "data": {
-                "student_id": student_id,
-                'student_name': student.full_name,
-                "total_subjects": total_subjects,
-                "total_participations": total_participations,
-                "average_mark": round(average_mark, 2),
-                "excellent_count": excellent_count,
-                "good_count": good_count,
-                "participation_records": participation_data
-            }
+            "data": data
         }, status=status.HTTP_200_OK)
 
     except Exception as e:
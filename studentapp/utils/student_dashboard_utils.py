@@ -1,7 +1,8 @@
 from account.models import CustomUser, StudentClassEnrollment
 from assignment.models import Assignment, AssignmentSubmission 
 from attendance.models import Attendance 
-from marksheet.models import ClassParticipation, Marksheet
+from marksheet.aggregates import average_fraction
+from marksheet.models import ClassParticipation, StudentMarkAggregate
 from django.db.models import Sum, Avg
 
 
@@ -159,18 +160,10 @@ def get_past_mark(id):
         is_current=True
     ).order_by("-id").first()
     
-    past_marks = Marksheet.objects.filter(student_id=id).exclude(classlevel=class_enrollment.class_level)
-    
-    if not past_marks.exists():
+    past_marks = StudentMarkAggregate.objects.filter(student_id=id).exclude(classlevel_id=class_enrollment.class_level_id)
+    mark = average_fraction(past_marks)
+    if mark is None:
         return 0
-    total_fraction = 0 
-    count = past_marks.count()
-    
-    for mark in past_marks:
-        
-        if mark.full_marks > 0 :
-            total_fraction += mark.marks / mark.full_marks 
-    mark = total_fraction / count
     return {"past_mark": mark* 100}
 
 
@@ -189,20 +182,11 @@ def get_internal_assesment_marks(id):
         is_current=True
     ).order_by("-id").first()
     
-    current_marks = Marksheet.objects.filter(student_id=id, classlevel=class_enrollment.class_level)
-    
-    if not current_marks.exists():
+    current_marks = StudentMarkAggregate.objects.filter(student_id=id, classlevel_id=class_enrollment.class_level_id)
+    mark = average_fraction(current_marks)
+    if mark is None:
         return 0
     
-    total_fraction = 0 
-    count = current_marks.count()
-    
-    for mark in current_marks:
-        
-        if mark.full_marks > 0 :
-            total_fraction += mark.marks / mark.full_marks 
-    mark =  total_fraction / count
-    
     return {"avg_intarnal_assesment_mark": mark* 100}
 
 
@@ -16,7 +16,7 @@ from .serializers import (
 from django.contrib.auth import get_user_model
 from account.models import ClassLevel, StudentClassEnrollment, Subject, ClassSubject, CustomUser
 from marksheet.models import Marksheet, ExamType
-from attendance.models import Attendance 
+from attendance.models import Attendance, DailyAttendanceRollup
 from assignment.models import Assignment, AssignmentSubmission
 from django.utils import timezone
 from datetime import datetime, timedelta
@@ -83,25 +83,38 @@ def update_student(request):
 
     return Response(serializer.errors, status=400)
 
-def get_attendance_trend(class_level, days=7):
-    """Get attendance trend for the last N days"""
+def get_attendance_trend(class_level, days=7, rollups=None, total_students=None):
+    """
+    Get attendance trend for the last N days from the daily attendance rollup.
+
+    ``rollups`` (date -> DailyAttendanceRollup) and ``total_students`` can be
+    passed in by callers that already fetched them for several classes.
+    """
     end_date = timezone.now().date()
     start_date = end_date - timedelta(days=days-1)
     
-    trend_data = []
-    for i in range(days):
-        current_date = start_date + timedelta(days=i)
+    if rollups is None:
+        rollups = {
+            rollup.date: rollup
+            for rollup in DailyAttendanceRollup.objects.filter(
+                classlevel=class_level, date__range=(start_date, end_date)
+            )
+        }
+    if total_students is None:
         total_students = StudentClassEnrollment.objects.filter(
             class_level=class_level, is_current=True
         ).count()
+    
+    trend_data = []
+    for i in range(days):
+        current_date = start_date + timedelta(days=i)
+        rollup = rollups.get(current_date)
+        # Rate against the roster of that day when the rollup recorded one
+        enrolled = rollup.enrolled_count if rollup and rollup.enrolled_count else total_students
         
-        if total_students > 0:
-            present_count = Attendance.objects.filter(
-                classlevel=class_level, 
-                date=current_date, 
-                status='present'
-            ).count()
-            attendance_rate = (present_count / total_students) * 100
+        if enrolled > 0:
+            present_count = rollup.present_count if rollup else 0
+            attendance_rate = (present_count / enrolled) * 100
         else:
             attendance_rate = 0
             
@@ -166,9 +179,18 @@ def get_admin_dashboard():
     total_classes = ClassLevel.objects.count()
     total_assignments = Assignment.objects.count()
     
+    # Per-class attendance totals from the daily rollup
+    class_totals = {
+        row["classlevel_id"]: row
+        for row in DailyAttendanceRollup.objects.values("classlevel_id").annotate(
+            present=Sum("present_count"),
+            total=Sum("present_count") + Sum("late_count") + Sum("absent_count"),
+        )
+    }
+    
     # Calculate overall attendance rate
-    total_attendance_records = Attendance.objects.count()
-    present_records = Attendance.objects.filter(status="present").count()
+    total_attendance_records = sum(row["total"] for row in class_totals.values())
+    present_records = sum(row["present"] for row in class_totals.values())
     overall_attendance_rate = (present_records / total_attendance_records * 100) if total_attendance_records > 0 else 0
     
     # Active and pending assignments
@@ -193,21 +215,36 @@ def get_admin_dashboard():
         teachers_this_month = 0
     
     # Class attendance data
+    trend_days = 7
+    trend_start = today - timedelta(days=trend_days - 1)
+    recent_rollups = {}
+    for rollup in DailyAttendanceRollup.objects.filter(date__range=(trend_start, today)):
+        recent_rollups.setdefault(rollup.classlevel_id, {})[rollup.date] = rollup
+    enrolled_counts = dict(
+        StudentClassEnrollment.objects.filter(is_current=True)
+        .values("class_level_id")
+        .annotate(total=Count("id"))
+        .values_list("class_level_id", "total")
+    )
+    
     class_attendance = []
     classes = ClassLevel.objects.all()
     for cls in classes:
         # Get students in this class
-        student_count = StudentClassEnrollment.objects.filter(
-            class_level=cls, is_current=True
-        ).count()
+        student_count = enrolled_counts.get(cls.id, 0)
         
         # Calculate average attendance
-        total_days = Attendance.objects.filter(classlevel=cls).count()
-        present_days = Attendance.objects.filter(classlevel=cls, status="present").count()
+        totals = class_totals.get(cls.id, {})
+        total_days = totals.get("total", 0)
+        present_days = totals.get("present", 0)
         avg_attendance = (present_days / total_days * 100) if total_days > 0 else 0
         
         # Get attendance trend
-        attendance_trend = get_attendance_trend(cls, 7)
+        attendance_trend = get_attendance_trend(
+            cls, trend_days,
+            rollups=recent_rollups.get(cls.id, {}),
+            total_students=student_count,
+        )
         
         class_attendance.append({
             "class_id": cls.id,